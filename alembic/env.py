@@ -25,6 +25,12 @@ from app.database import Base
 from app import models # importa TODOS los modelos automáticamente
 target_metadata = Base.metadata
 
+# La base de datos es la misma que usa la aplicación (DATABASE_URL, ver
+# app/core/config.py), no la de alembic.ini. Para migrar un shard:
+#   DATABASE_URL=mysql+pymysql://.../sistema_reservas alembic upgrade head
+from app.core.config import DATABASE_URL
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -70,8 +76,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Una transacción por migración: las que crean índices o rellenan datos en
+        # línea (app/core/online_migrations.py) confirman lo anterior a mitad de camino
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
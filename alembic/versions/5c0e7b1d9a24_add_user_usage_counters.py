@@ -0,0 +1,96 @@
+"""add user usage counters and reservations.user_id index
+
+Revision ID: 5c0e7b1d9a24
+Revises: a1287a4d7955
+Create Date: 2026-10-19 09:12:41.532108
+
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e7b1d9a24'
+down_revision: Union[str, Sequence[str], None] = 'a1287a4d7955'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def split_by_week(start_time: datetime, end_time: datetime) -> List[Tuple[date, int]]:
+    """
+    Copia congelada de app/core/quotas.py:split_by_week tal como era al escribir
+    esta migración (semanas de lunes a domingo, minutos enteros). No se importa:
+    un cambio posterior en las cuotas no debe cambiar lo que calcula esta migración.
+    """
+    chunks = []
+    cursor = start_time
+    while cursor < end_time:
+        day = cursor.date()
+        period = day - timedelta(days=day.weekday())
+        next_week = datetime.combine(period + timedelta(days=7), datetime.min.time())
+        chunk_end = min(end_time, next_week)
+        chunks.append((period, int((chunk_end - cursor).total_seconds() // 60)))
+        cursor = chunk_end
+    return chunks
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('active_reservations', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('user_usage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('reservation_count', sa.Integer(), nullable=False),
+    sa.Column('reserved_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'period_start', name='uq_user_usage_user_period')
+    )
+    op.create_index(op.f('ix_user_usage_id'), 'user_usage', ['id'], unique=False)
+    op.create_index(op.f('ix_reservations_user_id'), 'reservations', ['user_id'], unique=False)
+
+    # Inicializar los contadores a partir de las reservas existentes (una sola vez)
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT user_id, start_time, end_time FROM reservations WHERE status = 'active'"
+    )).fetchall()
+
+    active = defaultdict(int)
+    usage = defaultdict(lambda: [0, 0])
+    for user_id, start_time, end_time in rows:
+        active[user_id] += 1
+        for index, (period, minutes) in enumerate(split_by_week(start_time, end_time)):
+            if index == 0:
+                usage[(user_id, period)][0] += 1
+            usage[(user_id, period)][1] += minutes
+
+    for user_id, count in active.items():
+        conn.execute(
+            sa.text("UPDATE users SET active_reservations = :count WHERE id = :user_id"),
+            {"count": count, "user_id": user_id},
+        )
+
+    if usage:
+        usage_table = sa.table('user_usage',
+            sa.column('user_id', sa.Integer),
+            sa.column('period_start', sa.Date),
+            sa.column('reservation_count', sa.Integer),
+            sa.column('reserved_minutes', sa.Integer),
+        )
+        op.bulk_insert(usage_table, [
+            {"user_id": user_id, "period_start": period, "reservation_count": count, "reserved_minutes": minutes}
+            for (user_id, period), (count, minutes) in usage.items()
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reservations_user_id'), table_name='reservations')
+    op.drop_index(op.f('ix_user_usage_id'), table_name='user_usage')
+    op.drop_table('user_usage')
+    op.drop_column('users', 'active_reservations')
@@ -0,0 +1,30 @@
+"""add users.feed_secret for revocable calendar feed tokens
+
+Revision ID: a3c7e1f5d829
+Revises: f6d1a8c3e524
+Create Date: 2026-10-20 09:14:52.108437
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e1f5d829'
+down_revision: Union[str, Sequence[str], None] = 'f6d1a8c3e524'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sin valor en las filas existentes: los enlaces de calendario anteriores (firmados
+    # sin secreto) dejan de valer y cada usuario obtiene uno nuevo al pedir el token
+    op.add_column('users', sa.Column('feed_secret', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'feed_secret')
@@ -0,0 +1,29 @@
+"""add resources.slot_minutes
+
+Revision ID: a4d9e2b7c813
+Revises: f1a6c3e9b472
+Create Date: 2026-10-19 18:41:03.208551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e2b7c813'
+down_revision: Union[str, Sequence[str], None] = 'f1a6c3e9b472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL = reserva libre (sin franjas), como hasta ahora
+    op.add_column('resources', sa.Column('slot_minutes', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('resources', 'slot_minutes')
@@ -0,0 +1,32 @@
+"""extend the (tenant_id, user_id) reservations index with start_time
+
+Revision ID: a7e2c5d8f134
+Revises: d9b3f6a2e481
+Create Date: 2026-10-19 21:52:08.640317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e2c5d8f134'
+down_revision: Union[str, Sequence[str], None] = 'd9b3f6a2e481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El nuevo índice sirve también para todo lo que usaba el antiguo (su prefijo):
+    # se crea antes de borrar el otro para no dejar las consultas sin índice
+    op.create_index('ix_reservations_tenant_user_start', 'reservations', ['tenant_id', 'user_id', 'start_time'], unique=False)
+    op.drop_index('ix_reservations_tenant_user', table_name='reservations')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_reservations_tenant_user', 'reservations', ['tenant_id', 'user_id'], unique=False)
+    op.drop_index('ix_reservations_tenant_user_start', table_name='reservations')
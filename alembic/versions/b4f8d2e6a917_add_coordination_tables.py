@@ -0,0 +1,47 @@
+"""add coordination_locks and coordination_events
+
+Revision ID: b4f8d2e6a917
+Revises: a7e2c5d8f134
+Create Date: 2026-10-19 23:18:44.207356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f8d2e6a917'
+down_revision: Union[str, Sequence[str], None] = 'a7e2c5d8f134'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('coordination_locks',
+    sa.Column('name', sa.String(length=191), nullable=False),
+    sa.Column('owner', sa.String(length=64), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('coordination_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('origin', sa.String(length=32), nullable=False),
+    sa.Column('channel', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_coordination_events_id'), 'coordination_events', ['id'], unique=False)
+    op.create_index(op.f('ix_coordination_events_created_at'), 'coordination_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_coordination_events_created_at'), table_name='coordination_events')
+    op.drop_index(op.f('ix_coordination_events_id'), table_name='coordination_events')
+    op.drop_table('coordination_events')
+    op.drop_table('coordination_locks')
@@ -0,0 +1,41 @@
+"""add table versions
+
+Revision ID: b7d41c9e2f05
+Revises: 8e3f2a6c4d17
+Create Date: 2026-10-19 12:41:09.604377
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c9e2f05'
+down_revision: Union[str, Sequence[str], None] = '8e3f2a6c4d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRACKED_TABLES = ["users", "resources", "resource_categories", "custom_fields", "reservations"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table_versions = op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    # Una fila por tabla seguida, para que los incrementos sean siempre UPDATE
+    now = datetime.utcnow()
+    op.bulk_insert(table_versions, [
+        {"table_name": name, "version": 1, "updated_at": now} for name in TRACKED_TABLES
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_versions')
@@ -0,0 +1,34 @@
+"""allow pending idempotency keys (claimed before running the request)
+
+Revision ID: b8d2f4a6c913
+Revises: a3c7e1f5d829
+Create Date: 2026-10-20 12:41:07.553219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a6c913'
+down_revision: Union[str, Sequence[str], None] = 'a3c7e1f5d829'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Una fila sin respuesta es una petición en curso que ya ha reservado la clave
+    with op.batch_alter_table('idempotency_keys') as batch_op:
+        batch_op.alter_column('status_code', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('response_body', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM idempotency_keys WHERE status_code IS NULL OR response_body IS NULL")
+    with op.batch_alter_table('idempotency_keys') as batch_op:
+        batch_op.alter_column('response_body', existing_type=sa.Text(), nullable=False)
+        batch_op.alter_column('status_code', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,37 @@
+"""add tenant columns to resources and reservations
+
+Revision ID: c3a9e5f18b62
+Revises: b7d41c9e2f05
+Create Date: 2026-10-19 14:26:53.870412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9e5f18b62'
+down_revision: Union[str, Sequence[str], None] = 'b7d41c9e2f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los datos existentes pasan a la sede por defecto
+    op.add_column('resources', sa.Column('tenant_id', sa.String(length=64), nullable=False, server_default='default'))
+    op.add_column('reservations', sa.Column('tenant_id', sa.String(length=64), nullable=False, server_default='default'))
+    op.create_index('ix_resources_tenant_id_id', 'resources', ['tenant_id', 'id'], unique=False)
+    op.create_index('ix_reservations_tenant_resource_start', 'reservations', ['tenant_id', 'resource_id', 'start_time'], unique=False)
+    op.create_index('ix_reservations_tenant_user', 'reservations', ['tenant_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservations_tenant_user', table_name='reservations')
+    op.drop_index('ix_reservations_tenant_resource_start', table_name='reservations')
+    op.drop_index('ix_resources_tenant_id_id', table_name='resources')
+    op.drop_column('reservations', 'tenant_id')
+    op.drop_column('resources', 'tenant_id')
@@ -0,0 +1,59 @@
+"""seed per-resource and per-user reservation versions
+
+Revision ID: c4e9a2d7f158
+Revises: b8d2f4a6c913
+Create Date: 2026-10-20 15:26:48.904172
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2d7f158'
+down_revision: Union[str, Sequence[str], None] = 'b8d2f4a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Versiones de reservations por valor de columna (app/core/versioning.py): una por
+# recurso y por usuario existentes, más la de las escrituras masivas. Las de filas
+# nuevas las crea la aplicación junto con el recurso o el usuario.
+SCOPES = [("resources", "reservations.resource_id="), ("users", "reservations.user_id=")]
+BULK_KEY = "reservations.*"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table_versions = sa.table(
+        'table_versions', sa.column('table_name'), sa.column('version'), sa.column('updated_at')
+    )
+    now = datetime.utcnow()
+    existing = sa.select(table_versions.c.table_name)
+
+    op.execute(
+        table_versions.insert().from_select(
+            ['table_name', 'version', 'updated_at'],
+            sa.select(sa.literal(BULK_KEY), sa.literal(1), sa.literal(now)).where(
+                sa.literal(BULK_KEY).not_in(existing)
+            ),
+        )
+    )
+    for table, prefix in SCOPES:
+        owner = sa.table(table, sa.column('id'))
+        key = sa.literal(prefix) + sa.cast(owner.c.id, sa.String(20))
+        op.execute(
+            table_versions.insert().from_select(
+                ['table_name', 'version', 'updated_at'],
+                sa.select(key, sa.literal(1), sa.literal(now)).where(key.not_in(existing)),
+            )
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Las filas se conservan: la versión anterior las sigue usando (y las creaba al vuelo)
+    pass
@@ -0,0 +1,44 @@
+"""normalize user emails
+
+Revision ID: c6a1d8e3f907
+Revises: b2e7f4a9c518
+Create Date: 2026-10-19 19:58:12.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1d8e3f907'
+down_revision: Union[str, Sequence[str], None] = 'b2e7f4a9c518'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los emails pasan a guardarse sin espacios y en minúsculas (ver User.normalize_email).
+    # Si hay cuentas que solo se diferencian en mayúsculas, el índice único lo impediría:
+    # se aborta indicando cuáles son para que se resuelvan a mano antes de migrar
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        "SELECT LOWER(TRIM(email)) AS normalized, COUNT(*) AS total FROM users "
+        "GROUP BY LOWER(TRIM(email)) HAVING COUNT(*) > 1"
+    )).all()
+    if duplicates:
+        raise RuntimeError(
+            "Emails duplicados al ignorar mayúsculas: "
+            + ", ".join(f"{row.normalized} ({row.total})" for row in duplicates)
+        )
+
+    # Sin WHERE: con la collation por defecto de MySQL (_ci) "A" <> "a" es falso
+    op.execute("UPDATE users SET email = LOWER(TRIM(email))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Las mayúsculas originales no se conservan: no hay nada que deshacer
+    pass
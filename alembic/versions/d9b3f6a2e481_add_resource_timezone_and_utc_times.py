@@ -0,0 +1,124 @@
+"""add resource timezone/opening hours and store reservation times in UTC
+
+Revision ID: d9b3f6a2e481
+Revises: c6a1d8e3f907
+Create Date: 2026-10-19 20:41:36.118024
+
+"""
+import json
+import os
+from datetime import datetime, timezone
+from typing import Sequence, Union
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b3f6a2e481'
+down_revision: Union[str, Sequence[str], None] = 'c6a1d8e3f907'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Zona en la que están guardadas las fechas de las reservas existentes.
+# Hasta ahora se guardaba lo que enviaba el cliente, sin convertir: si los clientes
+# enviaban hora local (p. ej. LEGACY_TIMEZONE=Europe/Madrid) las reservas se pasan a
+# UTC. Con "UTC" (por defecto) las fechas ya están bien y no se reescribe nada.
+LEGACY_TIMEZONE = os.getenv("LEGACY_TIMEZONE", "UTC")
+
+BATCH_SIZE = 1000
+
+reservations = sa.table(
+    'reservations',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('start_time', sa.DateTime),
+    sa.column('end_time', sa.DateTime),
+)
+
+jobs = sa.table(
+    'jobs',
+    sa.column('name', sa.String),
+    sa.column('payload', sa.Text),
+    sa.column('status', sa.String),
+    sa.column('attempts', sa.Integer),
+    sa.column('max_attempts', sa.Integer),
+    sa.column('run_at', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _legacy_to_utc(value: datetime, zone: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _utc_to_legacy(value: datetime, zone: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+
+def _rewrite_reservations(convert) -> None:
+    """
+    Reescribe start_time/end_time por lotes de BATCH_SIZE recorriendo la clave
+    primaria (sin OFFSET), con un UPDATE por lote (executemany).
+    Después encola los trabajos que recalculan lo que se deriva de esas fechas.
+    """
+    conn = op.get_bind()
+    zone = ZoneInfo(LEGACY_TIMEZONE)
+    update = (
+        reservations.update()
+        .where(reservations.c.id == sa.bindparam('row_id'))
+        .values(start_time=sa.bindparam('new_start'), end_time=sa.bindparam('new_end'))
+    )
+
+    last_id, user_ids = 0, set()
+    while True:
+        rows = conn.execute(
+            sa.select(reservations.c.id, reservations.c.user_id, reservations.c.start_time, reservations.c.end_time)
+            .where(reservations.c.id > last_id)
+            .order_by(reservations.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [
+            {'row_id': row.id, 'new_start': convert(row.start_time, zone), 'new_end': convert(row.end_time, zone)}
+            for row in rows
+        ])
+        user_ids.update(row.user_id for row in rows)
+        last_id = rows[-1].id
+
+    # Las franjas ocupadas y los contadores semanales dependen de las fechas:
+    # se regeneran con los trabajos de siempre al arrancar la aplicación
+    now = datetime.utcnow()
+    pending = [('rebuild_reservation_slots', {})] + [
+        ('rebuild_user_usage', {'user_id': user_id}) for user_id in sorted(user_ids)
+    ]
+    if user_ids:
+        conn.execute(jobs.insert(), [
+            {'name': name, 'payload': json.dumps(payload), 'status': 'pending', 'attempts': 0,
+             'max_attempts': 3, 'run_at': now, 'created_at': now}
+            for name, payload in pending
+        ])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('resources', sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+    op.add_column('resources', sa.Column('opens_at', sa.Time(), nullable=True))
+    op.add_column('resources', sa.Column('closes_at', sa.Time(), nullable=True))
+
+    if LEGACY_TIMEZONE != 'UTC':
+        # Los clientes antiguos siguen enviando hora local sin zona: que se interprete igual
+        op.execute(sa.text("UPDATE resources SET timezone = :zone").bindparams(zone=LEGACY_TIMEZONE))
+        _rewrite_reservations(_legacy_to_utc)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if LEGACY_TIMEZONE != 'UTC':
+        _rewrite_reservations(_utc_to_legacy)
+
+    op.drop_column('resources', 'closes_at')
+    op.drop_column('resources', 'opens_at')
+    op.drop_column('resources', 'timezone')
@@ -0,0 +1,48 @@
+"""add audit_log
+
+Revision ID: e2a7c4f9b351
+Revises: b4f8d2e6a917
+Create Date: 2026-10-20 00:12:07.530184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4f9b351'
+down_revision: Union[str, Sequence[str], None] = 'b4f8d2e6a917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('audit_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('tenant_id', sa.String(length=64), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor', sa.String(length=120), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('entity', sa.String(length=64), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('changes', sa.Text(), nullable=False),
+    sa.Column('request', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_audit_log_id'), 'audit_log', ['id'], unique=False)
+    op.create_index(op.f('ix_audit_log_occurred_at'), 'audit_log', ['occurred_at'], unique=False)
+    op.create_index('ix_audit_log_entity_entity_id_id', 'audit_log', ['entity', 'entity_id', 'id'], unique=False)
+    op.create_index('ix_audit_log_actor_id_id', 'audit_log', ['actor_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_log_actor_id_id', table_name='audit_log')
+    op.drop_index('ix_audit_log_entity_entity_id_id', table_name='audit_log')
+    op.drop_index(op.f('ix_audit_log_occurred_at'), table_name='audit_log')
+    op.drop_index(op.f('ix_audit_log_id'), table_name='audit_log')
+    op.drop_table('audit_log')
@@ -0,0 +1,28 @@
+"""add reservations.start_time index
+
+Revision ID: e8c4d1f7a253
+Revises: d5f2b8a3c916
+Create Date: 2026-10-19 16:57:30.482911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4d1f7a253'
+down_revision: Union[str, Sequence[str], None] = 'd5f2b8a3c916'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_reservations_start_time'), 'reservations', ['start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reservations_start_time'), table_name='reservations')
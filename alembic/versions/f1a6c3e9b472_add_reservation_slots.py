@@ -0,0 +1,51 @@
+"""add reservation_slots and postgres overlap exclusion constraint
+
+Revision ID: f1a6c3e9b472
+Revises: e8c4d1f7a253
+Create Date: 2026-10-19 18:05:12.614730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6c3e9b472'
+down_revision: Union[str, Sequence[str], None] = 'e8c4d1f7a253'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Franjas ocupadas (MySQL/SQLite con OVERLAP_MODE=database).
+    # Se rellena con el trabajo rebuild_reservation_slots al activar ese modo
+    op.create_table('reservation_slots',
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('slot_start', sa.DateTime(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ),
+    sa.PrimaryKeyConstraint('resource_id', 'slot_start')
+    )
+    op.create_index(op.f('ix_reservation_slots_reservation_id'), 'reservation_slots', ['reservation_id'], unique=False)
+
+    # En PostgreSQL el solapamiento lo impide directamente una restricción de exclusión.
+    # Falla si ya hay reservas activas solapadas: hay que resolverlas antes de migrar
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            "ALTER TABLE reservations ADD CONSTRAINT ex_reservations_no_overlap "
+            "EXCLUDE USING gist (resource_id WITH =, tsrange(start_time, end_time) WITH &&) "
+            "WHERE (status = 'active')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE reservations DROP CONSTRAINT ex_reservations_no_overlap")
+    op.drop_index(op.f('ix_reservation_slots_reservation_id'), table_name='reservation_slots')
+    op.drop_table('reservation_slots')
@@ -0,0 +1,53 @@
+"""add indexes for resource/category/custom field lookups and archiving
+
+Revision ID: f6d1a8c3e524
+Revises: e2a7c4f9b351
+Create Date: 2026-10-20 00:47:19.362815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.online_migrations import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6d1a8c3e524'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c4f9b351'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# reservations.user_id ya tiene índice (ix_reservations_user_id) y las consultas por
+# sede usan (tenant_id, resource_id|user_id, start_time). Faltan los de las consultas
+# que no filtran por sede o filtran por otras columnas.
+# Se crean sin bloquear escrituras: en producción pueden tardar varios minutos.
+INDEXES = [
+    ('ix_reservations_resource_start', 'reservations', ['resource_id', 'start_time']),
+    ('ix_reservations_status_end', 'reservations', ['status', 'end_time']),
+    ('ix_resources_tenant_category', 'resources', ['tenant_id', 'category_id']),
+    ('ix_custom_fields_resource_id_id', 'custom_fields', ['resource_id', 'id']),
+]
+
+# Claves foráneas que, en MySQL, pasan a usar los índices nuevos (InnoDB borra el que
+# creó automáticamente) y no dejan borrarlos si no hay otro que las cubra
+FOREIGN_KEY_COLUMNS = {
+    'ix_reservations_resource_start': 'resource_id',
+    'ix_custom_fields_resource_id_id': 'resource_id',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        if op.get_context().dialect.name == 'mysql' and name in FOREIGN_KEY_COLUMNS:
+            column = FOREIGN_KEY_COLUMNS[name]
+            create_index_online(f'ix_{table}_{column}_fk', table, [column])
+        drop_index_online(name, table)
@@ -0,0 +1,303 @@
+# app/core/audit.py
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.security import decode_token
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger("app.audit")
+
+# Tablas cuyos cambios se registran
+AUDITED_TABLES = {"users", "resources", "resource_categories", "custom_fields", "reservations"}
+# Campos que se registran como modificados pero sin su valor
+REDACTED_FIELDS = {"hashed_password", "feed_secret"}
+# Contadores que se actualizan solos con cada reserva: no son cambios de nadie
+IGNORED_FIELDS = {"active_reservations"}
+
+
+# -------------------------
+# Quién hace el cambio
+# -------------------------
+
+@dataclass(frozen=True)
+class Actor:
+    id: Optional[int]
+    kind: str                      # "admin", "user", "anonymous", "job:<nombre>" o "system"
+    tenant: str
+    request: Optional[str] = None  # "POST /reservations/"
+
+
+_actor: ContextVar[Optional[Actor]] = ContextVar("audit_actor", default=None)
+
+
+def current_actor() -> Actor:
+    """Actor del contexto actual; fuera de una petición o un trabajo, "system"."""
+    return _actor.get() or Actor(None, "system", config.DEFAULT_TENANT)
+
+
+@contextmanager
+def acting_as(actor: Actor):
+    token = _actor.set(actor)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+class AuditContextMiddleware:
+    """
+    Fija el actor de cada escritura a partir del token (sin consultar la base de
+    datos; si el token no es válido, el endpoint la rechazará igualmente).
+    Es un middleware y no una dependencia: los endpoints síncronos se ejecutan en
+    otro hilo con una copia del contexto, y solo les llega lo fijado antes de llamarlos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.tenant_header = config.TENANT_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        payload, tenant = None, None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    payload = decode_token(token)
+            elif name == self.tenant_header:
+                tenant = value.decode("latin-1")
+
+        subject = str(payload.get("sub", "")) if payload else ""
+        actor = Actor(
+            id=int(subject) if subject.isdigit() else None,
+            kind=payload.get("role", "user") if payload else "anonymous",
+            tenant=tenant or config.DEFAULT_TENANT,
+            request=f"{scope['method']} {scope['path']}"[:255],
+        )
+        with acting_as(actor):
+            await self.app(scope, receive, send)
+
+
+# -------------------------
+# Captura de cambios
+# -------------------------
+
+def _entry(action: str, entity: str, entity_id: Optional[int], changes: dict,
+           tenant: Optional[str] = None) -> dict:
+    actor = current_actor()
+    return {
+        "occurred_at": datetime.utcnow(),
+        "tenant_id": tenant or actor.tenant,
+        "actor_id": actor.id,
+        "actor": actor.kind,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "changes": json.dumps(changes, default=str),
+        "request": actor.request,
+    }
+
+
+def _value(key: str, value):
+    return "***" if key in REDACTED_FIELDS and value is not None else value
+
+
+def _snapshot(state) -> dict:
+    """Columnas cargadas del objeto (sin lanzar consultas en mitad del flush)."""
+    return {
+        attr.key: _value(attr.key, state.dict[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict and attr.key not in IGNORED_FIELDS
+    }
+
+
+def _diff(state):
+    before, after = {}, {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in IGNORED_FIELDS:
+            continue
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        before[attr.key] = _value(attr.key, history.deleted[0] if history.deleted else None)
+        after[attr.key] = _value(attr.key, history.added[0] if history.added else None)
+    return before, after
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session: Session, flush_context) -> None:
+    """Cambios ORM del flush, con los valores antes/después de cada fila."""
+    if not config.AUDIT_ENABLED:
+        return
+    entries = []
+    for action, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in AUDITED_TABLES:
+                continue
+            state = inspect(obj)
+            if action == "create":
+                changes = {"after": _snapshot(state)}
+            elif action == "delete":
+                changes = {"before": _snapshot(state)}
+            else:
+                before, after = _diff(state)
+                if not after:
+                    continue  # solo han cambiado campos ignorados
+                changes = {"before": before, "after": after}
+            entity_id = state.identity[0] if state.identity else getattr(obj, "id", None)
+            entries.append(_entry(action, table, entity_id, changes, getattr(obj, "tenant_id", None)))
+    if entries:
+        session.info.setdefault("audit", []).extend(entries)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_bulk(orm_execute_state):
+    """
+    UPDATE/DELETE masivos (mantenimiento de admin, archivado...): no se sabe qué
+    filas tocan sin leerlas, así que se registra la sentencia y cuántas ha afectado.
+    """
+    if not config.AUDIT_ENABLED or not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = getattr(getattr(orm_execute_state.statement, "table", None), "name", None)
+    if table not in AUDITED_TABLES:
+        return None
+
+    result = orm_execute_state.invoke_statement()
+    session = orm_execute_state.session
+    compiled = orm_execute_state.statement.compile(dialect=session.get_bind().dialect)
+    parameters = orm_execute_state.parameters
+    params = dict(compiled.params, **parameters) if isinstance(parameters, dict) else dict(compiled.params)
+    session.info.setdefault("audit", []).append(_entry(
+        "bulk_update" if orm_execute_state.is_update else "bulk_delete",
+        table, None,
+        {"sql": str(compiled), "params": params, "rows": result.rowcount},
+    ))
+    return result
+
+
+@event.listens_for(Session, "after_commit")
+def _submit(session: Session) -> None:
+    """Solo se registra lo que se confirma; la escritura queda fuera de la petición."""
+    entries = session.info.pop("audit", None)
+    if entries:
+        bind = session.get_bind()
+        writer.submit(getattr(bind, "engine", bind), entries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop("audit", None)
+
+
+# -------------------------
+# Escritura por lotes
+# -------------------------
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Escribe el registro fuera de la petición: un hilo junta las entradas en lotes
+    de hasta AUDIT_BATCH_SIZE (o las que haya tras AUDIT_FLUSH_MS) y las inserta
+    con un solo INSERT por lote y base de datos. Solo inserta, nunca modifica.
+    Si la cola (AUDIT_QUEUE_SIZE commits) se llena, quien confirma escribe sus entradas
+    directamente: más lento, pero no se pierde nada.
+    """
+
+    def __init__(self, batch_size: int = None, flush_ms: int = None, queue_size: int = None):
+        self.batch_size = config.AUDIT_BATCH_SIZE if batch_size is None else batch_size
+        self.flush_seconds = (config.AUDIT_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+        self._queue: "queue.Queue" = queue.Queue(config.AUDIT_QUEUE_SIZE if queue_size is None else queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, engine: Engine, entries: List[dict]) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((engine, entries))
+        except queue.Full:
+            logger.warning("Cola de auditoría llena: se escriben %s entradas en la petición", len(entries))
+            self._write({engine: entries})
+
+    def flush(self) -> None:
+        """Espera a que se haya escrito todo lo enviado hasta ahora."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Escribe lo pendiente y para el hilo (al apagar la aplicación)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: Dict[Engine, List[dict]] = defaultdict(list)
+            taken, stop = 1, item is _STOP
+            if not stop:
+                batch[item[0]].extend(item[1])
+            deadline = time.monotonic() + self.flush_seconds
+            while not stop and sum(len(rows) for rows in batch.values()) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch[item[0]].extend(item[1])
+            self._write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: Dict[Engine, List[dict]]) -> None:
+        for engine, rows in batch.items():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(AuditLog), rows)
+            except Exception:
+                logger.exception("No se pudieron guardar %s entradas de auditoría", len(rows))
+
+
+# Escritor de este proceso (el hilo arranca con la primera entrada)
+writer = AuditWriter()
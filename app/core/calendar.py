@@ -0,0 +1,225 @@
+# app/core/calendar.py
+
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from app.core import config
+from app.core.security import SECRET_KEY
+from app.core.versioning import bulk_key, evaluate_conditional, scoped_key
+from app.models.reservation import Reservation
+from app.models.user import User, new_feed_secret
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+# Filas que se leen de la base de datos (y eventos que se envían) de cada vez
+STREAM_BATCH_SIZE = 500
+
+
+# -------------------------
+# Formato iCalendar (RFC 5545)
+# -------------------------
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _format(moment: datetime) -> str:
+    """Fecha UTC (naive) en formato iCalendar: 20270105T090000Z."""
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _fold(line: str) -> str:
+    """Parte las líneas de más de 75 bytes (continuación con un espacio), sin cortar caracteres UTF-8."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_calendar(title: str, rows: Iterator, summary: Callable, uid_domain: str) -> Iterator[bytes]:
+    """
+    Genera el calendario por trozos: cabecera, un trozo por cada STREAM_BATCH_SIZE
+    eventos y cierre. `rows` tiene id, start_time y end_time (UTC).
+    """
+    stamp = _format(datetime.utcnow())
+    yield "".join([
+        "BEGIN:VCALENDAR\r\n",
+        "VERSION:2.0\r\n",
+        "PRODID:-//Sistema de Reservas//ES\r\n",
+        "CALSCALE:GREGORIAN\r\n",
+        "METHOD:PUBLISH\r\n",
+        _fold("X-WR-CALNAME:" + _escape(title)),
+    ]).encode()
+
+    chunk: List[str] = []
+    for count, row in enumerate(rows, start=1):
+        chunk.extend([
+            "BEGIN:VEVENT\r\n",
+            f"UID:reservation-{row.id}@{uid_domain}\r\n",
+            f"DTSTAMP:{stamp}\r\n",
+            f"DTSTART:{_format(row.start_time)}\r\n",
+            f"DTEND:{_format(row.end_time)}\r\n",
+            _fold("SUMMARY:" + _escape(summary(row))),
+            "STATUS:CONFIRMED\r\n",
+            "END:VEVENT\r\n",
+        ])
+        if count % STREAM_BATCH_SIZE == 0:
+            yield "".join(chunk).encode()
+            chunk = []
+
+    chunk.append("END:VCALENDAR\r\n")
+    yield "".join(chunk).encode()
+
+
+def calendar_window() -> list:
+    """
+    Criterios de la ventana de reservas de un calendario. Van sobre start_time,
+    la última columna de los índices (sede, recurso|usuario, start_time).
+    """
+    now = datetime.utcnow()
+    return [
+        Reservation.start_time >= now - timedelta(days=config.CALENDAR_PAST_DAYS),
+        Reservation.start_time < now + timedelta(days=config.CALENDAR_FUTURE_DAYS),
+        Reservation.status.in_(["active", "completed"]),
+    ]
+
+
+# -------------------------
+# Caché de calendarios generados
+# -------------------------
+
+class FeedCache:
+    """
+    Últimos calendarios generados en este proceso (LRU), guardados con su ETag.
+    El ETag sale de las versiones de las reservas del recurso o usuario: cualquier
+    cambio en ellas da otro ETag y la entrada antigua deja de servirse.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = config.CALENDAR_CACHE_ENTRIES if max_entries is None else max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+feed_cache = FeedCache()
+
+
+def _stream_and_cache(db: Session, query: Query, title: str, summary: Callable,
+                      uid_domain: str, key: str, etag: str) -> Iterator[bytes]:
+    """
+    Recorre la consulta por lotes (sin cargarla entera) mientras se envía.
+    Al terminar guarda el calendario completo en la caché.
+    La sesión es propia del generador: la de la petición puede cerrarse antes.
+    """
+    session = Session(bind=db.get_bind())
+    try:
+        rows = query.with_session(session).yield_per(STREAM_BATCH_SIZE)
+        parts = []
+        for part in iter_calendar(title, rows, summary, uid_domain):
+            parts.append(part)
+            yield part
+        feed_cache.put(key, etag, b"".join(parts))
+    finally:
+        session.close()
+
+
+def calendar_response(request: Request, db: Session, key: str, scope: tuple, title: str,
+                      query: Query, summary: Callable, uid_domain: str) -> Response:
+    """
+    Responde un calendario .ics:
+    - 304 si el cliente ya tiene la versión actual (If-None-Match), con una sola
+      consulta a table_versions
+    - desde la caché si este proceso ya lo generó con las mismas versiones
+    - si no, generándolo en streaming desde la consulta por rango
+    `scope` es (tabla, columna, valor) de las reservas de las que depende.
+    """
+    table, column, value = scope
+    versions = [scoped_key(table, column, value), bulk_key(table), "resources"]
+    # El día forma parte del ETag: la ventana del calendario avanza cada día
+    conditional = evaluate_conditional(request, db, versions, scope=f"{key}:{date.today()}")
+    if conditional.not_modified:
+        return conditional.response_304()
+
+    cached = feed_cache.get(key, conditional.etag)
+    if cached is not None:
+        return conditional.apply(Response(cached, media_type=ICS_MEDIA_TYPE))
+
+    return conditional.apply(StreamingResponse(
+        _stream_and_cache(db, query, title, summary, uid_domain, key, conditional.etag),
+        media_type=ICS_MEDIA_TYPE,
+    ))
+
+
+# -------------------------
+# Enlaces de suscripción
+# -------------------------
+# Las aplicaciones de calendario no envían cabecera Authorization: el calendario
+# personal se pide con un token en la URL, firmado y de solo lectura.
+# La firma incluye un secreto propio del usuario (users.feed_secret): el enlace
+# deja de valer al rotarlo, al revocar las sesiones del usuario y al borrarlo
+# (aunque la base de datos reutilice su id).
+
+def _feed_signature(tenant: str, user_id: int, secret: str) -> str:
+    message = f"calendar:{tenant}:{user_id}:{secret}".encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def feed_token(db: Session, tenant: str, user: User, rotate: bool = False) -> str:
+    """
+    Token de calendario del usuario. Genera el secreto si no tiene (o uno nuevo con
+    `rotate`, que invalida los enlaces anteriores); en ese caso hay que hacer commit.
+    """
+    if rotate or user.feed_secret is None:
+        user.feed_secret = new_feed_secret()
+        db.flush()
+    return f"{user.id}.{_feed_signature(tenant, user.id, user.feed_secret)}"
+
+
+def user_from_feed_token(db: Session, token: str, tenant: str) -> Optional[int]:
+    """ID de usuario de un token de calendario válido para esa sede, o None."""
+    user_id, _, signature = token.partition(".")
+    if not user_id.isdigit():
+        return None
+    secret = db.query(User.feed_secret).filter(User.id == int(user_id)).scalar()
+    if secret is None:
+        return None
+    if not hmac.compare_digest(signature, _feed_signature(tenant, int(user_id), secret)):
+        return None
+    return int(user_id)
@@ -0,0 +1,132 @@
+# app/core/compression.py
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core import config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml")
+
+
+def choose_encoding(accept_encoding: str):
+    """Elige la codificación a partir de Accept-Encoding: br si es posible, si no gzip."""
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if not part.strip().endswith("q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Compresor incremental con la misma interfaz para gzip y brotli."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+            self._process = self._impl.process
+            self._flush = self._impl.flush
+            self._finish = self._impl.finish
+        else:
+            # wbits=31 genera formato gzip (cabecera + CRC)
+            self._impl = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = self._impl.compress
+            self._flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._impl.flush
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._process(data)
+        return out + (self._finish() if final else self._flush())
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compresión gzip/brotli.
+    - Solo comprime tipos de texto/JSON y a partir de `minimum_size` bytes.
+    - Las respuestas en streaming se comprimen por trozos.
+    - No toca respuestas sin cuerpo (204/304) ni las que ya vienen codificadas.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = config.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def compress_send(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                if (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Se retrasa el inicio hasta conocer el tamaño del primer trozo
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+
+                if not more_body:
+                    compressed = compressor.compress(body, final=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed, "more_body": False})
+                    return
+
+                await send(start_message)
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, compress_send)
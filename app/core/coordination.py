@@ -0,0 +1,387 @@
+# app/core/coordination.py
+
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, insert, or_, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.models.coordination_event import CoordinationEvent
+from app.models.coordination_lock import CoordinationLock
+
+logger = logging.getLogger("app.coordination")
+
+# Identifica a este proceso como dueño de bloqueos y origen de avisos
+NODE_ID = uuid.uuid4().hex
+
+# Cada lectura de avisos vuelve a mirar este margen hacia atrás: cubre las
+# transacciones que confirman un poco después de publicar y relojes algo desfasados
+EVENT_OVERLAP = timedelta(seconds=10)
+
+
+def distributed() -> bool:
+    """True si la aplicación corre en varios procesos (COORDINATION_BACKEND=database)."""
+    return config.COORDINATION_BACKEND == "database"
+
+
+def _advisory_key(name: str) -> int:
+    """Clave bigint de los bloqueos consultivos de PostgreSQL para un nombre."""
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+
+
+# -------------------------
+# Bloqueos de transacción
+# -------------------------
+
+# Filas de coordination_locks que ya se sabe que existen, por base de datos
+_known_rows = set()
+
+
+def _ensure_lock_row(engine: Engine, name: str) -> None:
+    """
+    Crea la fila del bloqueo en una transacción aparte (solo la primera vez por proceso).
+    Crearla dentro de la transacción que bloquea puede acabar en interbloqueo en
+    InnoDB: dos transacciones bloquean el hueco y luego las dos intentan insertar.
+    """
+    key = (str(engine.url), name)
+    if key in _known_rows:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(CoordinationLock).values(name=name, updated_at=datetime.utcnow()))
+    except IntegrityError:
+        pass  # la ha creado otro proceso
+    _known_rows.add(key)
+
+
+def lock(db: Session, name: str) -> None:
+    """
+    Bloqueo exclusivo `name` hasta el final de la transacción de `db` (COMMIT o
+    ROLLBACK), compartido por todos los procesos y nodos que usan esa base de datos:
+    - PostgreSQL: pg_advisory_xact_lock
+    - MySQL, SQLite...: UPDATE de la fila `name` de coordination_locks (bloqueo de
+      fila en InnoDB; en SQLite, el de escritura de toda la base)
+    GET_LOCK de MySQL no sirve aquí: pertenece a la conexión y sobrevive al COMMIT.
+    Hay que llamarlo antes de escribir nada en la transacción, y las lecturas que
+    protege deben hacerse con with_for_update(): en MySQL (REPEATABLE READ) una
+    lectura normal ve la instantánea tomada en la primera consulta de la transacción,
+    aunque sea anterior al bloqueo, y no lo que confirmó quien lo tenía antes.
+    """
+    engine = db.get_bind()
+    if engine.dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _advisory_key(name)})
+        return
+    _ensure_lock_row(engine, name)
+    db.execute(
+        update(CoordinationLock)
+        .where(CoordinationLock.name == name)
+        .values(updated_at=datetime.utcnow())
+    )
+
+
+def resource_lock_name(resource_id: int) -> str:
+    return f"reservations:resource:{resource_id}"
+
+
+# -------------------------
+# Bloqueos de líder
+# -------------------------
+
+class LeaderLock:
+    """
+    Bloqueo que tiene como mucho un proceso a la vez, mientras siga vivo:
+    - PostgreSQL (pg_try_advisory_lock) y MySQL (GET_LOCK) sobre una conexión
+      propia que se mantiene abierta: si el proceso muere, la base lo libera sola.
+    - Otras bases (SQLite): la fila de coordination_locks con dueño y caducidad
+      (COORDINATION_LEASE_SECONDS), que el líder renueva.
+    """
+
+    def __init__(self, engine: Engine, name: str, lease_seconds: int = None):
+        self.engine = engine
+        self.name = name
+        self.lease = timedelta(seconds=config.COORDINATION_LEASE_SECONDS if lease_seconds is None else lease_seconds)
+        self._conn: Optional[Connection] = None
+
+    @property
+    def session_level(self) -> bool:
+        return self.engine.dialect.name in ("postgresql", "mysql")
+
+    def acquire(self) -> bool:
+        """Intenta hacerse con el bloqueo sin esperar. True si lo tiene."""
+        if not self.session_level:
+            return self._claim_lease()
+
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            if self.engine.dialect.name == "postgresql":
+                held = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _advisory_key(self.name)}).scalar()
+            else:
+                held = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}).scalar() == 1
+        except Exception:
+            conn.close()
+            raise
+        if not held:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def renew(self) -> bool:
+        """Comprueba (y en SQLite prolonga) el bloqueo. False si se ha perdido."""
+        if not self.session_level:
+            return self._claim_lease()
+        if self._conn is None:
+            return False
+        try:
+            if self.engine.dialect.name == "mysql":
+                held = self._conn.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.name}
+                ).scalar() == 1
+            else:
+                # El bloqueo de sesión dura lo que la conexión
+                held = self._conn.execute(text("SELECT 1")).scalar() == 1
+        except Exception:
+            logger.warning("Conexión del bloqueo de líder %s perdida", self.name, exc_info=True)
+            held = False
+        if not held:
+            self._close()
+        return held
+
+    def release(self) -> None:
+        if not self.session_level:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(CoordinationLock)
+                    .where(CoordinationLock.name == self.name, CoordinationLock.owner == NODE_ID)
+                    .values(owner=None, expires_at=None, updated_at=datetime.utcnow())
+                )
+            return
+        if self._conn is None:
+            return
+        try:
+            if self.engine.dialect.name == "postgresql":
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _advisory_key(self.name)})
+            else:
+                self._conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+        except Exception:
+            logger.warning("No se pudo liberar el bloqueo de líder %s", self.name, exc_info=True)
+        self._close()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _claim_lease(self) -> bool:
+        _ensure_lock_row(self.engine, self.name)
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(CoordinationLock)
+                .where(
+                    CoordinationLock.name == self.name,
+                    or_(
+                        CoordinationLock.owner.is_(None),
+                        CoordinationLock.owner == NODE_ID,
+                        CoordinationLock.expires_at < now,
+                    ),
+                )
+                .values(owner=NODE_ID, expires_at=now + self.lease, updated_at=now)
+            )
+        return result.rowcount == 1
+
+
+class LeaderService:
+    """
+    Ejecuta un servicio (objeto con start/stop) solo en el proceso que tiene el
+    bloqueo de líder `name`. Los demás lo intentan cada COORDINATION_LEADER_RETRY_SECONDS;
+    si el líder se para, muere o pierde la conexión, otro toma el relevo con una
+    instancia nueva creada por `factory`.
+    Con COORDINATION_BACKEND=local este proceso es siempre el líder.
+    """
+
+    def __init__(self, name: str, factory: Callable, engine: Optional[Engine] = None,
+                 retry_seconds: float = None):
+        self.name = name
+        self.factory = factory
+        self.engine = engine
+        self.retry_seconds = config.COORDINATION_LEADER_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self.service = None
+        self._lock: Optional[LeaderLock] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.service is not None
+
+    def start(self) -> None:
+        if not distributed():
+            self._become_leader()
+            return
+        if self.engine is None:
+            from app.database import get_engine
+            self.engine = get_engine()
+        self._lock = LeaderLock(self.engine, f"leader:{self.name}")
+        self._thread = threading.Thread(target=self._loop, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._step_down()
+        if self._lock is not None:
+            self._lock.release()
+
+    def _become_leader(self) -> None:
+        self.service = self.factory()
+        self.service.start()
+
+    def _step_down(self) -> None:
+        if self.service is not None:
+            self.service.stop()
+            self.service = None
+
+    def _loop(self) -> None:
+        # Con lease, el líder renueva más a menudo de lo que caduca el bloqueo
+        renew_every = min(self.retry_seconds, self._lock.lease.total_seconds() / 3)
+        while not self._stop.is_set():
+            try:
+                if self.service is None:
+                    if self._lock.acquire():
+                        logger.info("Este proceso es el líder de %s", self.name)
+                        self._become_leader()
+                elif not self._lock.renew():
+                    logger.warning("Este proceso ha dejado de ser el líder de %s", self.name)
+                    self._step_down()
+            except Exception:
+                logger.exception("Error en la elección de líder de %s", self.name)
+            self._stop.wait(renew_every if self.service is not None else self.retry_seconds)
+
+
+# -------------------------
+# Avisos entre procesos
+# -------------------------
+
+class Broadcast:
+    """
+    Canal de avisos para mantener coherentes las cachés en memoria de cada proceso
+    (lista de tokens revocados, heap de recordatorios...).
+    `publish` se llama dentro de la transacción que origina el cambio: el aviso
+    solo se entrega si se confirma.
+    - En este proceso se entrega en el after_commit, sin esperas.
+    - Con COORDINATION_BACKEND=database se guarda además en coordination_events,
+      de donde lo leen los demás procesos cada COORDINATION_POLL_MS (por el índice
+      de created_at, en cada base de datos: principal y shards).
+    """
+
+    def __init__(self, poll_ms: int = None):
+        self.poll_ms = config.COORDINATION_POLL_MS if poll_ms is None else poll_ms
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._since: Dict[str, datetime] = {}            # base -> created_at desde el que ya se ha leído
+        self._seen: Dict[str, Dict[int, datetime]] = {}  # base -> avisos ya entregados dentro del margen
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, channel: str, handler: Callable[[dict], None]) -> None:
+        self._handlers[channel].append(handler)
+
+    def publish(self, db: Session, channel: str, payload: dict) -> None:
+        # Los suscriptores reciben siempre lo mismo, venga de este proceso o de otro
+        # (las fechas, como texto ISO)
+        encoded = json.dumps(payload, default=str)
+        if distributed():
+            db.add(CoordinationEvent(origin=NODE_ID, channel=channel, payload=encoded, created_at=datetime.utcnow()))
+        db.info.setdefault("broadcast", []).append((channel, json.loads(encoded)))
+
+    def deliver(self, channel: str, payload: dict) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Error al procesar un aviso de %s", channel)
+
+    # -------------------------
+    # Lectura de los avisos de otros procesos
+    # -------------------------
+
+    def start(self) -> None:
+        if not distributed():
+            return
+        self.poll()  # fija el punto de partida: solo interesan los avisos a partir de ahora
+        self._thread = threading.Thread(target=self._loop, name="coordination-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_ms / 1000):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("No se pudieron leer los avisos de otros procesos")
+
+    def poll(self) -> None:
+        from app.database import all_engines
+
+        for source, engine in all_engines().items():
+            started = datetime.utcnow()
+            since = self._since.get(source)
+            if since is None:
+                self._since[source] = started
+                self._seen[source] = {}
+                continue
+
+            with Session(bind=engine) as db:
+                rows = db.query(
+                    CoordinationEvent.id, CoordinationEvent.channel,
+                    CoordinationEvent.payload, CoordinationEvent.created_at,
+                ).filter(
+                    CoordinationEvent.created_at >= since - EVENT_OVERLAP,
+                    CoordinationEvent.origin != NODE_ID,
+                ).order_by(CoordinationEvent.id).all()
+
+            seen = self._seen[source]
+            for row in rows:
+                if row.id in seen:
+                    continue
+                seen[row.id] = row.created_at
+                self.deliver(row.channel, json.loads(row.payload))
+
+            cutoff = started - EVENT_OVERLAP
+            for event_id in [event_id for event_id, created in seen.items() if created < cutoff]:
+                del seen[event_id]
+            self._since[source] = started
+
+
+# Canal de este proceso
+broadcast = Broadcast()
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_local(session: Session) -> None:
+    """Los avisos publicados en la transacción se entregan en este proceso al confirmarla."""
+    for channel, payload in session.info.pop("broadcast", ()):
+        broadcast.deliver(channel, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_local(session: Session) -> None:
+    session.info.pop("broadcast", None)
@@ -0,0 +1,236 @@
+# app/core/idempotency.py
+
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app import database
+from app.core import config
+from app.core.rate_limit import user_from_scope
+from app.models.idempotency_key import IdempotencyKey
+
+HEADER = b"idempotency-key"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# Rutas con soporte de Idempotency-Key: las escrituras de recursos y reservas.
+# Nunca las que emiten credenciales (/auth/*, /users/me/calendar-token): su respuesta
+# (tokens) quedaría guardada en claro y se devolvería a quien repitiera la clave.
+IDEMPOTENT_PATHS = ("/reservations", "/resources", "/categories", "/admin/resources", "/admin/reservations")
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _request_hash(scope, body: bytes) -> str:
+    """Huella de la petición: un reintento legítimo debe ser idéntico."""
+    digest = hashlib.sha256()
+    digest.update(scope["method"].encode())
+    digest.update(scope["path"].encode())
+    digest.update(scope.get("query_string", b""))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI que da soporte a la cabecera Idempotency-Key en las escrituras.
+    - Primera petición: reserva la clave en la tabla (INSERT con índice único, así que
+      vale entre procesos), se ejecuta normalmente y se guarda la respuesta.
+    - Reintento con la misma clave y la misma petición: se devuelve la respuesta
+      guardada sin volver a ejecutar el endpoint (ni consultas ni commit).
+    - Misma clave con una petición distinta: 422.
+    - Misma clave mientras la original sigue en curso (en cualquier proceso): 409.
+    Solo se aplica a IDEMPOTENT_PATHS; en el resto de rutas la cabecera se ignora.
+    Solo se guardan las respuestas 2xx y los 4xx que se repetirían igual (STORED_CLIENT_ERRORS).
+    Con 401, 403, 429 o 5xx la clave se libera para que el cliente pueda reintentar.
+    """
+
+    # Errores que dependen solo de la petición: reejecutarla daría el mismo resultado.
+    # 404 no: el recurso puede crearse después y el reintento debe encontrarlo
+    STORED_CLIENT_ERRORS = frozenset({400, 405, 409, 410, 413, 415, 422})
+
+    def __init__(self, app, ttl_seconds: int = None, paths=IDEMPOTENT_PATHS):
+        self.app = app
+        self.paths = tuple(paths)
+        self.ttl = timedelta(seconds=ttl_seconds or config.IDEMPOTENCY_TTL_SECONDS)
+        self.claim_ttl = timedelta(seconds=config.IDEMPOTENCY_CLAIM_SECONDS)
+        self._last_eviction = 0.0
+
+    def _stored(self, status_code: int) -> bool:
+        return 200 <= status_code < 300 or status_code in self.STORED_CLIENT_ERRORS
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in WRITE_METHODS
+                or not scope["path"].startswith(self.paths)):
+            await self.app(scope, receive, send)
+            return
+
+        key = _header(scope, HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > 255:
+            await JSONResponse(status_code=400, content={"detail": "Idempotency-Key demasiado larga"})(scope, receive, send)
+            return
+
+        # Leer el cuerpo completo para calcular la huella y poder reenviarlo al endpoint
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        sub = user_from_scope(scope)
+        client = scope.get("client")
+        tenant = _header(scope, config.TENANT_HEADER.lower().encode()) or config.DEFAULT_TENANT
+        owner = f"{tenant}/" + (f"user:{sub}" if sub else "ip:" + (client[0] if client else "unknown"))
+        request_hash = _request_hash(scope, body)
+
+        claimed, stored = await run_in_threadpool(self._claim, owner, key, request_hash)
+        if not claimed:
+            if stored is not None and stored.request_hash != request_hash:
+                response = JSONResponse(
+                    status_code=422,
+                    content={"detail": "La Idempotency-Key ya se usó con una petición distinta"},
+                )
+            elif stored is None or stored.status_code is None:
+                response = JSONResponse(
+                    status_code=409,
+                    content={"detail": "Ya hay una petición en curso con esta Idempotency-Key"},
+                )
+            else:
+                response = Response(
+                    content=stored.response_body.encode(),
+                    status_code=stored.status_code,
+                    media_type=stored.content_type,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            await response(scope, receive, send)
+            return
+
+        completed = False
+        try:
+            captured = {"status": 500, "headers": [], "body": b""}
+
+            async def replay_receive():
+                nonlocal body
+                chunk, body = body, b""
+                return {"type": "http.request", "body": chunk, "more_body": False}
+
+            async def capture_send(message):
+                if message["type"] == "http.response.start":
+                    captured["status"] = message["status"]
+                    captured["headers"] = message.get("headers", [])
+                elif message["type"] == "http.response.body":
+                    captured["body"] += message.get("body", b"")
+                await send(message)
+
+            await self.app(scope, replay_receive, capture_send)
+
+            if self._stored(captured["status"]):
+                content_type = next(
+                    (v.decode("latin-1") for k, v in captured["headers"] if k == b"content-type"), None
+                )
+                await run_in_threadpool(
+                    self._complete, owner, key,
+                    captured["status"], content_type, captured["body"],
+                )
+                completed = True
+        finally:
+            if not completed:
+                await run_in_threadpool(self._release, owner, key)
+
+    # -------------------------
+    # Acceso a la tabla (se ejecuta en el threadpool)
+    # -------------------------
+
+    def _claim(self, owner: str, key: str, request_hash: str):
+        """
+        Reserva la clave antes de ejecutar el endpoint. El índice único (owner, key)
+        garantiza que solo una petición la consigue, aunque lleguen a procesos distintos.
+        Devuelve (True, None) si se ha reservado o (False, fila existente); la fila es
+        None si la otra petición acaba de liberarla.
+        """
+        now = datetime.utcnow()
+        db = database.SessionLocal()
+        try:
+            # Una clave caducada (o reservada por un proceso que no terminó) se sustituye
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now,
+            ).delete()
+            db.add(IdempotencyKey(
+                owner=owner,
+                key=key,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + self.claim_ttl,
+            ))
+            db.commit()
+            return True, None
+        except IntegrityError:
+            db.rollback()
+            return False, db.query(IdempotencyKey).filter(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+            ).first()
+        finally:
+            db.close()
+
+    def _complete(self, owner, key, status_code, content_type, body: bytes):
+        """Guarda la respuesta en la reserva de la clave."""
+        now = datetime.utcnow()
+        db = database.SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+            ).update({
+                IdempotencyKey.status_code: status_code,
+                IdempotencyKey.content_type: content_type,
+                IdempotencyKey.response_body: body.decode("utf-8", errors="replace"),
+                IdempotencyKey.expires_at: now + self.ttl,
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        if time.monotonic() - self._last_eviction >= config.IDEMPOTENCY_EVICT_INTERVAL_SECONDS:
+            self._last_eviction = time.monotonic()
+            self.evict_expired()
+
+    def _release(self, owner: str, key: str) -> None:
+        """Libera la reserva sin guardar respuesta: el cliente puede reintentar."""
+        db = database.SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.owner == owner,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def evict_expired(self) -> int:
+        """Borra las claves caducadas. Devuelve cuántas se han eliminado."""
+        db = database.SessionLocal()
+        try:
+            deleted = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
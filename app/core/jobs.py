@@ -0,0 +1,206 @@
+# app/core/jobs.py
+
+import json
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import config
+from app.core.audit import Actor, acting_as
+from app.models.job import Job
+
+logger = logging.getLogger("app.jobs")
+
+# Nombre del trabajo -> función(db, payload)
+_handlers: Dict[str, Callable[[Session, dict], None]] = {}
+
+# Runner activo en este proceso (si lo hay), para despertarlo al encolar
+_runner: Optional["JobRunner"] = None
+
+
+def job(name: str):
+    """
+    Decorador que registra una función como trabajo diferido.
+    La función recibe una sesión propia y el payload; el runner hace commit al terminar.
+    """
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(db: Session, name: str, payload: Optional[dict] = None,
+            run_at: Optional[datetime] = None, max_attempts: int = 3) -> Job:
+    """
+    Añade un trabajo en la transacción de `db`. Se ejecutará cuando se haga commit;
+    si la transacción se deshace, el trabajo desaparece con ella.
+    """
+    entry = Job(
+        name=name,
+        payload=json.dumps(payload or {}, default=str),
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=run_at or datetime.utcnow(),
+    )
+    db.add(entry)
+    db.info["jobs_enqueued"] = True
+    return entry
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_runner(session: Session) -> None:
+    """Despierta a los trabajadores en cuanto se confirma un trabajo nuevo."""
+    if session.info.pop("jobs_enqueued", False) and _runner is not None:
+        _runner.wake()
+
+
+class JobRunner:
+    """
+    Pool de hilos que ejecuta los trabajos de la tabla `jobs`.
+    - Reclama cada trabajo con un UPDATE condicional (seguro con varios procesos).
+    - Reintenta con espera exponencial hasta `max_attempts`.
+    - Al arrancar recupera los trabajos que quedaron "running" tras una caída.
+    Se le pasan todos los engines (principal y shards): cada trabajo se ejecuta
+    contra la base de datos en la que se encoló.
+    """
+
+    def __init__(self, engines: List[Engine], workers: int = None,
+                 poll_interval: float = None, lease_seconds: int = None):
+        self.sessions = [sessionmaker(bind=engine, autoflush=False) for engine in engines]
+        self.workers = config.JOB_WORKERS if workers is None else workers
+        self.poll_interval = config.JOB_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self.lease = timedelta(seconds=config.JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds)
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # -------------------------
+    # Ciclo de vida
+    # -------------------------
+
+    def start(self) -> None:
+        global _runner
+        if self.workers <= 0:
+            return
+        self.recover_stale()
+        _runner = self
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        global _runner
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        if _runner is self:
+            _runner = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def recover_stale(self) -> None:
+        """Vuelve a poner en cola los trabajos cuyo trabajador murió a mitad."""
+        cutoff = datetime.utcnow() - self.lease
+        for factory in self.sessions:
+            with factory() as db:
+                db.execute(
+                    update(Job)
+                    .where(Job.status == "running", Job.locked_at < cutoff)
+                    .values(status="pending", locked_at=None)
+                )
+                db.commit()
+
+    # -------------------------
+    # Ejecución
+    # -------------------------
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_pending()
+            except Exception:
+                logger.exception("Error en el bucle de trabajos")
+                ran = 0
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_pending(self, limit: int = 10) -> int:
+        """Reclama y ejecuta hasta `limit` trabajos pendientes. Devuelve cuántos ha ejecutado."""
+        ran = 0
+        for factory in self.sessions:
+            while ran < limit and not self._stop.is_set():
+                claimed = self._claim(factory)
+                if claimed is None:
+                    break
+                self._execute(factory, claimed)
+                ran += 1
+        return ran
+
+    def _claim(self, factory) -> Optional[Job]:
+        now = datetime.utcnow()
+        with factory() as db:
+            candidates = db.query(Job.id).filter(
+                Job.status == "pending",
+                Job.run_at <= now,
+            ).order_by(Job.run_at).limit(5).all()
+
+            for (job_id,) in candidates:
+                # Solo uno de los trabajadores (de cualquier proceso) gana el UPDATE
+                result = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "pending")
+                    .values(status="running", locked_at=now, attempts=Job.attempts + 1)
+                )
+                db.commit()
+                if result.rowcount == 1:
+                    claimed = db.get(Job, job_id)
+                    db.expunge(claimed)
+                    return claimed
+        return None
+
+    def _execute(self, factory, entry: Job) -> None:
+        handler = _handlers.get(entry.name)
+        error = None
+
+        if handler is None:
+            error = f"Trabajo desconocido: {entry.name}"
+        else:
+            # Los cambios del trabajo se auditan a su nombre
+            with factory() as db, acting_as(Actor(None, f"job:{entry.name}", config.DEFAULT_TENANT)):
+                try:
+                    handler(db, json.loads(entry.payload or "{}"))
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    error = traceback.format_exc()
+
+        now = datetime.utcnow()
+        if error is None:
+            values = {"status": "done", "finished_at": now, "locked_at": None, "last_error": None}
+        elif entry.attempts < entry.max_attempts:
+            logger.warning("Trabajo %s #%s falló (intento %s), se reintentará", entry.name, entry.id, entry.attempts)
+            values = {
+                "status": "pending",
+                "locked_at": None,
+                "run_at": now + timedelta(seconds=10 * 2 ** entry.attempts),
+                "last_error": error,
+            }
+        else:
+            logger.error("Trabajo %s #%s descartado tras %s intentos", entry.name, entry.id, entry.attempts)
+            values = {"status": "failed", "finished_at": now, "locked_at": None, "last_error": error}
+
+        with factory() as db:
+            db.execute(update(Job).where(Job.id == entry.id).values(**values))
+            db.commit()
@@ -0,0 +1,297 @@
+# app/core/loaders.py
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import bad_request
+from app.models.custom_field import CustomField
+from app.models.reservation import Reservation
+from app.models.resource import Resource
+from app.models.resource_category import ResourceCategory
+from app.models.user import User
+
+# Tamaño máximo de cada IN al cargar relaciones
+LOAD_CHUNK_SIZE = 500
+
+
+# -------------------------
+# Dataloaders por petición
+# -------------------------
+
+class DataLoader:
+    """
+    Carga filas por clave agrupando todas las claves pedidas en un único IN
+    (por trozos de LOAD_CHUNK_SIZE) y las cachea durante la petición.
+    Si la misma relación aparece en varios sitios (por ejemplo, el recurso de
+    cien reservas) se consulta una sola vez.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Dict[Any, Any]], default_factory: Callable[[], Any] = lambda: None):
+        self.batch_fn = batch_fn
+        self.default_factory = default_factory
+        self._cache: Dict[Any, Any] = {}
+
+    def load_many(self, keys: Iterable[Any]) -> Dict[Any, Any]:
+        keys = [key for key in keys if key is not None]
+        missing = [key for key in dict.fromkeys(keys) if key not in self._cache]
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            chunk = missing[start:start + LOAD_CHUNK_SIZE]
+            found = self.batch_fn(chunk)
+            for key in chunk:
+                self._cache[key] = found[key] if key in found else self.default_factory()
+        return {key: self._cache[key] for key in keys}
+
+
+def _rows_by_id(rows) -> Dict[Any, dict]:
+    return {row.id: row._asdict() for row in rows}
+
+
+class Loaders:
+    """Loaders de una petición. Se crean al usarse por primera vez."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._loaders: Dict[str, DataLoader] = {}
+
+    def get(self, name: str) -> DataLoader:
+        if name not in self._loaders:
+            self._loaders[name] = getattr(self, f"_build_{name}")()
+        return self._loaders[name]
+
+    def _build_categories(self) -> DataLoader:
+        return DataLoader(lambda ids: _rows_by_id(
+            self.db.query(*ENTITIES["category"].column_list()).filter(ResourceCategory.id.in_(ids))
+        ))
+
+    def _build_resources(self) -> DataLoader:
+        return DataLoader(lambda ids: _rows_by_id(
+            self.db.query(*ENTITIES["resource"].column_list()).filter(Resource.id.in_(ids))
+        ))
+
+    def _build_users(self) -> DataLoader:
+        return DataLoader(lambda ids: _rows_by_id(
+            self.db.query(*ENTITIES["user"].column_list()).filter(User.id.in_(ids))
+        ))
+
+    def _build_custom_fields(self) -> DataLoader:
+        def batch(resource_ids):
+            fields = defaultdict(list)
+            rows = self.db.query(
+                CustomField.resource_id, *ENTITIES["custom_field"].column_list()
+            ).filter(CustomField.resource_id.in_(resource_ids)).order_by(CustomField.id)
+            for row in rows:
+                values = row._asdict()
+                fields[values.pop("resource_id")].append(values)
+            return fields
+        return DataLoader(batch, default_factory=list)
+
+
+# -------------------------
+# Entidades que se pueden pedir con ?fields=
+# -------------------------
+
+@dataclass
+class Relation:
+    target: str         # entidad relacionada
+    key: str            # campo de la fila cuyo valor se pasa al loader
+    loader: str         # nombre del loader en Loaders
+    many: bool = False
+
+
+@dataclass
+class EntitySpec:
+    table: str
+    columns: Dict[str, Any]
+    relations: Dict[str, Relation] = field(default_factory=dict)
+    # Campos que se devuelven cuando se pide la entidad sin subcampos
+    default: Tuple[str, ...] = ()
+
+    def column_list(self) -> list:
+        return [column.label(name) for name, column in self.columns.items()]
+
+
+ENTITIES: Dict[str, EntitySpec] = {
+    "category": EntitySpec(
+        table="resource_categories",
+        columns={"id": ResourceCategory.id, "name": ResourceCategory.name},
+        default=("id", "name"),
+    ),
+    "custom_field": EntitySpec(
+        table="custom_fields",
+        columns={"id": CustomField.id, "key": CustomField.key, "value": CustomField.value},
+        default=("id", "key", "value"),
+    ),
+    "resource": EntitySpec(
+        table="resources",
+        columns={
+            "id": Resource.id,
+            "name": Resource.name,
+            "description": Resource.description,
+            "is_active": Resource.is_active,
+            "slot_minutes": Resource.slot_minutes,
+            "timezone": Resource.timezone,
+            "opens_at": Resource.opens_at,
+            "closes_at": Resource.closes_at,
+            "category_id": Resource.category_id,
+        },
+        relations={
+            "category": Relation(target="category", key="category_id", loader="categories"),
+            "custom_fields": Relation(target="custom_field", key="id", loader="custom_fields", many=True),
+        },
+        default=(
+            "id", "name", "description", "is_active", "slot_minutes",
+            "timezone", "opens_at", "closes_at", "category", "custom_fields",
+        ),
+    ),
+    "user": EntitySpec(
+        table="users",
+        columns={"id": User.id, "email": User.email, "role": User.role},
+        default=("id", "email", "role"),
+    ),
+    "reservation": EntitySpec(
+        table="reservations",
+        columns={
+            "id": Reservation.id,
+            "user_id": Reservation.user_id,
+            "resource_id": Reservation.resource_id,
+            "start_time": Reservation.start_time,
+            "end_time": Reservation.end_time,
+            "status": Reservation.status,
+        },
+        relations={
+            "resource": Relation(target="resource", key="resource_id", loader="resources"),
+            "user": Relation(target="user", key="user_id", loader="users"),
+        },
+        default=("id", "user_id", "resource_id", "start_time", "end_time", "status"),
+    ),
+}
+
+# Selección: campo -> None (campo simple o relación con sus campos por defecto)
+#                   o dict (relación con subcampos)
+Selection = Dict[str, Optional[dict]]
+
+
+def parse_fields(raw: str, entity: str) -> Selection:
+    """
+    Convierte "id,name,category.name" en {"id": None, "name": None, "category": {"name": None}}.
+    Las relaciones se recorren con puntos. Lanza 400 con cualquier campo desconocido.
+    """
+    selection: Selection = {}
+    for part in raw.split(","):
+        path = part.strip()
+        if not path:
+            continue
+
+        node, spec = selection, ENTITIES[entity]
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            if name not in spec.columns and name not in spec.relations:
+                raise bad_request(f"Campo desconocido: {path}")
+            if depth == len(names) - 1:
+                node.setdefault(name, None)
+                break
+            if name not in spec.relations:
+                raise bad_request(f"{name} no es una relación: {path}")
+            if not isinstance(node.get(name), dict):
+                node[name] = {}
+            node, spec = node[name], ENTITIES[spec.relations[name].target]
+
+    if not selection:
+        raise bad_request("El parámetro fields está vacío")
+    return selection
+
+
+def selection_tables(entity: str, selection: Optional[Selection]) -> List[str]:
+    """Tablas de las que depende la respuesta (para calcular el ETag)."""
+    spec = ENTITIES[entity]
+    selection = _expand(spec, selection)
+    tables = [spec.table]
+    for name, sub in selection.items():
+        if name in spec.relations:
+            for table in selection_tables(spec.relations[name].target, sub):
+                if table not in tables:
+                    tables.append(table)
+    return tables
+
+
+def selection_key(selection: Selection) -> str:
+    """Representación estable de una selección (para el ámbito del ETag)."""
+    return ",".join(
+        name if sub is None else f"{name}({selection_key(sub)})"
+        for name, sub in sorted(selection.items())
+    )
+
+
+# -------------------------
+# Resolución
+# -------------------------
+
+def _expand(spec: EntitySpec, selection: Optional[Selection]) -> Selection:
+    return {name: None for name in spec.default} if selection is None else selection
+
+
+def _resolve(loaders: Loaders, entity: str, rows: List[dict], selection: Optional[Selection]) -> List[dict]:
+    """
+    Proyecta `rows` sobre la selección. Cada relación se carga con su loader
+    una sola vez para todas las filas del nivel (y sus hijas se resuelven juntas),
+    así que el número de consultas depende de la selección y no de las filas.
+    """
+    spec = ENTITIES[entity]
+    selection = _expand(spec, selection)
+
+    related = {}
+    for name, sub in selection.items():
+        relation = spec.relations.get(name)
+        if relation is None:
+            continue
+        loaded = loaders.get(relation.loader).load_many(row[relation.key] for row in rows)
+
+        # Filas hijas distintas (una misma fila puede colgar de varios padres)
+        children = {}
+        for value in loaded.values():
+            for child in (value if relation.many else [value]):
+                if child is not None:
+                    children[id(child)] = child
+        resolved = _resolve(loaders, relation.target, list(children.values()), sub)
+        projected = {key: item for key, item in zip(children.keys(), resolved)}
+        related[name] = (relation, loaded, projected)
+
+    items = []
+    for row in rows:
+        # El id se devuelve siempre para poder identificar cada elemento
+        item = {"id": row["id"]}
+        for name in selection:
+            if name in related:
+                relation, loaded, projected = related[name]
+                value = loaded.get(row[relation.key])
+                if relation.many:
+                    item[name] = [projected[id(child)] for child in value or []]
+                else:
+                    item[name] = projected[id(value)] if value is not None else None
+            else:
+                item[name] = row[name]
+        items.append(item)
+    return items
+
+
+def fetch_sparse(db: Session, entity: str, selection: Selection, *criteria) -> List[Dict[str, Any]]:
+    """
+    Devuelve la entidad como dicts solo con los campos pedidos.
+    La consulta principal trae únicamente las columnas necesarias; cada relación
+    pedida añade una consulta (IN) gracias a los loaders de la petición.
+    """
+    spec = ENTITIES[entity]
+    needed = ["id"]
+    for name in selection:
+        column = spec.relations[name].key if name in spec.relations else name
+        if column not in needed:
+            needed.append(column)
+
+    rows = [
+        row._asdict()
+        for row in db.query(*[spec.columns[name].label(name) for name in needed]).filter(*criteria)
+    ]
+    return _resolve(Loaders(db), entity, rows, selection)
@@ -0,0 +1,153 @@
+# app/core/online_migrations.py
+
+import logging
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.core import config
+
+# Operaciones para las migraciones de Alembic sobre tablas grandes en producción.
+# Un CREATE INDEX o un UPDATE de toda la tabla en una sola transacción bloquea
+# las escrituras (o las hace esperar) durante minutos. Estas funciones:
+# - crean y borran índices sin bloquear escrituras (CONCURRENTLY en PostgreSQL,
+#   ALGORITHM=INPLACE, LOCK=NONE en MySQL); en SQLite, como siempre
+# - rellenan datos por lotes de la clave primaria, confirmando cada lote y
+#   descansando entre ellos (MIGRATION_BATCH_SIZE, MIGRATION_THROTTLE_PERCENT)
+# - no hacen cola detrás de transacciones largas: si no obtienen el bloqueo en
+#   MIGRATION_LOCK_TIMEOUT_SECONDS se rinden y lo reintentan más tarde
+#
+# Se ejecutan fuera de la transacción de la migración (autocommit): lo anterior
+# de la misma migración queda confirmado al llegar a ellas.
+
+logger = logging.getLogger("alembic.online")
+
+
+def _set_lock_timeout(conn) -> None:
+    seconds = config.MIGRATION_LOCK_TIMEOUT_SECONDS
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"SET lock_timeout = '{seconds}s'")
+    elif conn.dialect.name == "mysql":
+        conn.exec_driver_sql(f"SET SESSION lock_wait_timeout = {seconds}")
+
+
+def _with_retries(action: Callable[[], None], what: str) -> None:
+    """Reintenta `action` con espera creciente si no consigue el bloqueo a tiempo."""
+    for attempt in range(1, config.MIGRATION_DDL_RETRIES + 1):
+        try:
+            action()
+            return
+        except sa.exc.OperationalError:
+            if attempt == config.MIGRATION_DDL_RETRIES:
+                raise
+            wait = 2 ** attempt
+            logger.warning("%s: tabla ocupada (intento %s), se reintenta en %s s", what, attempt, wait)
+            time.sleep(wait)
+
+
+def _throttle(started: float) -> None:
+    time.sleep((time.monotonic() - started) * config.MIGRATION_THROTTLE_PERCENT / 100)
+
+
+# -------------------------
+# Índices
+# -------------------------
+
+def create_index_online(name: str, table: str, columns: Sequence[str], unique: bool = False) -> None:
+    """
+    Crea un índice sin bloquear las escrituras en la tabla mientras se construye.
+    En PostgreSQL, un intento fallido deja un índice inválido: se borra antes de reintentar.
+    """
+    context = op.get_context()
+    dialect = context.dialect.name
+    if dialect not in ("postgresql", "mysql") or context.as_sql:
+        op.create_index(name, table, list(columns), unique=unique)
+        return
+
+    with context.autocommit_block():
+        conn = op.get_bind()
+        quote = conn.dialect.identifier_preparer.quote
+        index, target = quote(name), quote(table)
+        column_list = ", ".join(quote(column) for column in columns)
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        _set_lock_timeout(conn)
+
+        def build() -> None:
+            if dialect == "postgresql":
+                conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+                conn.exec_driver_sql(f"CREATE {kind} CONCURRENTLY {index} ON {target} ({column_list})")
+            else:
+                conn.exec_driver_sql(
+                    f"CREATE {kind} {index} ON {target} ({column_list}) ALGORITHM=INPLACE LOCK=NONE"
+                )
+
+        started = time.monotonic()
+        _with_retries(build, f"Índice {name}")
+        logger.info("Índice %s creado en %.1f s", name, time.monotonic() - started)
+
+
+def drop_index_online(name: str, table: str) -> None:
+    """Borra un índice sin bloquear las escrituras en la tabla."""
+    context = op.get_context()
+    dialect = context.dialect.name
+    if dialect not in ("postgresql", "mysql") or context.as_sql:
+        op.drop_index(name, table_name=table)
+        return
+
+    with context.autocommit_block():
+        conn = op.get_bind()
+        quote = conn.dialect.identifier_preparer.quote
+        _set_lock_timeout(conn)
+        if dialect == "postgresql":
+            sql = f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"
+        else:
+            sql = f"DROP INDEX {quote(name)} ON {quote(table)} ALGORITHM=INPLACE LOCK=NONE"
+        _with_retries(lambda: conn.exec_driver_sql(sql), f"Índice {name}")
+
+
+# -------------------------
+# Relleno de datos
+# -------------------------
+
+def backfill(table: str, values: Dict[str, object], where: Optional[sa.ColumnElement] = None,
+             key: str = "id", batch_size: Optional[int] = None) -> int:
+    """
+    UPDATE `table` SET `values` [WHERE `where`] por lotes de la clave `key`
+    (sin OFFSET: cada lote continúa donde acabó el anterior). Cada lote se confirma
+    por separado, así que los bloqueos de fila duran lo que tarda un lote.
+    `where` se escribe con sa.column(...) y se vuelve a aplicar en el UPDATE, por si
+    la fila ha cambiado entre la lectura y la escritura. Devuelve las filas actualizadas.
+
+        backfill("resources", {"timezone": "UTC"}, where=sa.column("timezone").is_(None))
+    """
+    batch_size = batch_size or config.MIGRATION_BATCH_SIZE
+    target = sa.table(table, sa.column(key), *(sa.column(name) for name in values if name != key))
+    criteria = [] if where is None else [where]
+
+    context = op.get_context()
+    if context.as_sql:
+        # En modo --sql no se puede leer: se genera el UPDATE completo
+        op.execute(target.update().where(*criteria).values(**values))
+        return 0
+
+    total, last = 0, None
+    with context.autocommit_block():
+        conn = op.get_bind()
+        _set_lock_timeout(conn)
+        while True:
+            started = time.monotonic()
+            batch = sa.select(target.c[key]).where(*criteria).order_by(target.c[key]).limit(batch_size)
+            if last is not None:
+                batch = batch.where(target.c[key] > last)
+            keys = conn.execute(batch).scalars().all()
+            if not keys:
+                break
+
+            result = conn.execute(target.update().where(target.c[key].in_(keys), *criteria).values(**values))
+            total += result.rowcount
+            last = keys[-1]
+            logger.info("%s: %s filas actualizadas (hasta %s=%s)", table, total, key, last)
+            _throttle(started)
+    return total
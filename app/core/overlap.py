@@ -0,0 +1,232 @@
+# app/core/overlap.py
+
+import logging
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.models.reservation import Reservation
+from app.models.reservation_slot import ReservationSlot
+from app.models.resource import Resource
+
+logger = logging.getLogger("app.overlap")
+
+# Restricción EXCLUDE de PostgreSQL (ver la migración de reservation_slots)
+EXCLUSION_CONSTRAINT = "ex_reservations_no_overlap"
+
+# Campos de una reserva que cambian las franjas que ocupa
+SLOT_FIELDS = ("resource_id", "start_time", "end_time", "status")
+
+INSERT_CHUNK_SIZE = 1000
+
+
+# -------------------------
+# Franjas
+# -------------------------
+
+def slot_starts(start: datetime, end: datetime, minutes: int) -> List[datetime]:
+    """
+    Inicios de las franjas de `minutes` minutos (contadas desde medianoche)
+    que toca el intervalo [start, end).
+    """
+    step = timedelta(minutes=minutes)
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    current = midnight + ((start - midnight) // step) * step
+    slots = []
+    while current < end:
+        slots.append(current)
+        current += step
+    return slots
+
+
+def is_aligned(moment: datetime, minutes: int) -> bool:
+    """True si `moment` cae justo al principio de una franja."""
+    return (
+        moment.second == 0
+        and moment.microsecond == 0
+        and (moment.hour * 60 + moment.minute) % minutes == 0
+    )
+
+
+def database_enforced() -> bool:
+    """True si el solapamiento lo impide la base de datos (OVERLAP_MODE=database)."""
+    return config.OVERLAP_MODE == "database"
+
+
+def uses_slot_table(db: Session) -> bool:
+    """
+    En modo "database", MySQL y SQLite necesitan la tabla de franjas;
+    PostgreSQL usa la restricción EXCLUDE y no la mantiene.
+    """
+    return database_enforced() and db.get_bind().dialect.name != "postgresql"
+
+
+# Cómo identifica cada motor el conflicto (como en app/core/users.py:is_duplicate_email)
+_MYSQL_DUPLICATE_ENTRY = 1062
+_MYSQL_SLOT_KEYS = ("for key 'PRIMARY'", "for key 'reservation_slots.PRIMARY'")  # MySQL 5.7 / 8.0
+_POSTGRES_EXCLUSION_VIOLATION = "23P01"
+_POSTGRES_SLOT_CONSTRAINT = "reservation_slots_pkey"
+_SQLITE_SLOT_MESSAGE = "UNIQUE constraint failed: reservation_slots."
+
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    """True si el error viene de la tabla de franjas o de la restricción EXCLUDE."""
+    orig = exc.orig
+    args = getattr(orig, "args", ())
+    if len(args) >= 2 and args[0] == _MYSQL_DUPLICATE_ENTRY:
+        return str(args[1]).endswith(_MYSQL_SLOT_KEYS)
+    diag = getattr(orig, "diag", None)
+    if diag is not None:
+        constraint = getattr(diag, "constraint_name", None)
+        code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+        return (code == _POSTGRES_EXCLUSION_VIOLATION and constraint == EXCLUSION_CONSTRAINT) \
+            or constraint == _POSTGRES_SLOT_CONSTRAINT
+    return str(orig).startswith(_SQLITE_SLOT_MESSAGE)
+
+
+# -------------------------
+# Mantenimiento de la tabla de franjas
+# -------------------------
+
+def slot_minutes_for(db: Session, resource: Optional[Resource]) -> Optional[int]:
+    """
+    Tamaño de franja con el que se materializan las reservas de un recurso:
+    el suyo propio (slot_minutes) o, en modo "database" sobre MySQL/SQLite,
+    OVERLAP_SLOT_MINUTES. None si el recurso no usa la tabla de franjas.
+    """
+    if resource is not None and resource.slot_minutes:
+        return resource.slot_minutes
+    return config.OVERLAP_SLOT_MINUTES if uses_slot_table(db) else None
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_slots(session: Session, flush_context, instances) -> None:
+    """
+    Mantiene reservation_slots al día con cualquier escritura ORM de reservas,
+    venga de la API o de otro código: las reservas nuevas (o movidas) añaden sus
+    franjas en el mismo flush y las borradas (o ya no activas) las liberan.
+    """
+    changed = [
+        obj for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Reservation)
+    ]
+    if not changed:
+        return
+
+    stale, fresh = [], []
+    with session.no_autoflush:
+        for reservation in changed:
+            if reservation in session.new:
+                fresh.append(reservation)
+            elif reservation in session.deleted:
+                stale.append(reservation)
+            elif _slot_fields_changed(reservation):
+                stale.append(reservation)
+                fresh.append(reservation)
+
+        # El recurso normalmente ya está en la sesión (create_reservation lo ha cargado)
+        minutes = {
+            reservation: slot_minutes_for(session, session.get(Resource, reservation.resource_id))
+            for reservation in set(stale) | set(fresh)
+        }
+
+    stale_ids = [reservation.id for reservation in stale if minutes[reservation]]
+    if stale_ids:
+        # Sentencia directa: dentro del flush no se puede volver a hacer autoflush
+        session.connection().execute(
+            delete(ReservationSlot).where(ReservationSlot.reservation_id.in_(stale_ids))
+        )
+
+    for reservation in fresh:
+        if not minutes[reservation] or reservation.status not in (None, "active"):
+            continue
+        for slot_start in slot_starts(reservation.start_time, reservation.end_time, minutes[reservation]):
+            session.add(ReservationSlot(
+                resource_id=reservation.resource_id,
+                slot_start=slot_start,
+                reservation=reservation,
+            ))
+
+
+def _slot_fields_changed(reservation: Reservation) -> bool:
+    attrs = inspect(reservation).attrs
+    return any(attrs[name].history.has_changes() for name in SLOT_FIELDS)
+
+
+def delete_slots(db: Session, *criteria) -> None:
+    """
+    Libera las franjas de las reservas que cumplen `criteria`.
+    Hay que llamarlo antes de los DELETE/UPDATE masivos de reservas,
+    que no pasan por el flush del ORM.
+    """
+    db.execute(
+        delete(ReservationSlot).where(
+            ReservationSlot.reservation_id.in_(select(Reservation.id).where(*criteria))
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def build_slot_rows(reservations: Iterable) -> Tuple[List[dict], List[int]]:
+    """
+    Calcula las filas de franja de una lista de reservas (id, resource_id,
+    start_time, end_time, minutes) ordenada por inicio. Las reservas que pisan
+    una franja ya ocupada se omiten y se devuelven aparte.
+    """
+    taken = set()
+    rows, conflicts = [], []
+    for reservation in reservations:
+        keys = [
+            (reservation.resource_id, slot_start)
+            for slot_start in slot_starts(reservation.start_time, reservation.end_time, reservation.minutes)
+        ]
+        if any(key in taken for key in keys):
+            conflicts.append(reservation.id)
+            continue
+        taken.update(keys)
+        rows.extend(
+            {"resource_id": resource_id, "slot_start": slot_start, "reservation_id": reservation.id}
+            for resource_id, slot_start in keys
+        )
+    return rows, conflicts
+
+
+def rebuild_slots(db: Session, resource_id: Optional[int] = None) -> List[int]:
+    """
+    Regenera las franjas a partir de las reservas activas que no han terminado:
+    al pasar a OVERLAP_MODE=database con datos previos (todos los recursos) o al
+    cambiar el tamaño de franja de un recurso (`resource_id`).
+    Devuelve los IDs de las reservas que se solapan con otra anterior.
+    """
+    conn = db.connection()
+    default_minutes = config.OVERLAP_SLOT_MINUTES if uses_slot_table(db) else None
+
+    resource_filter = [] if resource_id is None else [Reservation.resource_id == resource_id]
+    conn.execute(delete(ReservationSlot).where(
+        *([ReservationSlot.resource_id == resource_id] if resource_id is not None else [])
+    ))
+
+    if default_minutes is None:
+        resource_filter.append(Resource.slot_minutes.isnot(None))
+    reservations = conn.execute(
+        select(
+            Reservation.id, Reservation.resource_id, Reservation.start_time, Reservation.end_time,
+            func.coalesce(Resource.slot_minutes, default_minutes).label("minutes"),
+        )
+        .join(Resource, Reservation.resource_id == Resource.id)
+        .where(Reservation.status == "active", Reservation.end_time > datetime.utcnow(), *resource_filter)
+        .order_by(Reservation.start_time, Reservation.id)
+    ).all()
+
+    rows, conflicts = build_slot_rows(reservations)
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        conn.execute(insert(ReservationSlot), rows[start:start + INSERT_CHUNK_SIZE])
+
+    if conflicts:
+        logger.warning("Reservas solapadas que no se han podido ocupar en reservation_slots: %s", conflicts)
+    return conflicts
@@ -0,0 +1,100 @@
+# app/core/quotas.py
+
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import MAX_ACTIVE_RESERVATIONS_PER_USER, MAX_HOURS_PER_WEEK
+from app.core.exceptions import forbidden
+from app.models.user import User
+from app.models.user_usage import UserUsage
+
+
+def week_start(moment: datetime) -> date:
+    """Devuelve el lunes de la semana a la que pertenece `moment`."""
+    day = moment.date()
+    return day - timedelta(days=day.weekday())
+
+
+def split_by_week(start_time: datetime, end_time: datetime) -> List[Tuple[date, int]]:
+    """
+    Reparte la duración de una reserva entre las semanas que atraviesa.
+    Devuelve una lista de (lunes de la semana, minutos).
+    """
+    chunks = []
+    cursor = start_time
+    while cursor < end_time:
+        period = week_start(cursor)
+        next_week = datetime.combine(period + timedelta(days=7), datetime.min.time())
+        chunk_end = min(end_time, next_week)
+        minutes = int((chunk_end - cursor).total_seconds() // 60)
+        chunks.append((period, minutes))
+        cursor = chunk_end
+    return chunks
+
+
+def _get_usage_row(db: Session, user_id: int, period: date) -> UserUsage:
+    """Obtiene (bloqueando) o crea la fila de contadores de un periodo."""
+    usage = db.query(UserUsage).filter(
+        UserUsage.user_id == user_id,
+        UserUsage.period_start == period,
+    ).with_for_update().first()
+
+    if usage is None:
+        usage = UserUsage(user_id=user_id, period_start=period, reservation_count=0, reserved_minutes=0)
+        db.add(usage)
+    return usage
+
+
+def consume_quota(db: Session, user: User, start_time: datetime, end_time: datetime) -> None:
+    """
+    Comprueba las cuotas del usuario y actualiza sus contadores.
+    Debe llamarse dentro de la transacción que crea la reserva:
+    si la reserva no llega a confirmarse, el rollback deshace los contadores.
+    Los administradores no tienen límites, pero sus contadores se mantienen igual.
+    """
+    # Bloquea la fila del usuario para serializar reservas concurrentes del mismo usuario
+    db.refresh(user, with_for_update=True)
+    enforce = user.role != "admin"
+
+    if enforce and MAX_ACTIVE_RESERVATIONS_PER_USER and \
+            user.active_reservations >= MAX_ACTIVE_RESERVATIONS_PER_USER:
+        raise forbidden(f"Has alcanzado el máximo de {MAX_ACTIVE_RESERVATIONS_PER_USER} reservas activas")
+
+    chunks = split_by_week(start_time, end_time)
+    rows = [(_get_usage_row(db, user.id, period), minutes) for period, minutes in chunks]
+
+    if enforce and MAX_HOURS_PER_WEEK:
+        for usage, minutes in rows:
+            if usage.reserved_minutes + minutes > MAX_HOURS_PER_WEEK * 60:
+                raise forbidden(f"Has superado el máximo de {MAX_HOURS_PER_WEEK} horas semanales")
+
+    user.active_reservations += 1
+    for index, (usage, minutes) in enumerate(rows):
+        # La reserva cuenta en la semana en la que empieza; los minutos se reparten
+        if index == 0:
+            usage.reservation_count += 1
+        usage.reserved_minutes += minutes
+
+
+def release_quota(db: Session, user_id: int, start_time: datetime, end_time: datetime) -> None:
+    """
+    Devuelve a los contadores lo consumido por una reserva que se cancela.
+    También debe ejecutarse en la misma transacción que la cancelación.
+    """
+    user = db.query(User).filter(User.id == user_id).with_for_update().first()
+    if user is None:
+        return
+
+    user.active_reservations = max(0, user.active_reservations - 1)
+    for index, (period, minutes) in enumerate(split_by_week(start_time, end_time)):
+        usage = db.query(UserUsage).filter(
+            UserUsage.user_id == user_id,
+            UserUsage.period_start == period,
+        ).with_for_update().first()
+        if usage is None:
+            continue
+        if index == 0:
+            usage.reservation_count = max(0, usage.reservation_count - 1)
+        usage.reserved_minutes = max(0, usage.reserved_minutes - minutes)
@@ -0,0 +1,285 @@
+# app/core/rate_limit.py
+
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+
+from app.core import config
+from app.core.security import decode_token
+
+
+# -------------------------
+# Backends de token bucket
+# -------------------------
+
+class InMemoryRateLimitBackend:
+    """
+    Token bucket en memoria del proceso.
+    Cada clave guarda (tokens disponibles, instante de la última actualización,
+    instante en que el bucket estará lleno de nuevo). A partir de ese instante
+    olvidar la clave es lo mismo que conservarla, así que se puede borrar.
+    """
+
+    # Se consume en el event loop: no hace E/S ni espera más que el lock
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000, evict_batch: int = 1_000):
+        # Ordenado por último uso: los primeros son los que llevan más tiempo sin peticiones
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._evict_batch = max(1, min(evict_batch, max_keys))
+
+    def consume(self, key: str, rate: float, capacity: int) -> float:
+        """
+        Intenta consumir un token. Devuelve 0 si la petición está permitida
+        o los segundos que hay que esperar hasta tener un token disponible.
+        `rate` son tokens por segundo.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._buckets.move_to_end(key)
+
+            if len(self._buckets) > self._max_keys:
+                self._evict(now)
+
+        return retry_after
+
+    def _evict(self, now: float) -> None:
+        """
+        Deja sitio para `evict_batch` claves nuevas, así que solo se ejecuta una vez
+        cada `evict_batch` claves y su coste se reparte entre esas peticiones.
+        Revisa las claves de uso más antiguo y borra las que ya están llenas; si con
+        eso no basta, borra las menos usadas (solo pierden lo que llevaban gastado).
+        """
+        target = self._max_keys - self._evict_batch
+        oldest = list(islice(self._buckets.items(), 2 * self._evict_batch))
+        for key, (_, _, full_at) in oldest:
+            if full_at <= now:
+                del self._buckets[key]
+        while len(self._buckets) > target:
+            self._buckets.popitem(last=False)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Backend compartido entre procesos del mismo nodo usando un fichero SQLite.
+    Sirve como sustituto local de un almacén compartido (Redis, memcached...):
+    expone la misma interfaz `consume` que el backend en memoria.
+    """
+
+    # Escribe en disco y puede esperar al bloqueo de otro proceso: fuera del event loop
+    blocking = True
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key: str, rate: float, capacity: int) -> float:
+        # Se usa el reloj de pared porque el estado se comparte entre procesos
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+def build_backend(url: str):
+    """Crea el backend indicado en la configuración (RATE_LIMIT_BACKEND)."""
+    if url.startswith("sqlite:///"):
+        return SQLiteRateLimitBackend(url[len("sqlite:///"):])
+    return InMemoryRateLimitBackend()
+
+
+# -------------------------
+# Reglas
+# -------------------------
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    Regla de limitación: qué peticiones cubre y con qué ritmo.
+    `key_by` puede ser "ip" o "user" (si no hay token válido se usa la IP).
+    """
+    name: str
+    path_prefix: str
+    methods: Tuple[str, ...]
+    per_minute: int
+    burst: int
+    key_by: str = "ip"
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.path_prefix) and (not self.methods or method in self.methods)
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Reglas por defecto. Se evalúan en orden y se aplica la primera que coincide."""
+    return [
+        RateLimitRule("login", "/auth/login", ("POST",),
+                      config.RATE_LIMIT_LOGIN_PER_MINUTE, config.RATE_LIMIT_LOGIN_BURST, "ip"),
+        RateLimitRule("refresh", "/auth/refresh", ("POST",),
+                      config.RATE_LIMIT_LOGIN_PER_MINUTE, config.RATE_LIMIT_LOGIN_BURST, "ip"),
+        RateLimitRule("register", "/auth/register", ("POST",),
+                      config.RATE_LIMIT_LOGIN_PER_MINUTE, config.RATE_LIMIT_LOGIN_BURST, "ip"),
+        RateLimitRule("reservations-write", "/reservations", ("POST", "PUT", "DELETE"),
+                      config.RATE_LIMIT_WRITE_PER_MINUTE, config.RATE_LIMIT_WRITE_BURST, "user"),
+        RateLimitRule("default", "/", (),
+                      config.RATE_LIMIT_DEFAULT_PER_MINUTE, config.RATE_LIMIT_DEFAULT_BURST, "ip"),
+    ]
+
+
+def route_class(method: str, path: str) -> str:
+    """Clasifica la petición para los límites de concurrencia: auth, write o read."""
+    if path.startswith("/auth/"):
+        return "auth"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+def default_concurrency_limits() -> Dict[str, int]:
+    return {
+        "auth": config.CONCURRENCY_LIMIT_AUTH,
+        "write": config.CONCURRENCY_LIMIT_WRITE,
+        "read": config.CONCURRENCY_LIMIT_READ,
+    }
+
+
+# -------------------------
+# Middleware
+# -------------------------
+
+def user_from_scope(scope) -> Optional[str]:
+    """Extrae el `sub` del token Bearer, si es válido. No consulta la base de datos."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            payload = decode_token(token)
+            return payload.get("sub") if payload else None
+    return None
+
+
+def _too_many_requests(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Demasiadas peticiones, inténtalo más tarde"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de control de admisión:
+    - token bucket por regla y por IP/usuario
+    - límite global de peticiones simultáneas por tipo de ruta
+    Las peticiones rechazadas reciben 429 con cabecera Retry-After.
+    """
+
+    BACKEND_THREADS = 8
+
+    def __init__(self, app, backend=None, rules=None, concurrency_limits=None):
+        self.app = app
+        self.backend = backend or build_backend(config.RATE_LIMIT_BACKEND)
+        self.rules = rules if rules is not None else default_rules()
+        limits = concurrency_limits if concurrency_limits is not None else default_concurrency_limits()
+        self.semaphores = {name: asyncio.Semaphore(limit) for name, limit in limits.items() if limit > 0}
+        # Hilos propios para los backends bloqueantes: no esperan detrás de los endpoints síncronos
+        self._limiter = anyio.CapacityLimiter(self.BACKEND_THREADS)
+
+    async def _consume(self, key: str, rate: float, capacity: int) -> float:
+        if getattr(self.backend, "blocking", False):
+            return await anyio.to_thread.run_sync(
+                self.backend.consume, key, rate, capacity, limiter=self._limiter
+            )
+        return self.backend.consume(key, rate, capacity)
+
+    async def __call__(self, scope, receive, send):
+        # Las comprobaciones del balanceador (/health) nunca se limitan
+        if scope["type"] != "http" or scope["path"].startswith("/health/"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+
+        rule = next((r for r in self.rules if r.matches(method, path)), None)
+        if rule is not None and rule.per_minute > 0:
+            identity = user_from_scope(scope) if rule.key_by == "user" else None
+            if identity is None:
+                client = scope.get("client")
+                identity = "ip:" + (client[0] if client else "unknown")
+            else:
+                identity = "user:" + identity
+
+            retry_after = await self._consume(
+                f"{rule.name}:{identity}", rule.per_minute / 60.0, max(1, rule.burst)
+            )
+            if retry_after > 0:
+                await _too_many_requests(retry_after)(scope, receive, send)
+                return
+
+        semaphore = self.semaphores.get(route_class(method, path))
+        if semaphore is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Si no quedan huecos se rechaza en vez de encolar: la cola solo añadiría latencia
+        if semaphore.locked():
+            await _too_many_requests(1)(scope, receive, send)
+            return
+
+        async with semaphore:
+            await self.app(scope, receive, send)
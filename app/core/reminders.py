@@ -0,0 +1,290 @@
+# app/core/reminders.py
+
+import heapq
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import config
+from app.core.coordination import broadcast
+from app.core.jobs import enqueue
+from app.models.reservation import Reservation
+
+logger = logging.getLogger("app.reminders")
+
+
+@dataclass(order=True)
+class Reminder:
+    fire_at: datetime
+    reservation_id: int = field(compare=False)
+    start_time: datetime = field(compare=False)
+    user_id: int = field(compare=False)
+    resource_id: int = field(compare=False)
+    # Base de datos de la reserva ("primary" o el nombre de la sede con shard propio)
+    source: str = field(compare=False, default="primary")
+
+    def as_dict(self) -> dict:
+        return {
+            "reservation_id": self.reservation_id,
+            "user_id": self.user_id,
+            "resource_id": self.resource_id,
+            "start_time": self.start_time.isoformat(),
+            "source": self.source,
+        }
+
+
+# -------------------------
+# Destinos (sinks)
+# -------------------------
+
+class LogSink:
+    """Escribe cada recordatorio en el log."""
+
+    def send(self, reminder: Reminder) -> None:
+        logger.info("Recordatorio: %s", reminder.as_dict())
+
+
+class FileSink:
+    """Añade cada recordatorio como una línea JSON a un fichero (útil en pruebas)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminder: Reminder) -> None:
+        line = json.dumps(reminder.as_dict())
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+class JobSink:
+    """Encola un trabajo `send_reminder` en la base de datos de la reserva."""
+
+    def __init__(self, engines: Dict[str, Engine]):
+        self.sessions = {name: sessionmaker(bind=engine) for name, engine in engines.items()}
+
+    def send(self, reminder: Reminder) -> None:
+        with self.sessions[reminder.source]() as db:
+            enqueue(db, "send_reminder", {"reservation_id": reminder.reservation_id})
+            db.commit()
+
+
+def build_sink(spec: str, engines: Dict[str, Engine]):
+    """Crea el destino indicado en REMINDER_SINK."""
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec == "job":
+        return JobSink(engines)
+    return LogSink()
+
+
+# -------------------------
+# Planificador
+# -------------------------
+
+# Planificador activo en este proceso (si lo hay)
+_scheduler: Optional["ReminderScheduler"] = None
+
+
+class ReminderScheduler:
+    """
+    Envía recordatorios `lead` minutos antes de cada reserva sin recorrer la tabla:
+    - Un cursor sobre `start_time` (indexado) carga las reservas por ventanas.
+    - Las ya cargadas esperan en un heap ordenado por hora de envío.
+    - Crear una reserva dentro de la ventana cargada la añade al heap;
+      cancelarla la marca para descartarla cuando salga del heap.
+    """
+
+    def __init__(self, engines: Dict[str, Engine], sink=None,
+                 lead_minutes: int = None, window_minutes: int = None):
+        self.sessions = {name: sessionmaker(bind=engine) for name, engine in engines.items()}
+        self.sink = sink or build_sink(config.REMINDER_SINK, engines)
+        self.lead = timedelta(minutes=config.REMINDER_LEAD_MINUTES if lead_minutes is None else lead_minutes)
+        self.window = timedelta(minutes=config.REMINDER_WINDOW_MINUTES if window_minutes is None else window_minutes)
+
+        self._heap = []
+        self._queued = set()          # (source, reservation_id) que ya están en el heap
+        self._cancelled = set()       # (source, reservation_id) cancelados que siguen en el heap
+        self._loaded_until: Optional[datetime] = None  # start_time hasta el que está cargado
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Ciclo de vida
+    # -------------------------
+
+    def start(self) -> None:
+        global _scheduler
+        # Al arrancar se recuperan también las reservas cuyo aviso se perdió mientras
+        # el proceso estaba parado, siempre que todavía no hayan empezado
+        self._loaded_until = datetime.utcnow()
+        _scheduler = self
+        self._thread = threading.Thread(target=self._loop, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        global _scheduler
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if _scheduler is self:
+            _scheduler = None
+
+    # -------------------------
+    # Cambios en reservas
+    # -------------------------
+
+    def add(self, reservation: Reservation, source: str = "primary") -> None:
+        """
+        Programa el recordatorio de una reserva nueva si cae en la ventana cargada
+        o en la que se está cargando (por si la consulta de esa ventana ya pasó).
+        """
+        with self._condition:
+            if self._loaded_until is None or reservation.start_time >= self._loaded_until + self.window:
+                return  # se cargará con una ventana posterior
+            self._cancelled.discard((source, reservation.id))
+            self._push(reservation, source)
+            self._condition.notify()
+
+    def cancel(self, reservation_id: int, start_time: datetime, source: str = "primary") -> None:
+        """Descarta el recordatorio de una reserva cancelada (solo si ya estaba cargado)."""
+        with self._condition:
+            if (source, reservation_id) in self._queued:
+                self._cancelled.add((source, reservation_id))
+
+    # -------------------------
+    # Funcionamiento interno
+    # -------------------------
+
+    def _push(self, reservation, source: str) -> None:
+        now = datetime.utcnow()
+        key = (source, reservation.id)
+        if reservation.start_time <= now or key in self._queued:
+            return
+        self._queued.add(key)
+        heapq.heappush(self._heap, Reminder(
+            fire_at=max(reservation.start_time - self.lead, now),
+            reservation_id=reservation.id,
+            start_time=reservation.start_time,
+            user_id=reservation.user_id,
+            resource_id=reservation.resource_id,
+            source=source,
+        ))
+
+    def _refill(self) -> None:
+        """Carga la siguiente ventana [loaded_until, loaded_until + window) con una consulta por rango."""
+        window_start = self._loaded_until
+        window_end = window_start + self.window
+        for source, factory in self.sessions.items():
+            with factory() as db:
+                rows = db.query(
+                    Reservation.id, Reservation.user_id, Reservation.resource_id, Reservation.start_time
+                ).filter(
+                    Reservation.start_time >= window_start,
+                    Reservation.start_time < window_end,
+                    Reservation.status == "active",
+                ).order_by(Reservation.start_time).all()
+            with self._condition:
+                for row in rows:
+                    if (source, row.id) not in self._cancelled:
+                        self._push(row, source)
+        with self._condition:
+            self._loaded_until = window_end
+
+    def _due(self) -> list:
+        """Saca del heap los recordatorios cuya hora ya ha llegado."""
+        now = datetime.utcnow()
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0].fire_at <= now:
+                reminder = heapq.heappop(self._heap)
+                key = (reminder.source, reminder.reservation_id)
+                self._queued.discard(key)
+                if key in self._cancelled:
+                    self._cancelled.discard(key)
+                    continue
+                due.append(reminder)
+        return due
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                # Mantener cargado todo lo que haya que enviar dentro de la próxima ventana
+                while self._loaded_until < datetime.utcnow() + self.lead + self.window:
+                    self._refill()
+
+                for reminder in self._due():
+                    try:
+                        self.sink.send(reminder)
+                    except Exception:
+                        logger.exception("No se pudo enviar el recordatorio de la reserva %s", reminder.reservation_id)
+            except Exception:
+                logger.exception("Error en el planificador de recordatorios")
+
+            with self._condition:
+                if self._stop:
+                    return
+                next_refill = self._loaded_until - self.lead - self.window
+                wake_at = min(self._heap[0].fire_at, next_refill) if self._heap else next_refill
+                timeout = max(0.0, (wake_at - datetime.utcnow()).total_seconds())
+                self._condition.wait(timeout=min(timeout, 60) or 0.01)
+                if self._stop:
+                    return
+
+
+class _Scheduled(NamedTuple):
+    """Datos de la reserva que llegan en los avisos del canal "reminders"."""
+    id: int
+    user_id: int
+    resource_id: int
+    start_time: datetime
+
+
+def _on_reminder_event(payload: dict) -> None:
+    """Aplica al planificador de este proceso (si es el líder) reservas nuevas o canceladas."""
+    if _scheduler is None:
+        return
+    if payload["action"] == "add":
+        _scheduler.add(
+            _Scheduled(payload["reservation_id"], payload["user_id"], payload["resource_id"],
+                       datetime.fromisoformat(payload["start_time"])),
+            payload["source"],
+        )
+    else:
+        for reservation_id, start_time in payload["reservations"]:
+            _scheduler.cancel(reservation_id, datetime.fromisoformat(start_time), payload["source"])
+
+
+# Con varios procesos el planificador solo corre en el líder: las reservas creadas
+# o canceladas en cualquier proceso le llegan por el canal de avisos
+broadcast.subscribe("reminders", _on_reminder_event)
+
+
+def schedule_reservation(db: Session, reservation: Reservation, source: str = "primary") -> None:
+    """Avisa al planificador de una reserva nueva (al confirmar la transacción de `db`)."""
+    broadcast.publish(db, "reminders", {
+        "action": "add",
+        "reservation_id": reservation.id,
+        "user_id": reservation.user_id,
+        "resource_id": reservation.resource_id,
+        "start_time": reservation.start_time,
+        "source": source,
+    })
+
+
+def unschedule_reservations(db: Session, reservations: List[Tuple[int, datetime]], source: str = "primary") -> None:
+    """
+    Avisa al planificador de cancelaciones, (id, start_time) de cada reserva, con
+    un solo aviso (al confirmar la transacción de `db`).
+    """
+    if reservations:
+        broadcast.publish(db, "reminders", {"action": "cancel", "reservations": reservations, "source": source})
@@ -0,0 +1,104 @@
+# app/core/saturation.py
+
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Medidas de saturación del proceso (las lee /health/saturation).
+# La latencia sube cuando las peticiones empiezan a esperar: por un hilo libre
+# para los endpoints síncronos, por una conexión del pool o por un hueco para bcrypt.
+# Se miden esas esperas y no la CPU, que no distingue "ocupado" de "atascado".
+
+
+class WaitStats:
+    """
+    Esperas recientes: cuántas hay en curso y la media/máxima de las terminadas
+    en los últimos 10-20 s (ventana actual y anterior). Sin actividad, vuelve a
+    cero: un proceso que el balanceador ha dejado de usar puede volver a estar listo.
+    """
+
+    WINDOW_SECONDS = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self._window_start = time.monotonic()
+        self._current: List[float] = [0, 0.0, 0.0]   # esperas, total, máxima
+        self._previous: List[float] = [0, 0.0, 0.0]
+
+    def _rotate(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed >= 2 * self.WINDOW_SECONDS:
+            self._previous, self._current = [0, 0.0, 0.0], [0, 0.0, 0.0]
+            self._window_start = now
+        elif elapsed >= self.WINDOW_SECONDS:
+            self._previous, self._current = self._current, [0, 0.0, 0.0]
+            self._window_start += self.WINDOW_SECONDS
+
+    def begin(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.monotonic()
+
+    def end(self, started: float) -> None:
+        now = time.monotonic()
+        waited = now - started
+        with self._lock:
+            self.waiting -= 1
+            self._rotate(now)
+            self._current[0] += 1
+            self._current[1] += waited
+            self._current[2] = max(self._current[2], waited)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            self._rotate(time.monotonic())
+            count = self._current[0] + self._previous[0]
+            total = self._current[1] + self._previous[1]
+            maximum = max(self._current[2], self._previous[2])
+            waiting = self.waiting
+        return {
+            "waiting": waiting,
+            "avg_wait_ms": round(total / count * 1000, 1) if count else 0.0,
+            "max_wait_ms": round(maximum * 1000, 1),
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto se espera por una conexión (incluido abrirla si hace falta)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = WaitStats()
+
+    def _do_get(self):
+        started = self.wait_stats.begin()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.end(started)
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Estado del pool de conexiones de un engine."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    stats = {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": max(0, pool.overflow())}
+    if isinstance(pool, TimedQueuePool):
+        stats.update(pool.wait_stats.snapshot())
+    return stats
+
+
+def threadpool_stats() -> Dict[str, int]:
+    """
+    Hilos de los endpoints síncronos: ocupados y peticiones esperando uno.
+    Se llama desde el event loop (endpoint async).
+    """
+    from anyio.to_thread import current_default_thread_limiter
+
+    stats = current_default_thread_limiter().statistics()
+    return {"size": int(stats.total_tokens), "busy": stats.borrowed_tokens, "waiting": stats.tasks_waiting}
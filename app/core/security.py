@@ -1,37 +1,112 @@
 # app/core/security.py
 
+import calendar
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Dict, Optional
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from app.core import config
 
 # Clave secreta para firmar los tokens JWT
 # En producción debe venir de variables de entorno
 SECRET_KEY = "super-secret-key-change-this"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+ACCESS_TOKEN_EXPIRE_MINUTES = config.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Contexto de Passlib para hashear y verificar contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt y python-jose tardan en importarse: se cargan en el primer uso
+# (o en el arranque, desde `warm_up`) para no retrasar la importación de la app.
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+	"""Contexto de Passlib para hashear y verificar contraseñas."""
+	from passlib.context import CryptContext
+	return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashingPool:
+	"""
+	Hilos dedicados a bcrypt. Cada hash ocupa una CPU durante ~0,2 s: sin límite,
+	un pico de logins ocupa a la vez los hilos del servidor y todas las CPU, y
+	frena también al resto de peticiones. Aquí se calculan como mucho `workers`
+	a la vez; los demás esperan en cola (backlog, visible en /health/saturation).
+	"""
+
+	def __init__(self, workers: int = 0):
+		self.workers = workers or min(4, os.cpu_count() or 1)
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._lock = threading.Lock()
+		self._queued = 0
+		self._running = 0
+
+	def run(self, function: Callable, *args):
+		"""Ejecuta `function(*args)` en el pool y espera el resultado."""
+		with self._lock:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+			self._queued += 1
+
+		def task():
+			with self._lock:
+				self._queued -= 1
+				self._running += 1
+			try:
+				return function(*args)
+			finally:
+				with self._lock:
+					self._running -= 1
+
+		return self._executor.submit(task).result()
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"workers": self.workers, "running": self._running, "backlog": self._queued}
+
+
+hashing_pool = HashingPool(config.BCRYPT_WORKERS)
 
 
 def hash_password(password: str) -> str:
 	"""Devuelve el hash seguro de una contraseña en texto plano."""
-	return pwd_context.hash(password)
+	return hashing_pool.run(get_pwd_context().hash, password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
 	"""Verifica si una contraseña en texto plano coincide con su hash."""
-	return pwd_context.verify(plain_password, hashed_password)
+	return hashing_pool.run(get_pwd_context().verify, plain_password, hashed_password)
+
+
+def decode_token(token: str) -> Optional[dict]:
+	"""Devuelve el payload de un JWT válido, o None si la firma o la caducidad fallan."""
+	from jose import JWTError, jwt
+	try:
+		return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+	except JWTError:
+		return None
+
+
+def warm_up() -> None:
+	"""Carga passlib/bcrypt y jose por adelantado (se llama en el arranque)."""
+	# Cargar el backend de bcrypt (y su autocomprobación) sin pagar un hash completo
+	get_pwd_context().handler().get_backend()
+	from jose import jwt  # noqa: F401
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
 	"""
 	Crea un token JWT firmado con SECRET_KEY.
 	`data` suele incluir el identificador del usuario (sub).
+	Se añaden `iat` (para las revocaciones por usuario) y un `jti` aleatorio
+	(para revocar el token concreto al cerrar sesión).
 	"""
 	to_encode = data.copy()
-	expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-	to_encode.update({"exp": expire})
+	now = datetime.utcnow()
+	expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+	to_encode.update({"exp": expire, "iat": calendar.timegm(now.utctimetuple())})
+	to_encode.setdefault("jti", secrets.token_hex(16))
+	from jose import jwt
 	return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
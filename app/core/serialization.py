@@ -0,0 +1,187 @@
+# app/core/serialization.py
+
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import BATCH_MAX_IDS
+from app.core.exceptions import bad_request
+from app.core.timeutils import as_utc
+from app.models.custom_field import CustomField
+from app.models.reservation import Reservation
+from app.models.resource import Resource
+from app.models.resource_category import ResourceCategory
+from app.models.user import User
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON que usa orjson si está instalado (mucho más rápido que `json`
+    y con soporte nativo de datetime). Si no, cae a json + jsonable_encoder.
+    Las fechas sin zona son UTC y se escriben con sufijo "Z", igual que los schemas.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(
+                content,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z,
+            )
+        return json.dumps(
+            jsonable_encoder(content, custom_encoder={
+                datetime: lambda value: as_utc(value).isoformat().replace("+00:00", "Z"),
+            }),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+# -------------------------
+# Consultas por columnas (sin hidratar objetos ORM)
+# -------------------------
+# Devuelven listas de dicts con la misma forma que los schemas de respuesta,
+# listas para serializar directamente sin pasar por Pydantic.
+
+RESERVATION_COLUMNS = (
+    Reservation.id,
+    Reservation.user_id,
+    Reservation.resource_id,
+    Reservation.start_time,
+    Reservation.end_time,
+    Reservation.status,
+)
+
+USER_COLUMNS = (User.id, User.email, User.role)
+
+CATEGORY_COLUMNS = (ResourceCategory.id, ResourceCategory.name)
+
+
+def rows_to_dicts(query: Query) -> List[Dict[str, Any]]:
+    """Ejecuta una consulta por columnas y devuelve cada fila como dict."""
+    return [row._asdict() for row in query]
+
+
+def fetch_reservation_dicts(db: Session, *criteria) -> List[Dict[str, Any]]:
+    """Reservas como dicts con la forma de ReservationResponse."""
+    return rows_to_dicts(db.query(*RESERVATION_COLUMNS).filter(*criteria))
+
+
+def fetch_user_dicts(db: Session, *criteria) -> List[Dict[str, Any]]:
+    """Usuarios como dicts con la forma de UserResponse."""
+    return rows_to_dicts(db.query(*USER_COLUMNS).filter(*criteria))
+
+
+def fetch_category_dicts(db: Session, *criteria) -> List[Dict[str, Any]]:
+    """Categorías como dicts con la forma de ResourceCategoryResponse."""
+    return rows_to_dicts(db.query(*CATEGORY_COLUMNS).filter(*criteria))
+
+
+def fetch_resource_dicts(db: Session, *criteria) -> List[Dict[str, Any]]:
+    """
+    Recursos como dicts con la forma de ResourceResponse.
+    Dos consultas en total: recursos + categoría (join) y campos personalizados.
+    """
+    rows = db.query(
+        Resource.id,
+        Resource.name,
+        Resource.description,
+        Resource.is_active,
+        Resource.slot_minutes,
+        Resource.timezone,
+        Resource.opens_at,
+        Resource.closes_at,
+        ResourceCategory.id.label("category_id"),
+        ResourceCategory.name.label("category_name"),
+    ).outerjoin(
+        ResourceCategory, Resource.category_id == ResourceCategory.id
+    ).filter(*criteria).all()
+
+    if not rows:
+        return []
+
+    fields_by_resource = defaultdict(list)
+    # Mismo filtro que la consulta principal, para no depender de un IN enorme
+    field_rows = db.query(
+        CustomField.resource_id, CustomField.id, CustomField.key, CustomField.value
+    ).join(Resource, CustomField.resource_id == Resource.id).filter(*criteria).order_by(
+        # Orden estable: de él dependen el ETag y los bytes de las respuestas en caché
+        CustomField.resource_id, CustomField.id
+    )
+    for resource_id, field_id, key, value in field_rows:
+        fields_by_resource[resource_id].append({"id": field_id, "key": key, "value": value})
+
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "is_active": bool(row.is_active),
+            "slot_minutes": row.slot_minutes,
+            "timezone": row.timezone,
+            "opens_at": row.opens_at,
+            "closes_at": row.closes_at,
+            "category": (
+                {"id": row.category_id, "name": row.category_name}
+                if row.category_id is not None else None
+            ),
+            "custom_fields": fields_by_resource.get(row.id, []),
+        }
+        for row in rows
+    ]
+
+
+# -------------------------
+# Lecturas por lotes (?ids=1,2,3)
+# -------------------------
+# Permiten resolver muchas entidades con un único IN en lugar de una petición por ID.
+
+MISSING_IDS_HEADER = "X-Missing-IDs"
+
+
+def parse_ids(raw: str, max_ids: int = BATCH_MAX_IDS) -> List[int]:
+    """
+    Convierte "3,1,2" en [3, 1, 2]: sin duplicados y en el orden pedido.
+    Lanza 400 si algún valor no es un entero o se piden demasiados.
+    """
+    ids = []
+    seen = set()
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = int(part)
+        except ValueError:
+            raise bad_request(f"ID no válido: {part}")
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+
+    if not ids:
+        raise bad_request("El parámetro ids está vacío")
+    if len(ids) > max_ids:
+        raise bad_request(f"Como máximo se pueden pedir {max_ids} IDs a la vez")
+    return ids
+
+
+def batch_response(items: List[Dict[str, Any]], ids: List[int]) -> FastJSONResponse:
+    """
+    Ordena `items` según `ids` y avisa de los que no existen (o no son visibles)
+    en la cabecera X-Missing-IDs.
+    """
+    by_id = {item["id"]: item for item in items}
+    missing = [item_id for item_id in ids if item_id not in by_id]
+    headers: Optional[Dict[str, str]] = None
+    if missing:
+        headers = {MISSING_IDS_HEADER: ",".join(str(item_id) for item_id in missing)}
+    return FastJSONResponse([by_id[item_id] for item_id in ids if item_id in by_id], headers=headers)
@@ -0,0 +1,201 @@
+# app/core/tasks.py
+
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.coordination import lock
+from app.core.jobs import enqueue, job
+from app.core.overlap import delete_slots, rebuild_slots
+from app.core.quotas import split_by_week
+from app.core.versioning import bump_table_versions
+from app.models.coordination_event import CoordinationEvent
+from app.models.job import Job
+from app.models.refresh_token import RefreshToken
+from app.models.reservation import Reservation
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.models.user_usage import UserUsage
+
+logger = logging.getLogger("app.notifications")
+
+ARCHIVE_BATCH_SIZE = 500
+
+
+# -------------------------
+# Notificaciones (estilo email)
+# -------------------------
+
+@job("notify_reservation_created")
+def notify_reservation_created(db: Session, payload: dict) -> None:
+    reservation = db.query(Reservation).filter(Reservation.id == payload["reservation_id"]).first()
+    if reservation is None:
+        return  # cancelada antes de notificar
+    user = db.query(User).filter(User.id == reservation.user_id).first()
+    logger.info(
+        "Para: %s | Asunto: Reserva #%s confirmada | Recurso %s de %s a %s",
+        user.email if user else reservation.user_id, reservation.id,
+        reservation.resource_id, reservation.start_time, reservation.end_time,
+    )
+
+
+@job("notify_reservation_cancelled")
+def notify_reservation_cancelled(db: Session, payload: dict) -> None:
+    # La reserva ya no existe: el payload lleva todos los datos necesarios
+    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    logger.info(
+        "Para: %s | Asunto: Reserva #%s cancelada | Recurso %s de %s a %s",
+        user.email if user else payload["user_id"], payload["reservation_id"],
+        payload["resource_id"], payload["start_time"], payload["end_time"],
+    )
+
+
+@job("send_reminder")
+def send_reminder(db: Session, payload: dict) -> None:
+    reservation = db.query(Reservation).filter(Reservation.id == payload["reservation_id"]).first()
+    if reservation is None or reservation.status != "active":
+        return
+    user = db.query(User).filter(User.id == reservation.user_id).first()
+    logger.info(
+        "Para: %s | Asunto: Recordatorio de la reserva #%s | Recurso %s a las %s",
+        user.email if user else reservation.user_id, reservation.id,
+        reservation.resource_id, reservation.start_time,
+    )
+
+
+# -------------------------
+# Mantenimiento
+# -------------------------
+
+@job("archive_reservations")
+def archive_reservations(db: Session, payload: dict) -> None:
+    """
+    Marca como "completed" las reservas ya terminadas y descuenta los contadores
+    de reservas activas de sus usuarios. Trabaja por lotes y se vuelve a programar.
+    Con varios procesos, el bloqueo garantiza que solo se archiva un lote a la vez.
+    """
+    lock(db, "archive_reservations")
+    now = datetime.utcnow()
+    ended = db.query(Reservation.id, Reservation.user_id).filter(
+        Reservation.status == "active",
+        Reservation.end_time < now,
+    ).order_by(Reservation.id).limit(ARCHIVE_BATCH_SIZE).all()
+
+    if ended:
+        ids = [reservation_id for reservation_id, _ in ended]
+        # Las franjas de reservas terminadas ya no pueden chocar con nada
+        delete_slots(db, Reservation.id.in_(ids))
+        db.query(Reservation).filter(
+            Reservation.id.in_(ids),
+            Reservation.status == "active",
+        ).update({Reservation.status: "completed"}, synchronize_session=False)
+
+        # Los contadores se descuentan por las reservas que el UPDATE ha archivado de
+        # verdad: una cancelada entre la lectura y el UPDATE ya devolvió su cuota
+        archived = db.query(Reservation.user_id).filter(
+            Reservation.id.in_(ids),
+            Reservation.status == "completed",
+        ).all()
+
+        for user_id, count in Counter(user_id for user_id, in archived).items():
+            db.query(User).filter(User.id == user_id).update({
+                User.active_reservations: case(
+                    (User.active_reservations >= count, User.active_reservations - count),
+                    else_=0,
+                )
+            }, synchronize_session=False)
+
+        bump_table_versions(db, "reservations", "users")
+        logger.info("Archivadas %s reservas terminadas", len(archived))
+
+    # Si el lote iba lleno quedan más: seguir enseguida; si no, esperar al siguiente ciclo
+    delay = timedelta(0) if len(ended) == ARCHIVE_BATCH_SIZE else timedelta(minutes=config.ARCHIVE_INTERVAL_MINUTES)
+    enqueue(db, "archive_reservations", run_at=now + delay)
+
+
+@job("rebuild_user_usage")
+def rebuild_user_usage(db: Session, payload: dict) -> None:
+    """
+    Recalcula desde cero los contadores de cuota de un usuario.
+    Sirve para corregir desviaciones (por ejemplo, tras borrados masivos).
+    """
+    user_id = payload["user_id"]
+    user = db.query(User).filter(User.id == user_id).with_for_update().first()
+    if user is None:
+        return
+
+    rows = db.query(Reservation.start_time, Reservation.end_time, Reservation.status).filter(
+        Reservation.user_id == user_id,
+        Reservation.status.in_(["active", "completed"]),
+    ).all()
+
+    usage = defaultdict(lambda: [0, 0])
+    for start_time, end_time, _ in rows:
+        for index, (period, minutes) in enumerate(split_by_week(start_time, end_time)):
+            if index == 0:
+                usage[period][0] += 1
+            usage[period][1] += minutes
+
+    db.query(UserUsage).filter(UserUsage.user_id == user_id).delete(synchronize_session=False)
+    db.add_all([
+        UserUsage(user_id=user_id, period_start=period, reservation_count=count, reserved_minutes=minutes)
+        for period, (count, minutes) in usage.items()
+    ])
+    user.active_reservations = sum(1 for _, _, status in rows if status == "active")
+
+
+@job("rebuild_reservation_slots")
+def rebuild_reservation_slots(db: Session, payload: dict) -> None:
+    """Regenera reservation_slots a partir de las reservas activas pendientes."""
+    conflicts = rebuild_slots(db)
+    logger.info("Franjas regeneradas (%s reservas solapadas omitidas)", len(conflicts))
+
+
+@job("purge_expired_tokens")
+def purge_expired_tokens(db: Session, payload: dict) -> None:
+    """
+    Borra las revocaciones que ya no afectan a ningún token vivo y los tokens de
+    refresco caducados. Se vuelve a programar.
+    """
+    now = datetime.utcnow()
+    revoked = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    refresh = db.query(RefreshToken).filter(RefreshToken.expires_at <= now).delete(synchronize_session=False)
+    if revoked or refresh:
+        logger.info("Borrados %s tokens revocados y %s de refresco caducados", revoked, refresh)
+    enqueue(db, "purge_expired_tokens", run_at=now + timedelta(minutes=config.TOKEN_PURGE_INTERVAL_MINUTES))
+
+
+@job("purge_coordination_events")
+def purge_coordination_events(db: Session, payload: dict) -> None:
+    """Borra los avisos entre procesos que ya han leído todos. Se vuelve a programar."""
+    now = datetime.utcnow()
+    db.query(CoordinationEvent).filter(
+        CoordinationEvent.created_at < now - timedelta(minutes=config.COORDINATION_EVENT_TTL_MINUTES)
+    ).delete(synchronize_session=False)
+    enqueue(db, "purge_coordination_events", run_at=now + timedelta(minutes=config.COORDINATION_EVENT_TTL_MINUTES))
+
+
+# Trabajos que se reprograman a sí mismos
+PERIODIC_JOBS = ("archive_reservations", "purge_expired_tokens", "purge_coordination_events")
+
+
+def ensure_periodic_jobs(db: Session) -> None:
+    """
+    Programa los trabajos periódicos que todavía no tengan ninguno en cola.
+    El bloqueo evita que varios procesos que arrancan a la vez los dupliquen.
+    """
+    lock(db, "periodic_jobs")
+    queued = {
+        name for (name,) in db.query(Job.name).filter(
+            Job.name.in_(PERIODIC_JOBS),
+            Job.status.in_(["pending", "running"]),
+        ).distinct()
+    }
+    for name in PERIODIC_JOBS:
+        if name not in queued:
+            enqueue(db, name)
+    db.commit()
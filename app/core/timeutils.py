@@ -0,0 +1,75 @@
+# app/core/timeutils.py
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Todas las fechas se guardan en UTC como DateTime sin zona (naive).
+# La API acepta fechas con zona (se convierten a UTC) o sin ella (se interpretan en
+# la zona del recurso, "UTC" por defecto) y siempre devuelve UTC con sufijo "Z".
+# Así las consultas comparan columnas directamente con valores UTC y pueden usar
+# los índices por rango (resource_id, start_time) sin funciones sobre la columna.
+
+UTC = timezone.utc
+DEFAULT_TIMEZONE = "UTC"
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """Zona horaria IANA ("Europe/Madrid"). Lanza ZoneInfoNotFoundError si no existe."""
+    return ZoneInfo(name)
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def to_utc(value: datetime, zone_name: str = DEFAULT_TIMEZONE) -> datetime:
+    """
+    Convierte una fecha de entrada a UTC naive (la forma en que se guarda).
+    Las fechas sin zona se interpretan en `zone_name`.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=get_zone(zone_name))
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Marca como UTC una fecha guardada (naive) para devolverla con zona."""
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def local_midnight_utc(day: date, zone_name: str = DEFAULT_TIMEZONE) -> datetime:
+    """Medianoche local de `day` en `zone_name`, expresada en UTC naive."""
+    return to_utc(datetime.combine(day, time()), zone_name)
+
+
+def local_today(zone_name: str = DEFAULT_TIMEZONE) -> date:
+    return datetime.now(get_zone(zone_name)).date()
+
+
+def within_opening_hours(start: datetime, end: datetime, zone_name: str,
+                         opens_at: Optional[time], closes_at: Optional[time]) -> bool:
+    """
+    True si [start, end) (UTC naive) cabe entero en un periodo de apertura del recurso.
+    El horario está en hora local de `zone_name`; si cierra antes de abrir
+    (22:00-02:00) el periodo termina al día siguiente. Sin horario, siempre abierto.
+    """
+    if opens_at is None or closes_at is None:
+        return True
+
+    zone = get_zone(zone_name)
+    local_start = as_utc(start).astimezone(zone)
+    # Se prueba el periodo que empieza ese día y el del día anterior (horarios nocturnos)
+    for day in (local_start.date() - timedelta(days=1), local_start.date()):
+        opening = datetime.combine(day, opens_at, tzinfo=zone)
+        closing_day = day + timedelta(days=1) if closes_at <= opens_at else day
+        closing = datetime.combine(closing_day, closes_at, tzinfo=zone)
+        if to_utc(opening) <= start and end <= to_utc(closing):
+            return True
+    return False
@@ -0,0 +1,270 @@
+# app/core/tokens.py
+
+import calendar
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.coordination import broadcast
+from app.core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger("app.tokens")
+
+# Cada sincronización vuelve a leer este margen hacia atrás: cubre relojes algo
+# desfasados entre servidores y transacciones que confirman un poco más tarde
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _epoch(moment: datetime) -> int:
+    """Segundos desde epoch de una fecha UTC naive (la misma escala que `iat` y `exp`)."""
+    return calendar.timegm(moment.utctimetuple())
+
+
+def _jti_key(jti: str) -> bytes:
+    # Los jti que emite la API son 32 caracteres hexadecimales: se guardan en 16 bytes
+    try:
+        return bytes.fromhex(jti)
+    except ValueError:
+        return jti.encode()
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """Usuario autenticado tal y como viene en el token de acceso (sin consultar la base de datos)."""
+    id: int
+    role: str
+    tenant: str
+    jti: str
+    issued_at: int
+    expires_at: datetime
+
+
+# -------------------------
+# Lista de revocados en memoria
+# -------------------------
+
+class TokenDenylist:
+    """
+    Tokens de acceso revocados, copiados de la tabla revoked_tokens a cada proceso:
+    - `_tokens`: (base, jti) -> caducidad del token
+    - `_users`:  (base, user_id) -> (iat hasta el que está revocado, caducidad)
+    Comprobar un token son dos búsquedas en diccionarios. Las entradas se descartan
+    en cuanto caduca el último token al que afectan, así que el tamaño depende de
+    las revocaciones de los últimos ACCESS_TOKEN_EXPIRE_MINUTES y no del histórico.
+    La base ("primary" o la sede con shard) forma parte de la clave porque los
+    IDs de usuario solo son únicos dentro de cada base de datos.
+    """
+
+    def __init__(self, sync_seconds: int = None):
+        self.sync_seconds = config.TOKEN_DENYLIST_SYNC_SECONDS if sync_seconds is None else sync_seconds
+        self._tokens: Dict[Tuple[str, bytes], int] = {}
+        self._users: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._synced_at: Dict[str, datetime] = {}  # base -> revoked_at desde el que ya se ha leído
+        self._next_sync = 0.0
+        self._lock = threading.Lock()        # protege las escrituras en los diccionarios
+        self._sync_lock = threading.Lock()   # una sola sincronización a la vez
+
+    def is_revoked(self, source: str, jti: str, user_id: int, issued_at: int) -> bool:
+        if (source, _jti_key(jti)) in self._tokens:
+            return True
+        revoked = self._users.get((source, user_id))
+        # Se revocan también los tokens emitidos en el mismo segundo que la revocación
+        return revoked is not None and issued_at <= revoked[0]
+
+    def add(self, source: str, jti: Optional[str], user_id: int,
+            revoked_at: datetime, expires_at: datetime) -> None:
+        with self._lock:
+            if jti is not None:
+                self._tokens[(source, _jti_key(jti))] = _epoch(expires_at)
+                return
+            cutoff, expires = _epoch(revoked_at), _epoch(expires_at)
+            previous = self._users.get((source, user_id))
+            if previous is not None:
+                cutoff, expires = max(cutoff, previous[0]), max(expires, previous[1])
+            self._users[(source, user_id)] = (cutoff, expires)
+
+    def evict(self) -> None:
+        """Descarta las entradas cuyos tokens ya han caducado."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, expires in self._tokens.items() if expires <= now]:
+                del self._tokens[key]
+            for key in [key for key, (_, expires) in self._users.items() if expires <= now]:
+                del self._users[key]
+
+    def sync(self) -> None:
+        """
+        Trae las revocaciones nuevas de todas las bases (principal y shards).
+        La primera vez carga todas las que siguen vigentes; después solo las
+        recientes, por el índice de revoked_at.
+        """
+        from app.database import all_engines
+
+        for source, engine in all_engines().items():
+            started = datetime.utcnow()
+            since = self._synced_at.get(source)
+            with Session(bind=engine) as db:
+                query = db.query(
+                    RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at, RevokedToken.expires_at
+                )
+                if since is None:
+                    query = query.filter(RevokedToken.expires_at > started)
+                else:
+                    query = query.filter(RevokedToken.revoked_at >= since - SYNC_OVERLAP)
+                for row in query:
+                    self.add(source, row.jti, row.user_id, row.revoked_at, row.expires_at)
+            self._synced_at[source] = started
+        self.evict()
+
+    def maybe_sync(self) -> None:
+        """
+        Sincroniza como mucho una vez cada `sync_seconds`. Lo llama la petición que
+        encuentra la lista desactualizada; las demás siguen con la copia actual.
+        """
+        if time.monotonic() < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_seconds
+            self.sync()
+        except Exception:
+            logger.exception("No se pudo sincronizar la lista de tokens revocados")
+        finally:
+            self._sync_lock.release()
+
+
+# Lista de este proceso
+denylist = TokenDenylist()
+
+
+def _apply_revocation(payload: dict) -> None:
+    """Revocación confirmada en este proceso o en otro (aviso del canal "tokens")."""
+    denylist.add(
+        payload["source"], payload["jti"], payload["user_id"],
+        datetime.fromisoformat(payload["revoked_at"]), datetime.fromisoformat(payload["expires_at"]),
+    )
+
+
+# Las revocaciones se aplican en cuanto se confirman, en todos los procesos;
+# la sincronización periódica con revoked_tokens queda como red de seguridad
+broadcast.subscribe("tokens", _apply_revocation)
+
+
+def _record(db: Session, source: str, entry: RevokedToken) -> None:
+    db.add(entry)
+    broadcast.publish(db, "tokens", {
+        "source": source,
+        "jti": entry.jti,
+        "user_id": entry.user_id,
+        "revoked_at": entry.revoked_at,
+        "expires_at": entry.expires_at,
+    })
+
+
+def revoke_access_token(db: Session, source: str, token_user: TokenUser) -> None:
+    """Revoca un token de acceso concreto (en la transacción de `db`)."""
+    _record(db, source, RevokedToken(
+        jti=token_user.jti,
+        user_id=token_user.id,
+        revoked_at=datetime.utcnow(),
+        expires_at=token_user.expires_at,
+    ))
+
+
+def revoke_user_tokens(db: Session, source: str, user_ids: Iterable[int]) -> None:
+    """
+    Revoca todos los tokens emitidos hasta ahora para los usuarios indicados:
+    los de acceso (revocación por usuario), los de refresco y los enlaces de
+    calendario (se genera otro secreto al pedir de nuevo el token).
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    now = datetime.utcnow()
+    for user_id in user_ids:
+        _record(db, source, RevokedToken(
+            jti=None,
+            user_id=user_id,
+            revoked_at=now,
+            expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        ))
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id.in_(user_ids), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    db.execute(update(User).where(User.id.in_(user_ids)).values(feed_secret=None))
+
+
+# -------------------------
+# Tokens de refresco
+# -------------------------
+
+def hash_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def issue_tokens(db: Session, user, tenant: str, family_id: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Emite un token de acceso y uno de refresco para `user`.
+    El de refresco se guarda (solo su hash) en la transacción de `db`.
+    """
+    # 🔥 IMPORTANTE: sub va como string
+    # `tid` es la sede en la que se autenticó: el id solo es válido en su base de datos
+    access_token = create_access_token(data={"sub": str(user.id), "tid": tenant, "role": user.role})
+
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=hash_token(refresh_token),
+        family_id=family_id or secrets.token_hex(16),
+        user_id=user.id,
+        tenant_id=tenant,
+        expires_at=datetime.utcnow() + timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return access_token, refresh_token
+
+
+def revoke_family(db: Session, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def consume_refresh_token(db: Session, raw: str, tenant: str) -> Optional[RefreshToken]:
+    """
+    Consume un token de refresco y lo devuelve, o None si no es válido.
+    Si el token ya se había usado (alguien lo está reutilizando) se revoca toda
+    su familia: ni el atacante ni el cliente legítimo pueden seguir refrescando.
+    El UPDATE condicional hace que dos refrescos simultáneos no puedan ganar ambos.
+    """
+    token = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_token(raw)).first()
+    if token is None or token.tenant_id != tenant:
+        return None
+
+    now = datetime.utcnow()
+    if token.expires_at <= now:
+        return None
+
+    consumed = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == token.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+    if consumed != 1:
+        logger.warning("Token de refresco ya usado o revocado (usuario %s): se revoca su familia", token.user_id)
+        revoke_family(db, token.family_id)
+        return None
+    return token
@@ -0,0 +1,43 @@
+# app/core/users.py
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.user import User, normalize_email  # noqa: F401 (normalize_email se reexporta)
+
+# Consultas de usuario más frecuentes, construidas una sola vez.
+# SQLAlchemy guarda la clave de caché en el propio objeto, así que cada ejecución
+# reutiliza el SQL ya compilado sin volver a construir ni analizar la consulta.
+
+# Login: solo las columnas necesarias, sin cargar la entidad en la sesión
+_LOGIN_BY_EMAIL = (
+    select(User.id, User.role, User.hashed_password)
+    .where(User.email == bindparam("email"))
+    .limit(1)
+)
+
+
+def get_login_row(db: Session, email: str):
+    """(id, role, hashed_password) del usuario con ese email, o None."""
+    return db.execute(_LOGIN_BY_EMAIL, {"email": normalize_email(email)}).first()
+
+
+# La restricción única de users.email no tiene nombre propio (011adf36c351):
+# cada motor la identifica a su manera en el error
+_MYSQL_DUPLICATE_ENTRY = 1062
+_MYSQL_EMAIL_KEYS = ("for key 'email'", "for key 'users.email'")  # MySQL 5.7 / 8.0
+_POSTGRES_EMAIL_CONSTRAINT = "users_email_key"
+_SQLITE_EMAIL_MESSAGE = "UNIQUE constraint failed: users.email"
+
+
+def is_duplicate_email(exc: IntegrityError) -> bool:
+    """True solo si el error es la violación de la restricción única de users.email."""
+    orig = exc.orig
+    args = getattr(orig, "args", ())
+    if len(args) >= 2 and args[0] == _MYSQL_DUPLICATE_ENTRY:
+        return str(args[1]).endswith(_MYSQL_EMAIL_KEYS)
+    diag = getattr(orig, "diag", None)
+    if diag is not None:
+        return getattr(diag, "constraint_name", None) == _POSTGRES_EMAIL_CONSTRAINT
+    return str(orig) == _SQLITE_EMAIL_MESSAGE
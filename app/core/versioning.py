@@ -0,0 +1,228 @@
+# app/core/versioning.py
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, func, insert, inspect, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.table_version import TableVersion
+
+# Tablas cuyas escrituras invalidan las respuestas cacheadas por los clientes
+TRACKED_TABLES = {"users", "resources", "resource_categories", "custom_fields", "reservations"}
+
+# En estas tablas no hay una versión de toda la tabla (sería una fila que todas
+# las escrituras actualizan y bloquean): hay una por valor de cada columna
+# ("reservations.resource_id=5") y la de la tabla se deriva de ellas (ver
+# `get_table_versions`). Las respuestas que solo dependen de las reservas de un
+# recurso o de un usuario no se invalidan con las de los demás.
+SCOPED_COLUMNS = {"reservations": ("resource_id", "user_id")}
+
+# Contadores que cambian con cada reserva y no forman parte de ninguna respuesta
+# cacheable: cambiarlos no sube la versión (la de "users" sería otra fila caliente)
+UNVERSIONED_FIELDS = {"active_reservations"}
+
+# Las filas de versión por valor se crean con la fila a la que se refieren: la de
+# "reservations.resource_id=5" al crear el recurso 5. Las existentes las crea la
+# migración c4e9a2d7f158, así que al subir una versión nunca hace falta insertarla.
+SCOPE_OWNERS = {
+    "resources": (("reservations", "resource_id"),),
+    "users": (("reservations", "user_id"),),
+}
+
+
+def scoped_key(table: str, column: str, value) -> str:
+    return f"{table}.{column}={value}"
+
+
+def bulk_key(table: str) -> str:
+    """Versión que suben las escrituras masivas, que no saben a qué valores afectan."""
+    return f"{table}.*"
+
+
+def bump_table_versions(db: Session, *tables: str) -> None:
+    """
+    Incrementa la versión de las tablas indicadas dentro de la transacción actual.
+    Las escrituras ORM lo hacen solas (ver `_bump_on_flush`); las sentencias
+    UPDATE/DELETE masivas deben llamarlo explícitamente. En las tablas con
+    versiones por columna sube `bulk_key`, porque no se sabe qué valores han cambiado.
+    """
+    _bump_keys(db, {bulk_key(table) if table in SCOPED_COLUMNS else table for table in tables})
+
+
+def _bump_keys(db: Session, keys: Iterable[str]) -> None:
+    now = datetime.utcnow()
+    conn = db.connection()
+    missing = set()
+    # Siempre en el mismo orden para que dos transacciones no se bloqueen entre sí
+    for key in sorted(set(keys)):
+        result = conn.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == key)
+            .values(version=TableVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            missing.add(key)
+
+    # Una versión por valor sin fila (datos insertados fuera de la aplicación):
+    # se sube la masiva de su tabla, que siempre existe, en vez de insertarla
+    fallback = {bulk_key(key.split(".", 1)[0]) for key in missing if "=" in key} - set(keys)
+    for key in sorted(fallback):
+        conn.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == key)
+            .values(version=TableVersion.version + 1, updated_at=now)
+        )
+
+
+def _create_keys(db: Session, keys: Iterable[str]) -> None:
+    """
+    Crea las filas de versión de filas nuevas. Nadie más puede estar creando la
+    misma clave (el id es nuevo); si ya existe (id reutilizado) se conserva la
+    versión que tenía, para que un ETag antiguo no vuelva a coincidir.
+    """
+    now = datetime.utcnow()
+    rows = [{"table_name": key, "version": 1, "updated_at": now} for key in sorted(keys)]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(TableVersion).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        statement = sqlite.insert(TableVersion).on_conflict_do_nothing()
+    else:
+        statement = insert(TableVersion).prefix_with("IGNORE")
+    db.connection().execute(statement, rows)
+
+
+def _versioned_change(obj) -> bool:
+    state = inspect(obj)
+    return any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in state.mapper.column_attrs
+        if attr.key not in UNVERSIONED_FIELDS
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session: Session, flush_context) -> None:
+    """
+    Detecta qué tablas seguidas se han modificado en el flush y sube su versión
+    (en las de SCOPED_COLUMNS, solo la de los valores de cada fila, antes y después
+    del cambio). Crea también las versiones por valor de las filas nuevas (SCOPE_OWNERS).
+    """
+    keys, created = set(), set()
+    for obj in session.new:
+        for table, column in SCOPE_OWNERS.get(getattr(obj, "__tablename__", None), ()):
+            created.add(scoped_key(table, column, obj.id))
+    changed = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if _versioned_change(obj)
+    ]
+    for obj in changed:
+        table = getattr(obj, "__tablename__", None)
+        if table not in TRACKED_TABLES:
+            continue
+        if table not in SCOPED_COLUMNS:
+            keys.add(table)
+            continue
+        for column in SCOPED_COLUMNS[table]:
+            history = inspect(obj).attrs[column].history
+            values = [value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None]
+            for value in values:
+                keys.add(scoped_key(table, column, value))
+            if not values:
+                # Atributo sin cargar: no se sabe a qué valor afecta
+                keys.add(bulk_key(table))
+
+    if created:
+        _create_keys(session, created)
+    if keys:
+        _bump_keys(session, keys)
+
+
+def _derived_version(db: Session, table: str) -> Tuple[int, Optional[datetime]]:
+    """
+    Versión de toda una tabla de SCOPED_COLUMNS: la suma de sus versiones por la
+    primera columna más la masiva. Toda escritura sube una de ellas, así que la
+    suma cambia siempre; se lee con un recorrido por rango de la clave primaria.
+    """
+    prefix = scoped_key(table, SCOPED_COLUMNS[table][0], "")
+    version, updated_at = db.query(func.sum(TableVersion.version), func.max(TableVersion.updated_at)).filter(
+        or_(TableVersion.table_name.startswith(prefix, autoescape=True),
+            TableVersion.table_name == bulk_key(table))
+    ).one()
+    return int(version or 0), updated_at
+
+
+def get_table_versions(db: Session, tables: Iterable[str]) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """Lee las versiones (consultas a una tabla diminuta) y la última modificación."""
+    tables = list(tables)
+    rows = db.query(TableVersion.table_name, TableVersion.version, TableVersion.updated_at).filter(
+        TableVersion.table_name.in_([t for t in tables if t not in SCOPED_COLUMNS])
+    ).all()
+    versions = {name: version for name, version, _ in rows}
+    modified = [updated_at for _, _, updated_at in rows]
+    for table in tables:
+        if table in SCOPED_COLUMNS:
+            versions[table], updated_at = _derived_version(db, table)
+            modified.append(updated_at)
+    last_modified = max((updated_at for updated_at in modified if updated_at is not None), default=None)
+    return versions, last_modified
+
+
+class Conditional:
+    """
+    Resultado de evaluar una petición condicional (If-None-Match / If-Modified-Since).
+    Si `not_modified` es True, el endpoint debe devolver `response_304()` sin consultar nada más.
+    """
+
+    def __init__(self, etag: str, last_modified: Optional[datetime], not_modified: bool):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                self.last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True
+            )
+        return headers
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers)
+        return response
+
+    def response_304(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+def evaluate_conditional(request: Request, db: Session, tables: Iterable[str], scope: str = "") -> Conditional:
+    """
+    Calcula ETag/Last-Modified a partir de las versiones de `tables` y comprueba
+    las cabeceras condicionales de la petición. `scope` distingue respuestas que
+    dependen de quién pregunta (por ejemplo, las reservas de cada usuario).
+    """
+    tables = sorted(tables)
+    versions, last_modified = get_table_versions(db, tables)
+    fingerprint = scope + "|" + ",".join(f"{t}:{versions.get(t, 0)}" for t in tables)
+    etag = 'W/"' + hashlib.sha1(fingerprint.encode()).hexdigest() + '"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        not_modified = etag in candidates or "*" in candidates
+        return Conditional(etag, last_modified, not_modified)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    not_modified = False
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).astimezone(timezone.utc).replace(tzinfo=None)
+            not_modified = last_modified.replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            not_modified = False
+    return Conditional(etag, last_modified, not_modified)
@@ -1,23 +1,37 @@
 # app/dependencies/auth.py
 
-from fastapi import Depends, HTTPException, status
+import logging
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.database import get_db
+from app.core.config import DEFAULT_TENANT
+from app.core.calendar import user_from_feed_token
+from app.core.tokens import TokenUser, denylist
+from app.database import get_db, get_feed_db, shard_key
+from app.dependencies.tenant import get_feed_tenant, get_tenant
 from app.models.user import User
 
+logger = logging.getLogger("app.auth")
+
 oauth2_scheme = HTTPBearer()
+# Para los calendarios .ics, que también aceptan un token en la URL
+optional_oauth2_scheme = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+def get_token_user(
     token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    print(">>> get_current_user SE ESTÁ EJECUTANDO")
-    print(">>> TOKEN RECIBIDO:", token)
+    tenant: str = Depends(get_tenant),
+) -> TokenUser:
+    """
+    Valida el token de acceso sin consultar la base de datos: firma, caducidad,
+    sede y lista de revocados en memoria. Devuelve el id y el rol del token.
+    """
+    # jose se importa aquí para no cargarlo al importar la aplicación
+    from jose import JWTError, jwt
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,42 +41,99 @@ def get_current_user(
 
     try:
         payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        print(">>> PAYLOAD DECODIFICADO:", payload)
 
         user_id_str = payload.get("sub")
-        print(">>> USER_ID OBTENIDO DEL TOKEN (str):", user_id_str)
-
         if user_id_str is None:
-            print(">>> USER_ID ES NONE → 401")
+            logger.debug("Token sin sub → 401")
             raise credentials_exception
 
         # Convertir a int
         try:
             user_id = int(user_id_str)
         except ValueError:
-            print(">>> USER_ID NO ES UN INT VÁLIDO → 401")
+            logger.debug("Token con sub no numérico → 401")
             raise credentials_exception
 
-        print(">>> USER_ID CONVERTIDO A INT:", user_id)
+        # El token debe pertenecer a la misma base de datos que la sede de la petición
+        source = shard_key(tenant)
+        if shard_key(payload.get("tid", DEFAULT_TENANT)) != source:
+            logger.debug("Token de usuario %s emitido para otro shard → 401", user_id)
+            raise credentials_exception
+
+        # Los tokens sin jti/rol/iat son anteriores a la revocación: hay que volver a entrar
+        if not all(payload.get(claim) for claim in ("jti", "role", "iat")):
+            logger.debug("Token de usuario %s sin jti/role/iat → 401", user_id)
+            raise credentials_exception
 
     except JWTError as e:
-        print(">>> JWTError EN DECODE:", e)
+        logger.debug("Token no válido (%s) → 401", type(e).__name__)
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    print(">>> USER EN BD:", user)
+    denylist.maybe_sync()
+    if denylist.is_revoked(source, payload["jti"], user_id, payload["iat"]):
+        logger.debug("Token revocado de usuario %s → 401", user_id)
+        raise credentials_exception
+
+    return TokenUser(
+        id=user_id,
+        role=payload["role"],
+        tenant=tenant,
+        jti=payload["jti"],
+        issued_at=payload["iat"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    )
 
+
+def get_current_user(
+    token_user: TokenUser = Depends(get_token_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Usuario autenticado cargado de la base de datos (para los endpoints que lo necesitan)."""
+    user = db.query(User).filter(User.id == token_user.id).first()
     if user is None:
-        print(">>> USER ES NONE → 401")
-        raise credentials_exception
+        logger.debug("Usuario %s del token no existe → 401", token_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudo validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin(current_user: TokenUser = Depends(get_token_user)) -> TokenUser:
+    # El rol viene en el token; los cambios de rol se aplican al refrescar
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de administrador",
         )
     return current_user
+
+
+def get_feed_user_id(
+    token: str | None = Query(default=None, description="Token de calendario (GET /users/me/calendar-token)"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_oauth2_scheme),
+    tenant: str = Depends(get_feed_tenant),
+    db: Session = Depends(get_feed_db),
+) -> int:
+    """
+    Usuario de un calendario personal: el del token de calendario de la URL (para
+    suscribirse desde aplicaciones que no envían cabeceras) o el del token de acceso.
+    """
+    if token is not None:
+        user_id = user_from_feed_token(db, token, tenant)
+        if user_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de calendario no válido",
+            )
+        return user_id
+
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudo validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_token_user(credentials, tenant).id
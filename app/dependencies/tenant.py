@@ -0,0 +1,40 @@
+# app/dependencies/tenant.py
+
+import re
+
+from fastapi import Depends, Header, HTTPException, Query, status
+
+from app.core.config import DEFAULT_TENANT, TENANT_HEADER
+
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def get_tenant(
+    tenant: str | None = Header(default=None, alias=TENANT_HEADER),
+) -> str:
+    """
+    Devuelve la sede (tenant) de la petición a partir de la cabecera X-Tenant-ID.
+    Si no se envía, se usa la sede por defecto.
+    """
+    if tenant is None or tenant == "":
+        return DEFAULT_TENANT
+
+    if not TENANT_PATTERN.match(tenant):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Identificador de sede no válido",
+        )
+    return tenant
+
+
+def get_feed_tenant(
+    tenant: str | None = Query(default=None, description="Sede (las aplicaciones de calendario no envían cabeceras)"),
+    header_tenant: str = Depends(get_tenant),
+) -> str:
+    """
+    Sede de los calendarios .ics: la del parámetro `tenant` si se envía y, si no,
+    la de la cabecera X-Tenant-ID (o la sede por defecto).
+    """
+    if tenant is None or tenant == "":
+        return header_tenant
+    return get_tenant(tenant)
@@ -1,31 +1,151 @@
 # main.py
 
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from app.routers import auth, users, resources, categories, reservations  
+from sqlalchemy.orm import configure_mappers
+from starlette.concurrency import run_in_threadpool
+
+from app.core import config, security
+from app.core.serialization import FastJSONResponse
+# Registra el listener que sube la versión de cada tabla al escribir en ella
+from app.core import versioning  # noqa: F401
+# Registra el listener que mantiene reservation_slots (OVERLAP_MODE=database)
+from app.core import overlap  # noqa: F401
+# Registra los listeners que guardan el registro de auditoría
+from app.core import audit  # noqa: F401
+from app import database
+
+logger = logging.getLogger("app.startup")
+
+
+def _warm_up() -> None:
+    """
+    Trabajo de arranque que de otro modo pagaría la primera petición:
+    - compila los mappers del ORM (relaciones, columnas) una sola vez
+    - abre las primeras conexiones del pool
+    - carga bcrypt y jose
+    - carga la lista de tokens revocados
+    """
+    from app.core.tokens import denylist
+
+    configure_mappers()
+    database.warm_up()
+    security.warm_up()
+    denylist.maybe_sync()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque y parada de la aplicación:
+    - fija el tamaño del threadpool (THREADPOOL_SIZE)
+    - precalienta ORM, pool de conexiones y librerías pesadas
+    - pone en marcha los trabajadores de trabajos en segundo plano
+    - empieza a leer los avisos de los demás procesos (COORDINATION_BACKEND=database)
+    - arranca el planificador de recordatorios (con varios procesos, solo en el líder)
+    - los detiene ordenadamente al apagar (y escribe la auditoría pendiente)
+    """
+    from app.core.coordination import LeaderService, broadcast
+    from app.core.jobs import JobRunner
+    from app.core.reminders import ReminderScheduler
+    from app.core.tasks import ensure_periodic_jobs
+
+    started = time.perf_counter()
+    # Hilos para los endpoints síncronos (y para lo que se lanza con run_in_threadpool)
+    to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
+    if config.WARM_UP_ON_STARTUP:
+        await run_in_threadpool(_warm_up)
+
+    engines = database.all_engines()
+    runner = JobRunner(list(engines.values()))
+    if runner.workers > 0:
+        with database.SessionLocal() as db:
+            ensure_periodic_jobs(db)
+        runner.start()
+
+    broadcast.start()
 
-app = FastAPI()
+    scheduler = LeaderService("reminders", lambda: ReminderScheduler(engines)) if config.REMINDERS_ENABLED else None
+    if scheduler is not None:
+        scheduler.start()
+    app.state.reminders = scheduler
 
-# Endpoint raíz para comprobar que la API funciona
-@app.get("/")
-def root():
-    return {"message": "API Sistema de Reservas funcionando correctamente"}
+    logger.info("Aplicación lista en %.0f ms", (time.perf_counter() - started) * 1000)
 
-# Endpoint para manejar errores globales
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
+    yield
+
+    if scheduler is not None:
+        scheduler.stop()
+    broadcast.stop()
+    runner.stop()
+    audit.writer.stop()
+
+
+def create_app() -> FastAPI:
     """
-    Captura errores inesperados y devuelve un mensaje uniforme.
-    No reemplaza los HTTPException normales.
+    Construye la aplicación: middlewares, manejadores y routers.
+    No abre conexiones: los engines se crean en el arranque (lifespan) o en el primer uso.
     """
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Error interno del servidor"},
-    )
-
-# Registrar router de autenticación
-app.include_router(auth.router)
-app.include_router(users.router)
-app.include_router(resources.router) 
-app.include_router(categories.router)
-app.include_router(reservations.router)
\ No newline at end of file
+    from app.routers import auth, users, resources, categories, reservations, admin, health
+
+    # orjson como serializador por defecto para todas las respuestas
+    app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+
+    # Orden de los middlewares: el último añadido es el más externo.
+
+    # Actor (usuario del token, sede y ruta) de los cambios que se auditan
+    if config.AUDIT_ENABLED:
+        app.add_middleware(audit.AuditContextMiddleware)
+
+    # Reintentos seguros con cabecera Idempotency-Key en las escrituras.
+    # Va por dentro de la compresión para guardar la respuesta sin comprimir
+    if config.IDEMPOTENCY_ENABLED:
+        from app.core.idempotency import IdempotencyMiddleware
+        app.add_middleware(IdempotencyMiddleware)
+
+    # Compresión gzip/brotli de las respuestas grandes
+    if config.COMPRESSION_ENABLED:
+        from app.core.compression import CompressionMiddleware
+        app.add_middleware(CompressionMiddleware)
+
+    # Limitación de peticiones y control de concurrencia (429 + Retry-After).
+    # Se añade el último para que sea el más externo y rechace antes que nada
+    if config.RATE_LIMIT_ENABLED:
+        from app.core.rate_limit import RateLimitMiddleware
+        app.add_middleware(RateLimitMiddleware)
+
+    # Endpoint raíz para comprobar que la API funciona
+    @app.get("/")
+    def root():
+        return {"message": "API Sistema de Reservas funcionando correctamente"}
+
+    # Endpoint para manejar errores globales
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        """
+        Captura errores inesperados y devuelve un mensaje uniforme.
+        No reemplaza los HTTPException normales.
+        """
+        return JSONResponse(
+            status_code=500,
+            content={"detail": "Error interno del servidor"},
+        )
+
+    # Registrar routers
+    app.include_router(auth.router)
+    app.include_router(users.router)
+    app.include_router(resources.router)
+    app.include_router(categories.router)
+    app.include_router(reservations.router)
+    app.include_router(admin.router)
+    app.include_router(health.router)
+
+    return app
+
+
+app = create_app()
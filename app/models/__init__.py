@@ -9,5 +9,15 @@ from .resource_category import ResourceCategory
 from .resource import Resource
 from .reservation import Reservation
 from .custom_field import CustomField
+from .user_usage import UserUsage
+from .idempotency_key import IdempotencyKey
+from .table_version import TableVersion
+from .job import Job
 
 
+from .reservation_slot import ReservationSlot
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
+from .coordination_lock import CoordinationLock
+from .coordination_event import CoordinationEvent
+from .audit_log import AuditLog
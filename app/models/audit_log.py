@@ -0,0 +1,34 @@
+# app/models/audit_log.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.database import Base
+
+class AuditLog(Base):
+    """
+    Registro de solo inserción de los cambios confirmados: quién, cuándo, sobre qué
+    entidad y con qué valores antes/después. Lo escribe por lotes app/core/audit.py.
+    """
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        # Historial de una entidad (o de un tipo de entidad) del más reciente al más antiguo
+        Index("ix_audit_log_entity_entity_id_id", "entity", "entity_id", "id"),
+        # Cambios hechos por un usuario
+        Index("ix_audit_log_actor_id_id", "actor_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    tenant_id = Column(String(64), nullable=False, default="default")
+    # Usuario del token (None en peticiones anónimas y trabajos en segundo plano)
+    actor_id = Column(Integer)
+    # "admin", "user", "anonymous" o "job:<nombre>"
+    actor = Column(String(120), nullable=False)
+    # create, update, delete, bulk_update o bulk_delete
+    action = Column(String(20), nullable=False)
+    # Tabla afectada e id de la fila (None en las operaciones masivas)
+    entity = Column(String(64), nullable=False)
+    entity_id = Column(Integer)
+    # JSON: {"before": {...}, "after": {...}}; en las masivas, la sentencia y las filas afectadas
+    changes = Column(Text, nullable=False)
+    # Método y ruta de la petición que originó el cambio
+    request = Column(String(255))
@@ -0,0 +1,18 @@
+# app/models/coordination_event.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.database import Base
+
+class CoordinationEvent(Base):
+    """
+    Aviso de un proceso a los demás (token revocado, reserva nueva...).
+    Se escribe en la transacción que lo origina y los procesos lo leen por created_at.
+    """
+    __tablename__ = "coordination_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Proceso que lo publicó (no se lo vuelve a entregar a sí mismo)
+    origin = Column(String(32), nullable=False)
+    channel = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,17 @@
+# app/models/coordination_lock.py
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+from app.database import Base
+
+class CoordinationLock(Base):
+    """
+    Fila por bloqueo con nombre, compartida por todos los procesos:
+    - Bloqueos de transacción: se hace UPDATE de la fila y queda bloqueada hasta el COMMIT.
+    - Bloqueos de líder (bases sin bloqueos de sesión): `owner` lo tiene hasta `expires_at`.
+    """
+    __tablename__ = "coordination_locks"
+
+    name = Column(String(191), primary_key=True)
+    owner = Column(String(64))
+    expires_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class CustomField(Base):
     __tablename__ = "custom_fields"
+    __table_args__ = (
+        # Campos de los recursos de una página, en orden (resource_id IN (...) ORDER BY id)
+        Index("ix_custom_fields_resource_id_id", "resource_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False)
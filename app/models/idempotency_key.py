@@ -0,0 +1,26 @@
+# app/models/idempotency_key.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """
+    Respuesta almacenada para una petición con cabecera Idempotency-Key.
+    Un reintento con la misma clave devuelve esta respuesta sin volver a ejecutar el endpoint.
+    Mientras la petición original está en curso, la fila existe sin respuesta (status_code nulo).
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("owner", "key", name="uq_idempotency_keys_owner_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Quién hizo la petición: "<sede>/user:<id>" o "<sede>/ip:<dirección>"
+    owner = Column(String(255), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    content_type = Column(String(255))
+    response_body = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,28 @@
+# app/models/job.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.database import Base
+
+class Job(Base):
+    """
+    Trabajo diferido. Se guarda en la misma transacción que lo genera,
+    así sobrevive a reinicios y solo existe si la operación original se confirmó.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Los trabajadores buscan por estado y fecha de ejecución
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    # pending -> running -> done / failed (vuelve a pending si quedan reintentos)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    last_error = Column(Text)
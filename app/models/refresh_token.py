@@ -0,0 +1,23 @@
+# app/models/refresh_token.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.database import Base
+
+class RefreshToken(Base):
+    """
+    Token de refresco. Solo se guarda su hash SHA-256.
+    Cada uso lo consume y emite otro de la misma familia (rotación); si se vuelve
+    a presentar uno ya consumido se revoca la familia entera (reutilización).
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Todos los tokens que salen de un mismo login comparten familia
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    tenant_id = Column(String(64), nullable=False, default="default")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    # Momento en que se consumió (rotación) o se revocó; NULL = todavía válido
+    revoked_at = Column(DateTime)
@@ -1,14 +1,27 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Solapamiento y listados por recurso dentro de una sede
+        Index("ix_reservations_tenant_resource_start", "tenant_id", "resource_id", "start_time"),
+        # "Mis reservas" dentro de una sede, también por rango de fechas (calendario .ics)
+        Index("ix_reservations_tenant_user_start", "tenant_id", "user_id", "start_time"),
+        # Reservas de un conjunto de recursos sin filtrar por sede (borrados masivos de admin)
+        Index("ix_reservations_resource_start", "resource_id", "start_time"),
+        # Reservas activas ya terminadas (trabajo archive_reservations)
+        Index("ix_reservations_status_end", "status", "end_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Sede a la que pertenece la reserva (la misma que la del recurso)
+    tenant_id = Column(String(64), nullable=False, default="default", server_default="default")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False)
-    start_time = Column(DateTime, nullable=False)
+    # Índice propio para recorrer las próximas reservas por fecha (recordatorios)
+    start_time = Column(DateTime, nullable=False, index=True)
     end_time = Column(DateTime, nullable=False)
     status = Column(String(50), default="active")
 
@@ -0,0 +1,22 @@
+# app/models/reservation_slot.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class ReservationSlot(Base):
+    """
+    Franja ocupada de un recurso. La clave primaria (resource_id, slot_start)
+    hace que dos reservas no puedan ocupar la misma franja: el solapamiento
+    se detecta al insertar, con una búsqueda por índice.
+    """
+    __tablename__ = "reservation_slots"
+
+    resource_id = Column(Integer, ForeignKey("resources.id"), primary_key=True)
+    slot_start = Column(DateTime, primary_key=True)
+    reservation_id = Column(
+        Integer, ForeignKey("reservations.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    # Permite crear las franjas en el mismo flush que la reserva (aún sin id)
+    reservation = relationship("Reservation")
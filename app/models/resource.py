@@ -1,14 +1,30 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, Time
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Resource(Base):
     __tablename__ = "resources"
+    __table_args__ = (
+        # Todas las consultas de recursos filtran por sede
+        Index("ix_resources_tenant_id_id", "tenant_id", "id"),
+        # Recursos de una categoría (filtro del listado y operaciones masivas de admin)
+        Index("ix_resources_tenant_category", "tenant_id", "category_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Sede a la que pertenece el recurso
+    tenant_id = Column(String(64), nullable=False, default="default", server_default="default")
     name = Column(String(255), nullable=False)
     description = Column(String(500))
     is_active = Column(Boolean, default=True)
+    # Reserva por franjas fijas (15, 30... minutos). Si se indica, las reservas deben
+    # ir alineadas y ocupan filas en reservation_slots (conflictos por clave única)
+    slot_minutes = Column(Integer, nullable=True)
+    # Zona horaria IANA del recurso: las fechas sin zona que llegan para él se
+    # interpretan en ella y el horario de apertura se expresa en hora local
+    timezone = Column(String(64), nullable=False, default="UTC", server_default="UTC")
+    opens_at = Column(Time, nullable=True)
+    closes_at = Column(Time, nullable=True)
 
     # Relación con categoría
     category_id = Column(Integer, ForeignKey("resource_categories.id"), nullable=True)
@@ -0,0 +1,21 @@
+# app/models/revoked_token.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+class RevokedToken(Base):
+    """
+    Revocación de tokens de acceso, que cada proceso copia a su lista en memoria.
+    - Con `jti`: revoca ese token concreto (logout).
+    - Sin `jti`: revoca todos los tokens del usuario emitidos hasta `revoked_at`
+      (logout en todos los dispositivos, cambio de contraseña, baja).
+    La fila deja de hacer falta en `expires_at`, cuando ya no queda ningún token afectado vivo.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True)
+    # Sin clave foránea: la revocación debe sobrevivir al borrado del usuario
+    user_id = Column(Integer, nullable=False)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,15 @@
+# app/models/table_version.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+class TableVersion(Base):
+    """
+    Contador de versión por tabla. Se incrementa en cada escritura sobre la tabla,
+    en la misma transacción, y permite responder 304 sin ejecutar el listado.
+    """
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
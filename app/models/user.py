@@ -1,15 +1,42 @@
 # app/models/user.py
+import secrets
+
 from sqlalchemy import Column, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
 
+
+def normalize_email(email: str) -> str:
+    """Forma con la que se guardan y se buscan los emails: sin espacios y en minúsculas."""
+    return email.strip().lower()
+
+
+def new_feed_secret() -> str:
+    return secrets.token_hex(16)
+
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Único y siempre normalizado: el índice único resuelve los duplicados sin importar mayúsculas
     email = Column(String(255), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     role = Column(String(50), default="user")
 
+    # Contador de reservas activas (se mantiene al crear/cancelar)
+    active_reservations = Column(Integer, nullable=False, default=0)
+
+    # Secreto del token de calendario (.ics). Al cambiarlo dejan de valer los enlaces
+    # anteriores; None = sin generar todavía (o revocado)
+    feed_secret = Column(String(32), default=new_feed_secret)
+
     # Relación con Reservation
     reservations = relationship("Reservation", back_populates="user")
+
+    # Relación con los contadores de uso por periodo
+    usage = relationship("UserUsage", back_populates="user")
+
+    @validates("email")
+    def _normalize_email(self, key, value):
+        return normalize_email(value) if value is not None else value
@@ -0,0 +1,23 @@
+# app/models/user_usage.py
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class UserUsage(Base):
+    """
+    Contadores de uso por usuario y periodo (semana ISO, empezando en lunes).
+    Se actualizan en la misma transacción que crea o cancela la reserva,
+    así las comprobaciones de cuota no necesitan contar filas de `reservations`.
+    """
+    __tablename__ = "user_usage"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period_start", name="uq_user_usage_user_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    period_start = Column(Date, nullable=False)
+    reservation_count = Column(Integer, nullable=False, default=0)
+    reserved_minutes = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User", back_populates="usage")
@@ -0,0 +1,312 @@
+# app/routers/admin.py
+
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import get_db, shard_key
+from app.models.audit_log import AuditLog
+from app.models.custom_field import CustomField
+from app.models.refresh_token import RefreshToken
+from app.models.reservation import Reservation
+from app.models.resource import Resource
+from app.models.resource_category import ResourceCategory
+from app.models.user import User, normalize_email
+from app.models.user_usage import UserUsage
+from app.schemas.admin import AuditEntryResponse, AuditPage, BulkOperationResponse
+from app.core.jobs import enqueue
+from app.core.overlap import delete_slots
+from app.core.reminders import unschedule_reservations
+from app.core.timeutils import to_utc
+from app.core.tokens import TokenUser, revoke_user_tokens
+from app.core.versioning import bump_table_versions
+from app.dependencies.auth import get_current_admin
+from app.dependencies.tenant import get_tenant
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+# Dominio de email para los borrados masivos: "empresa.com", "mail.empresa.es"
+DOMAIN_PATTERN = re.compile(r"^[a-z0-9](?:[a-z0-9-]*[a-z0-9])?(?:\.[a-z0-9](?:[a-z0-9-]*[a-z0-9])?)+$")
+
+# Operaciones masivas de mantenimiento.
+# Cada una es un UPDATE/DELETE por conjuntos (sin cargar las filas en el ORM),
+# así que hay que subir a mano la versión de las tablas tocadas y recalcular
+# en segundo plano los contadores de cuota de los usuarios afectados.
+
+
+def _delete_reservations(db: Session, *criteria) -> Tuple[int, List[Tuple[int, datetime]]]:
+    """
+    Borra las reservas que cumplen `criteria` con un único DELETE.
+    Encola `rebuild_user_usage` para cada usuario afectado y devuelve cuántas
+    se han borrado y las próximas (id, start_time) para quitar sus recordatorios.
+    """
+    user_ids = [user_id for (user_id,) in db.query(Reservation.user_id).filter(*criteria).distinct()]
+    if not user_ids:
+        return 0, []
+
+    upcoming = db.query(Reservation.id, Reservation.start_time).filter(
+        *criteria,
+        Reservation.status == "active",
+        Reservation.start_time > datetime.utcnow(),
+    ).all()
+
+    delete_slots(db, *criteria)
+    deleted = db.query(Reservation).filter(*criteria).delete(synchronize_session=False)
+    for user_id in user_ids:
+        enqueue(db, "rebuild_user_usage", {"user_id": user_id})
+    return deleted, [(row.id, row.start_time) for row in upcoming]
+
+
+def _check_category(db: Session, category_id: Optional[int]) -> None:
+    if category_id is not None and not db.query(ResourceCategory.id).filter(ResourceCategory.id == category_id).first():
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+
+
+# -------------------------
+# Recursos
+# -------------------------
+
+@router.post("/resources/deactivate", response_model=BulkOperationResponse)
+def deactivate_resources(
+    category_id: int,
+    cancel_future_reservations: bool = False,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Desactiva todos los recursos de una categoría en la sede.
+    Opcionalmente cancela (elimina) sus reservas futuras.
+    """
+    _check_category(db, category_id)
+    resource_ids = select(Resource.id).where(Resource.tenant_id == tenant, Resource.category_id == category_id)
+
+    affected = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.category_id == category_id,
+        Resource.is_active.isnot(False),  # las ya inactivas no cuentan como afectadas
+    ).update({Resource.is_active: False}, synchronize_session=False)
+
+    reservations_deleted, upcoming = 0, []
+    if cancel_future_reservations:
+        reservations_deleted, upcoming = _delete_reservations(
+            db,
+            Reservation.tenant_id == tenant,
+            Reservation.resource_id.in_(resource_ids),
+            Reservation.start_time > datetime.utcnow(),
+        )
+
+    bump_table_versions(db, "resources", *(["reservations"] if reservations_deleted else []))
+    unschedule_reservations(db, upcoming, shard_key(tenant))
+    db.commit()
+    return BulkOperationResponse(affected=affected, reservations_deleted=reservations_deleted)
+
+
+@router.post("/resources/reassign", response_model=BulkOperationResponse)
+def reassign_resources(
+    to_category_id: Optional[int] = None,
+    from_category_id: Optional[int] = None,
+    uncategorized: bool = False,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Mueve a `to_category_id` (o deja sin categoría si no se indica) todos los
+    recursos de `from_category_id`, o los que no tienen categoría con `uncategorized`.
+    """
+    if (from_category_id is None) == (not uncategorized):
+        raise HTTPException(status_code=400, detail="Indica from_category_id o uncategorized (solo uno de los dos)")
+    _check_category(db, to_category_id)
+
+    source = Resource.category_id.is_(None) if uncategorized else Resource.category_id == from_category_id
+    affected = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        source,
+    ).update({Resource.category_id: to_category_id}, synchronize_session=False)
+
+    bump_table_versions(db, "resources")
+    db.commit()
+    return BulkOperationResponse(affected=affected)
+
+
+@router.delete("/resources", response_model=BulkOperationResponse)
+def delete_resources(
+    category_id: int,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    """
+    Elimina todos los recursos de una categoría en la sede,
+    junto con sus campos personalizados y sus reservas.
+    """
+    _check_category(db, category_id)
+    resource_ids = select(Resource.id).where(Resource.tenant_id == tenant, Resource.category_id == category_id)
+
+    custom_fields_deleted = db.query(CustomField).filter(
+        CustomField.resource_id.in_(resource_ids)
+    ).delete(synchronize_session=False)
+    reservations_deleted, upcoming = _delete_reservations(db, Reservation.resource_id.in_(resource_ids))
+    affected = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.category_id == category_id,
+    ).delete(synchronize_session=False)
+
+    bump_table_versions(db, "resources", "custom_fields", "reservations")
+    unschedule_reservations(db, upcoming, shard_key(tenant))
+    db.commit()
+    return BulkOperationResponse(
+        affected=affected,
+        reservations_deleted=reservations_deleted,
+        custom_fields_deleted=custom_fields_deleted,
+    )
+
+
+# -------------------------
+# Usuarios
+# -------------------------
+
+@router.delete("/users", response_model=BulkOperationResponse)
+def delete_users(
+    ids: Optional[List[int]] = Query(default=None),
+    role: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin: TokenUser = Depends(get_current_admin),
+):
+    """
+    Elimina los usuarios que cumplen todos los filtros indicados (al menos uno),
+    junto con sus reservas y contadores de uso. El admin que hace la petición
+    nunca se elimina a sí mismo.
+    """
+    criteria = [User.id != admin.id]
+    if ids:
+        criteria.append(User.id.in_(ids))
+    if role is not None:
+        criteria.append(User.role == role)
+    if email_domain is not None:
+        domain = normalize_email(email_domain).lstrip("@")
+        if not DOMAIN_PATTERN.match(domain):
+            raise HTTPException(status_code=400, detail="email_domain no es un dominio válido")
+        # autoescape: un "%" o "_" en el valor no puede convertirse en comodín
+        criteria.append(User.email.endswith("@" + domain, autoescape=True))
+    if len(criteria) == 1:
+        raise HTTPException(status_code=400, detail="Indica al menos un filtro (ids, role o email_domain)")
+
+    user_ids = select(User.id).where(*criteria)
+    # Sus tokens dejan de valer en todos los procesos
+    revoke_user_tokens(db, shard_key(tenant), db.scalars(user_ids).all())
+
+    upcoming = db.query(Reservation.id, Reservation.start_time).filter(
+        Reservation.user_id.in_(user_ids),
+        Reservation.status == "active",
+        Reservation.start_time > datetime.utcnow(),
+    ).all()
+    # Los contadores de cuota desaparecen con el usuario: no hace falta recalcularlos
+    delete_slots(db, Reservation.user_id.in_(user_ids))
+    reservations_deleted = db.query(Reservation).filter(
+        Reservation.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+    db.query(UserUsage).filter(UserUsage.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(RefreshToken).filter(RefreshToken.user_id.in_(user_ids)).delete(synchronize_session=False)
+    affected = db.query(User).filter(*criteria).delete(synchronize_session=False)
+
+    bump_table_versions(db, "users", "reservations")
+    unschedule_reservations(db, [(row.id, row.start_time) for row in upcoming], shard_key(tenant))
+    db.commit()
+    return BulkOperationResponse(affected=affected, reservations_deleted=reservations_deleted)
+
+
+@router.post("/users/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_tokens(
+    user_id: int,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin: TokenUser = Depends(get_current_admin),
+):
+    """
+    Cierra todas las sesiones de un usuario: sus tokens de acceso dejan de
+    aceptarse (en cada proceso, tras la siguiente sincronización) y los de
+    refresco quedan revocados.
+    """
+    if db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    revoke_user_tokens(db, shard_key(tenant), [user_id])
+    db.commit()
+    return
+
+
+# -------------------------
+# Reservas
+# -------------------------
+
+@router.post("/reservations/rebuild-slots", status_code=status.HTTP_202_ACCEPTED)
+def rebuild_reservation_slots(
+    db: Session = Depends(get_db),
+    admin: TokenUser = Depends(get_current_admin),
+):
+    """
+    Regenera en segundo plano la tabla de franjas ocupadas (reservation_slots).
+    Necesario al activar OVERLAP_MODE=database con reservas ya existentes.
+    """
+    job = enqueue(db, "rebuild_reservation_slots")
+    db.commit()
+    return {"job_id": job.id}
+
+
+# -------------------------
+# Auditoría
+# -------------------------
+
+@router.get("/audit", response_model=AuditPage)
+def list_audit(
+    entity: Optional[str] = Query(None, description="Tabla: users, resources, reservations..."),
+    entity_id: Optional[int] = Query(None, description="Requiere entity"),
+    actor_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = Query(None, description="next_before_id de la página anterior"),
+    limit: int = Query(50, ge=1, le=200),
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    admin: TokenUser = Depends(get_current_admin),
+):
+    """
+    Registro de cambios de la sede, del más reciente al más antiguo.
+    Pagina por id (before_id) en lugar de OFFSET: cada página es un recorrido
+    corto de los índices (entity, entity_id, id) o (actor_id, id).
+    Las entradas se escriben por lotes: las de hace menos de AUDIT_FLUSH_MS pueden no aparecer aún.
+    """
+    if entity_id is not None and entity is None:
+        raise HTTPException(status_code=400, detail="entity_id requiere entity")
+
+    query = db.query(AuditLog).filter(AuditLog.tenant_id == tenant)
+    if entity is not None:
+        query = query.filter(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.filter(AuditLog.entity_id == entity_id)
+    if actor_id is not None:
+        query = query.filter(AuditLog.actor_id == actor_id)
+    if action is not None:
+        query = query.filter(AuditLog.action == action)
+    if since is not None:
+        query = query.filter(AuditLog.occurred_at >= to_utc(since))
+    if until is not None:
+        query = query.filter(AuditLog.occurred_at < to_utc(until))
+    if before_id is not None:
+        query = query.filter(AuditLog.id < before_id)
+
+    # Una fila de más para saber si hay otra página
+    rows = query.order_by(AuditLog.id.desc()).limit(limit + 1).all()
+    items = [AuditEntryResponse.model_validate(row) for row in rows[:limit]]
+    return AuditPage(items=items, next_before_id=items[-1].id if len(rows) > limit else None)
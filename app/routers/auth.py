@@ -1,19 +1,32 @@
 # app/routers/auth.py
 
-from datetime import timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.security import (
     hash_password,
     verify_password,
-    create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
-from app.database import get_db
+from app.core.tokens import (
+    TokenUser,
+    consume_refresh_token,
+    hash_token,
+    issue_tokens,
+    revoke_access_token,
+    revoke_family,
+    revoke_user_tokens,
+)
+from app.core.users import get_login_row, is_duplicate_email
+from app.database import get_db, shard_key
+from app.dependencies.auth import get_token_user
+from app.dependencies.tenant import get_tenant
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
-from app.schemas.auth import LoginRequest, TokenResponse
+from app.schemas.auth import LoginRequest, LogoutRequest, RefreshRequest, TokenResponse
 from app.schemas.user import UserResponse
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -21,39 +34,109 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_user(data: LoginRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == data.email).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El email ya está registrado",
-        )
-
+    # Sin SELECT previo: el índice único de email decide (también entre peticiones simultáneas)
     user = User(
         email=data.email,
         hashed_password=hash_password(data.password),
         role="user",
     )
     db.add(user)
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        if not is_duplicate_email(exc):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está registrado",
+        )
+
+    # La respuesta se construye antes del commit para no tener que recargar la fila
+    response = UserResponse.model_validate(user)
     db.commit()
-    db.refresh(user)
-    return user
+    return response
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+def login(
+    data: LoginRequest,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+):
+    user = get_login_row(db, data.email)
     if not user or not verify_password(data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
         )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token, refresh_token = issue_tokens(db, user, tenant)
+    db.commit()
+    return _token_response(access_token, refresh_token)
+
 
-    # 🔥 IMPORTANTE: convertir sub a string
-    access_token = create_access_token(
-        data={"sub": str(user.id)},
-        expires_delta=access_token_expires,
+def _token_response(access_token: str, refresh_token: str) -> TokenResponse:
+    return TokenResponse(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     )
 
-    return TokenResponse(access_token=access_token)
+
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(
+    data: RefreshRequest,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+):
+    """
+    Cambia un token de refresco por un par nuevo (rotación: el usado deja de valer).
+    Presentar otra vez un token ya usado revoca todos los de ese login.
+    El rol del nuevo token de acceso se lee de la base de datos.
+    """
+    token = consume_refresh_token(db, data.refresh_token, tenant)
+    user = db.query(User).filter(User.id == token.user_id).first() if token else None
+    if user is None:
+        # Se confirma igualmente: la revocación de la familia tiene que quedar guardada
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco no válido",
+        )
+
+    access_token, refresh_token = issue_tokens(db, user, tenant, family_id=token.family_id)
+    db.commit()
+    return _token_response(access_token, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    data: Optional[LogoutRequest] = None,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+):
+    """Revoca el token de acceso usado y, si se envía, el de refresco de la sesión."""
+    revoke_access_token(db, shard_key(tenant), current_user)
+    if data is not None and data.refresh_token:
+        token = db.query(RefreshToken).filter(
+            RefreshToken.token_hash == hash_token(data.refresh_token),
+            RefreshToken.user_id == current_user.id,
+        ).first()
+        if token is not None:
+            revoke_family(db, token.family_id)
+    db.commit()
+    return
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_all(
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+):
+    """Cierra todas las sesiones del usuario: revoca sus tokens de acceso y de refresco."""
+    revoke_user_tokens(db, shard_key(tenant), [current_user.id])
+    db.commit()
+    return
@@ -4,13 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.resource_category import ResourceCategory
 from app.schemas.resource_category import (
     ResourceCategoryResponse,
     ResourceCategoryCreate,
 )
 from app.dependencies.auth import get_current_admin
+from app.core.serialization import FastJSONResponse, fetch_category_dicts
 
 router = APIRouter(
     prefix="/categories",
@@ -46,8 +47,8 @@ def create_category(
 # Listar categorías (PÚBLICO)
 # -------------------------
 @router.get("/", response_model=List[ResourceCategoryResponse])
-def list_categories(db: Session = Depends(get_db)):
-    return db.query(ResourceCategory).all()
+def list_categories(db: Session = Depends(get_read_db)):
+    return FastJSONResponse(fetch_category_dicts(db))
 
 
 # -------------------------
@@ -0,0 +1,105 @@
+# app/routers/health.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from fastapi import APIRouter
+from sqlalchemy import text
+
+from app.core import config
+from app.core.saturation import pool_stats, threadpool_stats
+from app.core.security import hashing_pool
+from app.core.serialization import FastJSONResponse
+from app.database import all_engines
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+)
+
+# Endpoints para el balanceador de carga. Son async y no usan el threadpool de
+# los endpoints síncronos: deben responder justo cuando ese threadpool está lleno.
+# No pasan por la limitación de peticiones (app/core/rate_limit.py).
+
+# Hilo propio para el ping a la base de datos (no hace cola detrás de las peticiones)
+_ping_executor = ThreadPoolExecutor(1, thread_name_prefix="health-ping")
+_pending_ping: Optional[asyncio.Future] = None
+
+
+def _ping_databases() -> None:
+    for engine in all_engines().values():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+async def _database_problem() -> Optional[str]:
+    """
+    Saca una conexión de cada pool y hace SELECT 1, con HEALTH_DB_TIMEOUT_MS de margen.
+    Si el ping anterior sigue bloqueado (pool agotado) no se lanza otro.
+    """
+    global _pending_ping
+    if _pending_ping is not None and not _pending_ping.done():
+        return "La base de datos no respondió a la comprobación anterior"
+
+    _pending_ping = asyncio.get_running_loop().run_in_executor(_ping_executor, _ping_databases)
+    try:
+        await asyncio.wait_for(asyncio.shield(_pending_ping), config.HEALTH_DB_TIMEOUT_MS / 1000)
+    except asyncio.TimeoutError:
+        return f"La base de datos no responde en {config.HEALTH_DB_TIMEOUT_MS} ms"
+    except Exception:
+        return "No se puede conectar con la base de datos"
+    return None
+
+
+def saturation_report() -> dict:
+    """Esperas actuales del proceso y motivos por los que se considera saturado."""
+    threadpool = threadpool_stats()
+    pools = {name: pool_stats(engine) for name, engine in all_engines().items()}
+    bcrypt = hashing_pool.stats()
+
+    reasons: List[str] = []
+    if threadpool["waiting"] > config.HEALTH_MAX_THREADPOOL_WAITING:
+        reasons.append(f"{threadpool['waiting']} peticiones esperando un hilo")
+    for name, pool in pools.items():
+        if pool.get("avg_wait_ms", 0) > config.HEALTH_MAX_POOL_WAIT_MS:
+            reasons.append(f"Espera media de {pool['avg_wait_ms']} ms por conexión ({name})")
+    if bcrypt["backlog"] > config.HEALTH_MAX_BCRYPT_BACKLOG:
+        reasons.append(f"{bcrypt['backlog']} contraseñas esperando a bcrypt")
+
+    return {
+        "saturated": bool(reasons),
+        "reasons": reasons,
+        "threadpool": threadpool,
+        "db_pools": pools,
+        "bcrypt": bcrypt,
+    }
+
+
+@router.get("/live")
+async def live():
+    """El proceso está vivo y su event loop responde (no consulta la base de datos)."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    200 si el proceso puede atender más peticiones; 503 (con los motivos) si está
+    saturado o no llega a la base de datos, para que el balanceador le envíe menos tráfico.
+    """
+    reasons = saturation_report()["reasons"]
+    if not reasons:
+        problem = await _database_problem()
+        if problem is not None:
+            reasons.append(problem)
+
+    if reasons:
+        return FastJSONResponse(status_code=503, content={"status": "unavailable", "reasons": reasons})
+    return {"status": "ok"}
+
+
+@router.get("/saturation")
+async def saturation():
+    """Esperas por hilo, por conexión y por bcrypt, con los umbrales de saturación superados."""
+    return saturation_report()
@@ -1,15 +1,27 @@
 # app/routers/reservations.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db, shard_key
 from app.models.reservation import Reservation
 from app.models.resource import Resource
 from app.schemas.reservation import ReservationResponse
-from app.dependencies.auth import get_current_user, get_current_admin
+from app.core.overlap import database_enforced, is_aligned, is_overlap_violation, slot_minutes_for
+from app.core.quotas import consume_quota, release_quota
+from app.core.timeutils import to_utc, within_opening_hours
+from app.core.serialization import FastJSONResponse, batch_response, fetch_reservation_dicts, parse_ids
+from app.core.loaders import fetch_sparse, parse_fields, selection_key, selection_tables
+from app.core.versioning import bulk_key, evaluate_conditional, scoped_key
+from app.core.config import NOTIFICATIONS_ENABLED
+from app.core.jobs import enqueue
+from app.core.coordination import lock, resource_lock_name
+from app.core.reminders import schedule_reservation, unschedule_reservations
+from app.dependencies.auth import get_current_user, get_token_user
+from app.dependencies.tenant import get_tenant
 
 router = APIRouter(
     prefix="/reservations",
@@ -22,41 +34,85 @@ def create_reservation(
     resource_id: int,
     start_time: datetime,
     end_time: datetime,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     """
     Crea una reserva aplicando todas las reglas de negocio:
-    - recurso existe
+    - recurso existe (en la sede de la petición)
     - recurso activo
-    - fechas válidas
-    - no solapamiento
+    - fechas válidas (se guardan en UTC; las que llegan sin zona se interpretan
+      en la zona horaria del recurso)
+    - dentro del horario de apertura del recurso, si lo tiene
+    - no solapamiento (consulta previa bajo un bloqueo por recurso compartido entre
+      procesos o, con franjas/OVERLAP_MODE=database, la propia base de datos al
+      insertar; el conflicto se devuelve igualmente como 409)
+    - cuotas del usuario (reservas activas y horas semanales)
+    Todo se ejecuta contra la base principal (get_db), nunca contra una réplica.
     """
 
     # Validar recurso
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    resource = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
     if not resource:
         raise HTTPException(status_code=404, detail="Recurso no encontrado")
 
     if not resource.is_active:
         raise HTTPException(status_code=400, detail="El recurso no está disponible")
 
+    # Normalizar a UTC: a partir de aquí todas las comparaciones son entre valores UTC
+    start_time = to_utc(start_time, resource.timezone)
+    end_time = to_utc(end_time, resource.timezone)
+
     # Validar fechas
     if start_time >= end_time:
         raise HTTPException(status_code=400, detail="La fecha de inicio debe ser menor que la de fin")
 
-    # Validar solapamiento
-    overlapping = db.query(Reservation).filter(
-        Reservation.resource_id == resource_id,
-        Reservation.start_time < end_time,
-        Reservation.end_time > start_time,
-    ).first()
+    if not within_opening_hours(start_time, end_time, resource.timezone, resource.opens_at, resource.closes_at):
+        raise HTTPException(
+            status_code=400,
+            detail=f"El recurso solo se puede reservar de {resource.opens_at:%H:%M} a "
+                   f"{resource.closes_at:%H:%M} (hora de {resource.timezone})",
+        )
+
+    # Validar solapamiento.
+    # Recursos por franjas (o modo "database" en MySQL/SQLite): basta con insertar
+    # las franjas; la clave única (resource_id, slot_start) rechaza el conflicto
+    slot_minutes = slot_minutes_for(db, resource)
+    if slot_minutes is None and not database_enforced():
+        # Comprobar y después insertar solo es seguro si nadie más (ningún hilo,
+        # worker ni nodo) hace lo mismo con este recurso a la vez
+        lock(db, resource_lock_name(resource_id))
+        # Lectura con bloqueo: en MySQL (REPEATABLE READ) una lectura normal usaría la
+        # instantánea de la primera consulta de la transacción, anterior al bloqueo,
+        # y no vería la reserva que acaba de confirmar quien lo tenía
+        overlapping = db.query(Reservation).filter(
+            Reservation.tenant_id == tenant,
+            Reservation.resource_id == resource_id,
+            Reservation.start_time < end_time,
+            Reservation.end_time > start_time,
+        ).with_for_update().first()
+
+        if overlapping:
+            raise HTTPException(status_code=409, detail="El recurso ya está reservado en ese intervalo")
+
+    elif slot_minutes is not None and not (
+        is_aligned(start_time, slot_minutes) and is_aligned(end_time, slot_minutes)
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Las reservas deben empezar y terminar en múltiplos de {slot_minutes} minutos",
+        )
 
-    if overlapping:
-        raise HTTPException(status_code=409, detail="El recurso ya está reservado en ese intervalo")
+    # Validar cuotas y actualizar contadores en la misma transacción
+    consume_quota(db, current_user, start_time, end_time)
 
     # Crear reserva
     reservation = Reservation(
+        tenant_id=tenant,
         user_id=current_user.id,
         resource_id=resource_id,
         start_time=start_time,
@@ -65,6 +121,24 @@ def create_reservation(
     )
 
     db.add(reservation)
+
+    # Con franjas o en modo "database" el INSERT es la comprobación de solapamiento
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_overlap_violation(exc):
+            raise HTTPException(status_code=409, detail="El recurso ya está reservado en ese intervalo")
+        raise
+
+    # La notificación se encola en la misma transacción y se envía fuera de la petición
+    if NOTIFICATIONS_ENABLED:
+        enqueue(db, "notify_reservation_created", {"reservation_id": reservation.id})
+
+    # Si el recordatorio cae en la ventana ya cargada, se programa en cuanto se
+    # confirma (en el planificador del proceso líder, sea cual sea)
+    schedule_reservation(db, reservation, shard_key(tenant))
+
     db.commit()
     db.refresh(reservation)
 
@@ -73,32 +147,73 @@ def create_reservation(
 
 @router.get("/", response_model=List[ReservationResponse])
 def list_reservations(
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    request: Request,
+    ids: str | None = Query(default=None, description="IDs separados por comas (p. ej. 3,1,2)"),
+    fields: str | None = Query(default=None, description="Campos a devolver (p. ej. id,start_time,resource.name,user.email)"),
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_token_user),
 ):
     """
-    Lista reservas:
+    Lista reservas de la sede:
     - Admin: todas
     - Usuario: solo las suyas
+    Se lee de una réplica si hay alguna disponible.
+    Se consultan solo las columnas necesarias y se serializan directamente.
+    Con `ids` devuelve solo esas reservas, en el orden pedido; las que no existen
+    (o son de otro usuario) se indican en la cabecera X-Missing-IDs.
+    Con `fields` devuelve solo esos campos y puede incluir el recurso y el usuario
+    de cada reserva (resource, resource.category, user...), cargados por lotes.
+    Devuelve 304 sin consultar si las reservas no han cambiado (If-None-Match).
     """
-    if current_user.role == "admin":
-        return db.query(Reservation).all()
+    id_list = parse_ids(ids) if ids is not None else None
+    selection = parse_fields(fields, "reservation") if fields is not None else None
+    is_admin = current_user.role == "admin"
+    tables = selection_tables("reservation", selection)
+    if not is_admin:
+        # Las reservas del usuario solo cambian con su versión (o con una escritura masiva)
+        tables.remove("reservations")
+        tables += [scoped_key("reservations", "user_id", current_user.id), bulk_key("reservations")]
+    conditional = evaluate_conditional(
+        request, db, tables,
+        scope=f"{tenant}:" + ("all" if is_admin else f"user:{current_user.id}")
+        + (f":ids={id_list}" if id_list else "")
+        + (f":fields={selection_key(selection)}" if selection else ""),
+    )
+    if conditional.not_modified:
+        return conditional.response_304()
+
+    criteria = [Reservation.tenant_id == tenant]
+    if not is_admin:
+        criteria.append(Reservation.user_id == current_user.id)
 
-    return db.query(Reservation).filter(Reservation.user_id == current_user.id).all()
+    if id_list:
+        criteria.append(Reservation.id.in_(id_list))
+
+    if selection:
+        items = fetch_sparse(db, "reservation", selection, *criteria)
+    else:
+        items = fetch_reservation_dicts(db, *criteria)
+
+    return conditional.apply(batch_response(items, id_list) if id_list else FastJSONResponse(items))
 
 
 @router.get("/{reservation_id}", response_model=ReservationResponse)
 def get_reservation(
     reservation_id: int,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_token_user),
 ):
     """
     Devuelve una reserva por ID.
     - Admin: puede ver cualquier reserva
     - Usuario: solo las suyas
     """
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = db.query(Reservation).filter(
+        Reservation.tenant_id == tenant,
+        Reservation.id == reservation_id,
+    ).first()
 
     if not reservation:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
@@ -112,15 +227,19 @@ def get_reservation(
 @router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
 def cancel_reservation(
     reservation_id: int,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_token_user),
 ):
     """
     Cancela una reserva.
     - Admin: puede cancelar cualquier reserva
     - Usuario: solo las suyas
     """
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = db.query(Reservation).filter(
+        Reservation.tenant_id == tenant,
+        Reservation.id == reservation_id,
+    ).first()
 
     if not reservation:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
@@ -128,6 +247,20 @@ def cancel_reservation(
     if current_user.role != "admin" and reservation.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="No tienes permiso para cancelar esta reserva")
 
+    # Devolver a los contadores de cuota lo consumido por la reserva
+    if reservation.status == "active":
+        release_quota(db, reservation.user_id, reservation.start_time, reservation.end_time)
+
+    if NOTIFICATIONS_ENABLED:
+        enqueue(db, "notify_reservation_cancelled", {
+            "reservation_id": reservation.id,
+            "user_id": reservation.user_id,
+            "resource_id": reservation.resource_id,
+            "start_time": reservation.start_time,
+            "end_time": reservation.end_time,
+        })
+
+    unschedule_reservations(db, [(reservation.id, reservation.start_time)], shard_key(tenant))
     db.delete(reservation)
     db.commit()
     return
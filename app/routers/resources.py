@@ -1,28 +1,56 @@
 # app/routers/resources.py
 
 # APIRouter = equivalente a un Controller en Symfony
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
 # Session = equivalente a una conexión Doctrine
 from sqlalchemy.orm import Session
 
 # Tipado para listas en las respuestas
 from typing import List
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func
 
 # Dependencia que nos da una sesión de base de datos por petición
-from app.database import get_db
+# (get_read_db usa una réplica de lectura si hay alguna configurada)
+from app.database import get_db, get_feed_db, get_read_db, shard_key
 
 # Modelos SQLAlchemy (equivalentes a entidades Doctrine)
+from app.models.reservation import Reservation
 from app.models.resource import Resource
 from app.models.resource_category import ResourceCategory
 from app.models.custom_field import CustomField
+from app.models.reservation_slot import ReservationSlot
 
 # Schemas Pydantic = equivalentes a DTOs o Response Models
 from app.schemas.resource import ResourceResponse
 from app.schemas.custom_field import CustomFieldResponse
+from app.schemas.availability import AvailabilityResponse, OccupancyResponse
+
+# Serialización rápida por columnas (sin hidratar entidades)
+from app.core.serialization import FastJSONResponse, batch_response, fetch_resource_dicts, parse_ids
+
+# ?fields=: solo los campos pedidos, con las relaciones cargadas por lotes
+from app.core.loaders import fetch_sparse, parse_fields, selection_key, selection_tables
+
+# Franjas ocupadas (recursos con slot_minutes)
+from app.core.overlap import rebuild_slots, slot_starts
+
+# Fechas en UTC; zona horaria y horario de apertura de cada recurso
+from app.core.timeutils import DEFAULT_TIMEZONE, is_valid_timezone, local_midnight_utc, local_today, to_utc
+
+# Calendarios iCalendar (.ics) de las reservas
+from app.core.calendar import calendar_response, calendar_window
+
+# ETag / Last-Modified a partir de contadores de versión por tabla
+from app.core.versioning import evaluate_conditional
 
 # Dependencias de autenticación (equivalentes a voters o security checks)
-from app.dependencies.auth import get_current_user, get_current_admin
+from app.dependencies.auth import get_current_admin
+
+# Sede (tenant) de la petición: todos los recursos se filtran por ella
+from app.dependencies.tenant import get_feed_tenant, get_tenant
 
 
 # Creamos un router con prefijo /resources
@@ -32,6 +60,46 @@ router = APIRouter(
     tags=["Resources"],
 )
 
+# Máximo de días que se pueden consultar de una vez en disponibilidad/ocupación
+MAX_AVAILABILITY_DAYS = 31
+
+
+def _check_slot_minutes(slot_minutes: int | None) -> None:
+    """Las franjas deben dividir el día en partes iguales (5, 10, 15, 30, 60...)."""
+    if slot_minutes and (slot_minutes < 0 or 1440 % slot_minutes != 0):
+        raise HTTPException(status_code=400, detail="slot_minutes debe dividir exactamente un día (1440 minutos)")
+
+
+def _check_timezone(timezone: str | None) -> None:
+    if timezone is not None and not is_valid_timezone(timezone):
+        raise HTTPException(status_code=400, detail=f"Zona horaria desconocida: {timezone}")
+
+
+def _opening_hours(opens_at: time | None, closes_at: time | None):
+    """
+    El horario se indica con las dos horas a la vez. Si son iguales, el recurso
+    queda abierto todo el día (sin horario).
+    """
+    if (opens_at is None) != (closes_at is None):
+        raise HTTPException(status_code=400, detail="opens_at y closes_at se indican juntos")
+    if opens_at == closes_at:
+        return None, None
+    return opens_at, closes_at
+
+
+def _check_range(start: datetime | None, end: datetime | None, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Intervalo de consulta en UTC. Las fechas sin zona se interpretan en `timezone`;
+    por defecto, el día de hoy en esa zona. Acotado a MAX_AVAILABILITY_DAYS.
+    """
+    start = to_utc(start, timezone) if start is not None else local_midnight_utc(local_today(timezone), timezone)
+    end = to_utc(end, timezone) if end is not None else start + timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="La fecha de inicio debe ser menor que la de fin")
+    if end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"El intervalo no puede superar {MAX_AVAILABILITY_DAYS} días")
+    return start, end
+
 
 
 @router.post("/", response_model=ResourceResponse, status_code=status.HTTP_201_CREATED)
@@ -39,12 +107,23 @@ def create_resource(
     name: str,
     description: str | None = None,
     category_id: int | None = None,
+    slot_minutes: int | None = None,        # Reserva por franjas fijas (opcional)
+    timezone: str = DEFAULT_TIMEZONE,       # Zona IANA del recurso (p. ej. Europe/Madrid)
+    opens_at: time | None = None,           # Horario de apertura en hora local (opcional)
+    closes_at: time | None = None,
+    tenant: str = Depends(get_tenant),      # Sede a la que pertenece el recurso
     db: Session = Depends(get_db),          # Inyección de la sesión DB
     admin=Depends(get_current_admin),       # Solo admin puede crear recursos
 ):
     """
     Crea un recurso nuevo.
+    Con `slot_minutes` las reservas del recurso van por franjas fijas.
+    Con `opens_at`/`closes_at` solo se puede reservar dentro de ese horario,
+    en la hora local de `timezone`.
     """
+    _check_slot_minutes(slot_minutes)
+    _check_timezone(timezone)
+    opens_at, closes_at = _opening_hours(opens_at, closes_at)
 
     # Si se pasa category_id, validamos que exista
     if category_id:
@@ -54,9 +133,14 @@ def create_resource(
 
     # Creamos la entidad Resource
     resource = Resource(
+        tenant_id=tenant,
         name=name,
         description=description,
         category_id=category_id,
+        slot_minutes=slot_minutes or None,
+        timezone=timezone,
+        opens_at=opens_at,
+        closes_at=closes_at,
     )
 
     # Persistimos en la base de datos
@@ -69,21 +153,183 @@ def create_resource(
 
 
 @router.get("/", response_model=List[ResourceResponse])
-def list_resources(db: Session = Depends(get_db)):
+def list_resources(
+    request: Request,
+    ids: str | None = Query(default=None, description="IDs separados por comas (p. ej. 3,1,2)"),
+    fields: str | None = Query(default=None, description="Campos a devolver (p. ej. id,name,category.name)"),
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_read_db),
+):
     """
-    Lista todos los recursos disponibles.
+    Lista todos los recursos disponibles en la sede.
     Acceso público (requiere token).
+    Con `ids` devuelve solo esos recursos, en el orden pedido, con dos consultas
+    en total; los que no existen se indican en la cabecera X-Missing-IDs.
+    Con `fields` devuelve solo esos campos (el id siempre); las relaciones
+    (category, custom_fields) solo se consultan si se piden.
+    Si el cliente ya tiene la versión actual (If-None-Match) se devuelve 304
+    sin ejecutar el listado.
+    """
+    id_list = parse_ids(ids) if ids is not None else None
+    selection = parse_fields(fields, "resource") if fields is not None else None
+
+    conditional = evaluate_conditional(
+        request, db, selection_tables("resource", selection),
+        scope=tenant
+        + (f":ids={id_list}" if id_list else "")
+        + (f":fields={selection_key(selection)}" if selection else ""),
+    )
+    if conditional.not_modified:
+        return conditional.response_304()
+
+    criteria = [Resource.tenant_id == tenant]
+    if id_list:
+        criteria.append(Resource.id.in_(id_list))
+
+    if selection:
+        items = fetch_sparse(db, "resource", selection, *criteria)
+    else:
+        items = fetch_resource_dicts(db, *criteria)
+
+    return conditional.apply(batch_response(items, id_list) if id_list else FastJSONResponse(items))
+
+
+@router.get("/occupancy", response_model=List[OccupancyResponse])
+def resources_occupancy(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    category_id: int | None = None,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Ocupación de los recursos por franjas de la sede (opcionalmente de una categoría).
+    Un único COUNT agrupado sobre la clave (resource_id, slot_start).
+    Las fechas sin zona se interpretan en UTC.
+    """
+    start, end = _check_range(start, end)
+
+    criteria = [Resource.tenant_id == tenant, Resource.slot_minutes.isnot(None)]
+    if category_id is not None:
+        criteria.append(Resource.category_id == category_id)
+    resources = db.query(Resource.id, Resource.slot_minutes).filter(*criteria).order_by(Resource.id).all()
+    if not resources:
+        return []
+
+    occupied = dict(db.query(ReservationSlot.resource_id, func.count()).filter(
+        ReservationSlot.resource_id.in_([resource.id for resource in resources]),
+        ReservationSlot.slot_start >= start,
+        ReservationSlot.slot_start < end,
+    ).group_by(ReservationSlot.resource_id).all())
+
+    result = []
+    for resource in resources:
+        total = len(slot_starts(start, end, resource.slot_minutes))
+        used = occupied.get(resource.id, 0)
+        result.append(OccupancyResponse(
+            resource_id=resource.id,
+            slot_minutes=resource.slot_minutes,
+            total_slots=total,
+            occupied_slots=used,
+            occupancy=round(used / total, 4) if total else 0.0,
+        ))
+    return result
+
+
+@router.get("/{resource_id}/availability", response_model=AvailabilityResponse)
+def resource_availability(
+    resource_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Franjas libres de un recurso por franjas entre `start` y `end` (por defecto, hoy
+    en la zona del recurso, en la que también se interpretan las fechas sin zona).
+    Se leen las franjas ocupadas por rango de clave, sin recorrer las reservas.
     """
-    resources = db.query(Resource).all()
-    return resources
+    resource = db.query(Resource.id, Resource.slot_minutes, Resource.timezone).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
+    if not resource:
+        raise HTTPException(status_code=404, detail="Recurso no encontrado")
+    if not resource.slot_minutes:
+        raise HTTPException(status_code=400, detail="El recurso no se reserva por franjas")
+
+    start, end = _check_range(start, end, resource.timezone)
+    grid = slot_starts(start, end, resource.slot_minutes)
+
+    occupied = {
+        slot_start for (slot_start,) in db.query(ReservationSlot.slot_start).filter(
+            ReservationSlot.resource_id == resource_id,
+            ReservationSlot.slot_start >= grid[0],
+            ReservationSlot.slot_start < end,
+        )
+    }
+
+    return AvailabilityResponse(
+        resource_id=resource_id,
+        slot_minutes=resource.slot_minutes,
+        start=grid[0],
+        end=end,
+        total_slots=len(grid),
+        occupied_slots=len(occupied),
+        free_slots=[slot_start for slot_start in grid if slot_start not in occupied],
+    )
+
+
+@router.get("/{resource_id}/calendar.ics", response_class=Response)
+def resource_calendar(
+    request: Request,
+    resource_id: int,
+    tenant: str = Depends(get_feed_tenant),
+    db: Session = Depends(get_feed_db),
+):
+    """
+    Ocupación del recurso en formato iCalendar, para suscribirse desde una
+    aplicación de calendario. Público: los eventos no dicen quién ha reservado.
+    Se lee por el índice (sede, recurso, inicio) y solo cambia con las reservas
+    de este recurso.
+    """
+    resource = db.query(Resource.name).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
+    if not resource:
+        raise HTTPException(status_code=404, detail="Recurso no encontrado")
+
+    query = (
+        db.query(Reservation.id, Reservation.start_time, Reservation.end_time)
+        .filter(Reservation.tenant_id == tenant, Reservation.resource_id == resource_id, *calendar_window())
+        .order_by(Reservation.start_time)
+    )
+    source = shard_key(tenant)
+    return calendar_response(
+        request, db,
+        key=f"resource:{source}:{tenant}:{resource_id}",
+        scope=("reservations", "resource_id", resource_id),
+        title=resource.name,
+        query=query,
+        summary=lambda row: "Reservado",
+        uid_domain=f"{source}.sistema-reservas",
+    )
 
 
 @router.get("/{resource_id}", response_model=ResourceResponse)
-def get_resource(resource_id: int, db: Session = Depends(get_db)):
+def get_resource(
+    resource_id: int,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+):
     """
     Devuelve un recurso por ID.
     """
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    resource = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
     if not resource:
         raise HTTPException(status_code=404, detail="Recurso no encontrado")
     return resource
@@ -96,15 +342,30 @@ def update_resource(
     description: str | None = None,
     category_id: int | None = None,
     is_active: bool | None = None,
+    slot_minutes: int | None = None,
+    timezone: str | None = None,
+    opens_at: time | None = None,
+    closes_at: time | None = None,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
     """
     Actualiza un recurso existente.
     Solo accesible para administradores.
+    slot_minutes=0 desactiva la reserva por franjas. Al cambiarlo se regeneran
+    las franjas de las reservas pendientes (409 si alguna deja de encajar).
+    opens_at igual a closes_at quita el horario. Las reservas ya hechas no cambian.
     """
-
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    _check_slot_minutes(slot_minutes)
+    _check_timezone(timezone)
+    hours_sent = opens_at is not None or closes_at is not None
+    opens_at, closes_at = _opening_hours(opens_at, closes_at)
+
+    resource = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
     if not resource:
         raise HTTPException(status_code=404, detail="Recurso no encontrado")
 
@@ -123,6 +384,19 @@ def update_resource(
         resource.category_id = category_id
     if is_active is not None:
         resource.is_active = is_active
+    if timezone is not None:
+        resource.timezone = timezone
+    if hours_sent:
+        resource.opens_at, resource.closes_at = opens_at, closes_at
+    if slot_minutes is not None and (slot_minutes or None) != resource.slot_minutes:
+        resource.slot_minutes = slot_minutes or None
+        db.flush()
+        if rebuild_slots(db, resource.id):
+            db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Hay reservas pendientes que se solaparían con ese tamaño de franja",
+            )
 
     db.commit()
     db.refresh(resource)
@@ -133,6 +407,7 @@ def update_resource(
 @router.delete("/{resource_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_resource(
     resource_id: int,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
@@ -140,7 +415,10 @@ def delete_resource(
     Elimina un recurso por ID.
     Solo accesible para administradores.
     """
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    resource = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
     if not resource:
         raise HTTPException(status_code=404, detail="Recurso no encontrado")
 
@@ -158,13 +436,17 @@ def add_custom_field(
     resource_id: int,
     key: str,
     value: str,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
     """
     Añade un campo personalizado a un recurso.
     """
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    resource = db.query(Resource).filter(
+        Resource.tenant_id == tenant,
+        Resource.id == resource_id,
+    ).first()
     if not resource:
         raise HTTPException(status_code=404, detail="Recurso no encontrado")
 
@@ -183,13 +465,15 @@ def add_custom_field(
 def delete_custom_field(
     resource_id: int,
     field_id: int,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
     """
     Elimina un campo personalizado de un recurso.
     """
-    field = db.query(CustomField).filter(
+    field = db.query(CustomField).join(Resource).filter(
+        Resource.tenant_id == tenant,
         CustomField.id == field_id,
         CustomField.resource_id == resource_id
     ).first()
@@ -1,15 +1,27 @@
 # app/routers/users.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.database import get_db, get_feed_db, shard_key
+from app.models.reservation import Reservation
+from app.models.resource import Resource
 from app.models.user import User
-from app.schemas.user import UserResponse
+from app.models.user_usage import UserUsage
+from app.schemas.user import CalendarTokenResponse, UserResponse
+from app.schemas.usage import UserUsageResponse
+from app.core.serialization import FastJSONResponse, batch_response, fetch_user_dicts, parse_ids
 from app.schemas.auth import LoginRequest
-from app.core.security import hash_password
-from app.dependencies.auth import get_current_user, get_current_admin
+from app.core.loaders import fetch_sparse, parse_fields
+from app.core.security import hash_password, verify_password
+from app.core.users import is_duplicate_email
+from app.core.calendar import calendar_response, calendar_window, feed_token
+from app.core.tokens import TokenUser, revoke_user_tokens
+from app.dependencies.auth import get_current_user, get_current_admin, get_feed_user_id
+from app.dependencies.tenant import get_feed_tenant, get_tenant
+from app.models.refresh_token import RefreshToken
 
 router = APIRouter(
     prefix="/users",
@@ -17,6 +29,29 @@ router = APIRouter(
 )
 
 
+def _save_user(db: Session, user: User, source: str = None) -> UserResponse:
+    """
+    Guarda un usuario modificado. Un email ya usado lo detecta el índice único
+    (sin SELECT previo) y se devuelve como 400.
+    Con `source` (shard del usuario) se revocan además todos sus tokens y su
+    enlace de calendario, como al cambiar la contraseña.
+    """
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        if not is_duplicate_email(exc):
+            raise
+        raise HTTPException(status_code=400, detail="El email ya está en uso")
+
+    if source is not None:
+        revoke_user_tokens(db, source, [user.id])
+
+    response = UserResponse.model_validate(user)
+    db.commit()
+    return response
+
+
 # -------------------------
 # Perfil del usuario autenticado
 # -------------------------
@@ -31,23 +66,88 @@ def get_me(current_user: User = Depends(get_current_user)):
 @router.put("/me/update", response_model=UserResponse)
 def update_me(
     data: LoginRequest,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Validar email duplicado
-    existing = db.query(User).filter(
-        User.email == data.email,
-        User.id != current_user.id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="El email ya está en uso")
-
+    """
+    Cambia mi email y mi contraseña. Si la contraseña es distinta se cierran
+    todas mis sesiones (también esta) y deja de valer el enlace de calendario.
+    """
+    password_changed = not verify_password(data.password, current_user.hashed_password)
     current_user.email = data.email
-    current_user.hashed_password = hash_password(data.password)
+    if password_changed:
+        current_user.hashed_password = hash_password(data.password)
+    return _save_user(db, current_user, shard_key(tenant) if password_changed else None)
+
+
+# -------------------------
+# Calendario de mis reservas (.ics)
+# -------------------------
+@router.get("/me/calendar.ics", response_class=Response)
+def my_calendar(
+    request: Request,
+    user_id: int = Depends(get_feed_user_id),
+    tenant: str = Depends(get_feed_tenant),
+    db: Session = Depends(get_feed_db),
+):
+    """
+    Mis reservas activas y completadas (de CALENDAR_PAST_DAYS días atrás a
+    CALENDAR_FUTURE_DAYS adelante) en formato iCalendar, por el índice
+    (sede, usuario, inicio). Acepta el token de acceso o `?token=` (ver
+    /users/me/calendar-token). Solo cambia con las reservas de este usuario.
+    """
+    query = (
+        db.query(Reservation.id, Reservation.start_time, Reservation.end_time, Resource.name.label("resource_name"))
+        .join(Resource, Reservation.resource_id == Resource.id)
+        .filter(Reservation.tenant_id == tenant, Reservation.user_id == user_id, *calendar_window())
+        .order_by(Reservation.start_time)
+    )
+    source = shard_key(tenant)
+    return calendar_response(
+        request, db,
+        key=f"user:{source}:{tenant}:{user_id}",
+        scope=("reservations", "user_id", user_id),
+        title="Mis reservas",
+        query=query,
+        summary=lambda row: f"Reserva: {row.resource_name}",
+        uid_domain=f"{source}.sistema-reservas",
+    )
+
 
+@router.get("/me/calendar-token", response_model=CalendarTokenResponse)
+def my_calendar_token(
+    request: Request,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Enlace para suscribirse a mi calendario desde una aplicación de calendario.
+    El token es de solo lectura y solo da acceso a este calendario. Vale hasta
+    que se rota (POST), se cierran todas las sesiones o se cambia la contraseña.
+    """
+    token = feed_token(db, tenant, current_user)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    return _calendar_token_response(request, tenant, token)
+
+
+@router.post("/me/calendar-token", response_model=CalendarTokenResponse)
+def rotate_my_calendar_token(
+    request: Request,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Genera un enlace de calendario nuevo; los anteriores dejan de funcionar."""
+    token = feed_token(db, tenant, current_user, rotate=True)
+    db.commit()
+    return _calendar_token_response(request, tenant, token)
+
+
+def _calendar_token_response(request: Request, tenant: str, token: str) -> CalendarTokenResponse:
+    url = request.url_for("my_calendar").include_query_params(tenant=tenant, token=token)
+    return CalendarTokenResponse(token=token, url=str(url))
 
 
 # -------------------------
@@ -55,10 +155,22 @@ def update_me(
 # -------------------------
 @router.get("/", response_model=List[UserResponse])
 def list_users(
+    ids: str | None = Query(default=None, description="IDs separados por comas (p. ej. 3,1,2)"),
+    fields: str | None = Query(default=None, description="Campos a devolver (p. ej. id,email)"),
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: TokenUser = Depends(get_current_admin),
 ):
-    return db.query(User).all()
+    # Con ?ids= se resuelven varios usuarios con un único IN, en el orden pedido
+    id_list = parse_ids(ids) if ids is not None else None
+    criteria = [User.id.in_(id_list)] if id_list else []
+
+    # Con ?fields= solo se consultan y devuelven esos campos
+    if fields is not None:
+        items = fetch_sparse(db, "user", parse_fields(fields, "user"), *criteria)
+    else:
+        items = fetch_user_dicts(db, *criteria)
+
+    return batch_response(items, id_list) if id_list else FastJSONResponse(items)
 
 
 # -------------------------
@@ -68,7 +180,7 @@ def list_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: TokenUser = Depends(get_current_admin),
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -76,6 +188,30 @@ def get_user(
     return user
 
 
+# -------------------------
+# Uso y cuotas de un usuario (ADMIN)
+# -------------------------
+@router.get("/{user_id}/usage", response_model=UserUsageResponse)
+def get_user_usage(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin: TokenUser = Depends(get_current_admin),
+):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    periods = db.query(UserUsage).filter(
+        UserUsage.user_id == user_id
+    ).order_by(UserUsage.period_start.desc()).all()
+
+    return UserUsageResponse(
+        user_id=user.id,
+        active_reservations=user.active_reservations,
+        periods=periods,
+    )
+
+
 # -------------------------
 # Actualizar usuario por ID (ADMIN)
 # -------------------------
@@ -83,27 +219,18 @@ def get_user(
 def update_user(
     user_id: int,
     data: LoginRequest,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: TokenUser = Depends(get_current_admin),
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    # Validar email duplicado
-    existing = db.query(User).filter(
-        User.email == data.email,
-        User.id != user_id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="El email ya está en uso")
-
     user.email = data.email
     user.hashed_password = hash_password(data.password)
-
-    db.commit()
-    db.refresh(user)
-    return user
+    # Con la contraseña cambiada por un admin se cierran las sesiones abiertas del usuario
+    return _save_user(db, user, shard_key(tenant))
 
 
 # -------------------------
@@ -112,13 +239,20 @@ def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: int,
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: TokenUser = Depends(get_current_admin),
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
+    # Sus tokens dejan de valer (los de acceso siguen firmados hasta caducar)
+    revoke_user_tokens(db, shard_key(tenant), [user_id])
+
+    # Los contadores de uso y los tokens de refresco pertenecen al usuario y se eliminan con él
+    db.query(UserUsage).filter(UserUsage.user_id == user_id).delete()
+    db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
     db.delete(user)
     db.commit()
     return
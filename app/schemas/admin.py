@@ -0,0 +1,49 @@
+# app/schemas/admin.py
+
+import json
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, field_validator
+
+from .types import UTCDateTime
+
+
+class BulkOperationResponse(BaseModel):
+    """
+    Resultado de una operación masiva: filas afectadas de la tabla principal
+    y filas relacionadas eliminadas en cascada.
+    """
+    affected: int
+    reservations_deleted: int = 0
+    custom_fields_deleted: int = 0
+
+
+class AuditEntryResponse(BaseModel):
+    """
+    Entrada del registro de auditoría. `changes` tiene "before"/"after" con los
+    campos afectados o, en las operaciones masivas, la sentencia y las filas tocadas.
+    """
+    id: int
+    occurred_at: UTCDateTime
+    tenant_id: str
+    actor_id: Optional[int] = None
+    actor: str
+    action: str
+    entity: str
+    entity_id: Optional[int] = None
+    changes: Any
+    request: Optional[str] = None
+
+    @field_validator("changes", mode="before")
+    @classmethod
+    def parse_changes(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True  # Permite convertir desde modelos SQLAlchemy
+
+
+class AuditPage(BaseModel):
+    """Página del registro (de más reciente a más antigua). Sin más páginas, next_before_id es null."""
+    items: List[AuditEntryResponse]
+    next_before_id: Optional[int] = None
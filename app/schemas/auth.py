@@ -1,5 +1,7 @@
 # app/schemas/auth.py
 
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -10,4 +12,17 @@ class LoginRequest(BaseModel):
 
 class TokenResponse(BaseModel):
     access_token: str
+    # Token opaco para obtener un nuevo par en /auth/refresh (de un solo uso)
+    refresh_token: str
     token_type: str = "bearer"
+    # Segundos de vida del token de acceso
+    expires_in: int
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    # Si se indica, se revoca también el token de refresco de esta sesión
+    refresh_token: Optional[str] = None
@@ -0,0 +1,31 @@
+# app/schemas/availability.py
+
+from pydantic import BaseModel
+from typing import List
+
+from .types import UTCDateTime
+
+
+class AvailabilityResponse(BaseModel):
+    """
+    Franjas de un recurso en un intervalo: cuántas hay, cuántas están ocupadas
+    y el inicio de cada franja libre.
+    """
+    resource_id: int
+    slot_minutes: int
+    start: UTCDateTime
+    end: UTCDateTime
+    total_slots: int
+    occupied_slots: int
+    free_slots: List[UTCDateTime] = []
+
+
+class OccupancyResponse(BaseModel):
+    """
+    Ocupación de un recurso por franjas en un intervalo (0 = libre, 1 = completo).
+    """
+    resource_id: int
+    slot_minutes: int
+    total_slots: int
+    occupied_slots: int
+    occupancy: float
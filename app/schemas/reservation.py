@@ -1,18 +1,20 @@
 # app/schemas/reservation.py
 
 from pydantic import BaseModel
-from datetime import datetime
+
+from .types import UTCDateTime
 
 class ReservationResponse(BaseModel):
     """
     Esquema de salida para reservas.
     Representa cómo se devuelven las reservas al cliente.
+    Las fechas se devuelven en UTC.
     """
     id: int
     user_id: int
     resource_id: int
-    start_time: datetime
-    end_time: datetime
+    start_time: UTCDateTime
+    end_time: UTCDateTime
     status: str
 
     class Config:
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import time
 from typing import Optional, List
 from .custom_field import CustomFieldResponse
 from .resource_category import ResourceCategoryResponse
@@ -8,6 +9,11 @@ class ResourceResponse(BaseModel):
     name: str
     description: Optional[str]
     is_active: bool
+    slot_minutes: Optional[int] = None
+    # Zona IANA del recurso y horario de apertura en hora local (None = sin horario)
+    timezone: str = "UTC"
+    opens_at: Optional[time] = None
+    closes_at: Optional[time] = None
     category: Optional[ResourceCategoryResponse]
     custom_fields: List[CustomFieldResponse] = []
 
@@ -0,0 +1,11 @@
+# app/schemas/types.py
+
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+from app.core.timeutils import as_utc
+
+# Fecha guardada en UTC (naive) que se devuelve con zona: "2027-01-05T10:00:00Z"
+UTCDateTime = Annotated[datetime, AfterValidator(as_utc)]
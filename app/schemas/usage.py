@@ -0,0 +1,26 @@
+# app/schemas/usage.py
+
+from pydantic import BaseModel
+from datetime import date
+from typing import List
+
+
+class UsagePeriodResponse(BaseModel):
+    """
+    Contadores de un usuario para una semana concreta.
+    """
+    period_start: date
+    reservation_count: int
+    reserved_minutes: int
+
+    class Config:
+        from_attributes = True
+
+
+class UserUsageResponse(BaseModel):
+    """
+    Resumen de uso de un usuario: reservas activas y contadores semanales.
+    """
+    user_id: int
+    active_reservations: int
+    periods: List[UsagePeriodResponse] = []
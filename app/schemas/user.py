@@ -8,3 +8,9 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True  # Permite convertir desde SQLAlchemy
+
+
+# Enlace de suscripción al calendario personal (.ics)
+class CalendarTokenResponse(BaseModel):
+    token: str
+    url: str
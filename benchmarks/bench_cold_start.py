@@ -0,0 +1,128 @@
+# benchmarks/bench_cold_start.py
+#
+# Mide el arranque en frío de un proceso trabajador, en un intérprete nuevo cada vez:
+#   - import:   importar app.main (construye la app con create_app)
+#   - startup:  ejecutar el lifespan (precalentamiento, trabajos, recordatorios)
+#   - list:     primera petición de lectura (GET /resources/)
+#   - login:    primer login (incluye un bcrypt.verify, que cuesta lo mismo siempre)
+#   - ready:    desde que arranca el intérprete hasta tener ambas respuestas
+# Se compara con y sin precalentamiento (WARM_UP_ON_STARTUP) usando SQLite.
+#
+# Uso:
+#   python -m benchmarks.bench_cold_start [repeticiones]
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Se ejecuta en cada proceso hijo: no importa nada de la app antes de medir
+CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app
+t_import = time.perf_counter()
+
+
+async def call(method, path, body=b""):
+    scope = {"type": "http", "http_version": "1.1", "method": method, "path": path,
+             "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+             "headers": [(b"host", b"bench"), (b"content-type", b"application/json")]}
+    sent = False
+    status = {}
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        t_startup = time.perf_counter()
+        codes = [await call("GET", "/resources/")]
+        t_list = time.perf_counter()
+        codes.append(await call("POST", "/auth/login", b'{"email": "bench@example.com", "password": "bench"}'))
+        t_login = time.perf_counter()
+    print(json.dumps({
+        "import": t_import - t0,
+        "startup": t_startup - t_import,
+        "list": t_list - t_startup,
+        "login": t_login - t_list,
+        "ready": t_login - t0,
+        "codes": codes,
+    }))
+
+asyncio.run(main())
+"""
+
+COLUMNS = ("import", "startup", "list", "login", "ready")
+
+
+def prepare_database(path: str) -> None:
+    """Crea el esquema y un usuario para el login."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.security import hash_password
+    from app.database import Base
+    from app.models import User
+
+    engine = create_engine("sqlite:///" + path)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(email="bench@example.com", hashed_password=hash_password("bench"), role="user"))
+        db.commit()
+    engine.dispose()
+
+
+def run_child(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        prepare_database(path)
+
+        base_env = dict(
+            os.environ,
+            DATABASE_URL="sqlite:///" + path,
+            SQL_ECHO="0",
+            JOB_WORKERS="0",
+            REMINDERS_ENABLED="0",
+            RATE_LIMIT_ENABLED="0",
+        )
+
+        print(f"{repeat} procesos por escenario, mediana en ms")
+        print(f"{'escenario':<22}" + "".join(f"{key:>10}" for key in COLUMNS))
+        for label, warm in (("sin precalentar", "0"), ("con precalentamiento", "1")):
+            runs = [run_child(dict(base_env, WARM_UP_ON_STARTUP=warm)) for _ in range(repeat)]
+            assert all(run["codes"] == [200, 200] for run in runs), runs
+            medians = {
+                key: statistics.median(run[key] for run in runs) * 1000
+                for key in COLUMNS
+            }
+            print(f"{label:<22}" + "".join(f"{medians[key]:>10.1f}" for key in COLUMNS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_serialization.py
+#
+# Compara el coste de los listados:
+#   - ruta ORM: entidades completas -> Pydantic (from_attributes) -> json
+#   - ruta rápida: consulta por columnas -> dicts -> orjson
+#
+# Uso:
+#   python -m benchmarks.bench_serialization [num_recursos] [repeticiones]
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import CustomField, Reservation, Resource, ResourceCategory, User
+from app.schemas.reservation import ReservationResponse
+from app.schemas.resource import ResourceResponse
+from app.core.serialization import FastJSONResponse, fetch_reservation_dicts, fetch_resource_dicts
+
+
+def seed(db, num_resources: int) -> None:
+    """Crea recursos con categoría y dos campos, y cinco reservas por recurso."""
+    user = User(email="bench@example.com", hashed_password="x", role="user")
+    categories = [ResourceCategory(name=f"Categoría {i}") for i in range(10)]
+    db.add(user)
+    db.add_all(categories)
+    db.flush()
+
+    start = datetime(2026, 1, 5, 8, 0)
+    for i in range(num_resources):
+        resource = Resource(name=f"Recurso {i}", description="Sala de reuniones", is_active=True,
+                            category_id=categories[i % 10].id)
+        db.add(resource)
+        db.flush()
+        db.add_all([
+            CustomField(resource_id=resource.id, key="capacidad", value="10"),
+            CustomField(resource_id=resource.id, key="planta", value="2"),
+        ])
+        db.add_all([
+            Reservation(user_id=user.id, resource_id=resource.id, status="active",
+                        start_time=start + timedelta(hours=h), end_time=start + timedelta(hours=h + 1))
+            for h in range(5)
+        ])
+    db.commit()
+
+
+def orm_path(db, model, schema) -> bytes:
+    """Aproximación a lo que hace FastAPI con response_model y objetos ORM."""
+    items = db.query(model).all()
+    validated = TypeAdapter(List[schema]).validate_python(items, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_path(db, fetch) -> bytes:
+    return FastJSONResponse(fetch(db)).body
+
+
+def measure(label: str, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<28} {best * 1000:9.2f} ms")
+    return best
+
+
+def main() -> None:
+    num_resources = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        seed(db, num_resources)
+
+    print(f"{num_resources} recursos, {num_resources * 5} reservas (mejor de {repeat})")
+    for title, model, schema, fetch in (
+        ("Recursos", Resource, ResourceResponse, fetch_resource_dicts),
+        ("Reservas", Reservation, ReservationResponse, fetch_reservation_dicts),
+    ):
+        print(title)
+        # Sesión nueva en cada repetición para no reutilizar el identity map
+        def run_orm():
+            with Session() as db:
+                return orm_path(db, model, schema)
+
+        def run_fast():
+            with Session() as db:
+                return fast_path(db, fetch)
+
+        assert json.loads(run_orm()) == json.loads(run_fast()), "Las dos rutas deben producir el mismo JSON"
+        slow = measure("ORM + Pydantic + json", run_orm, repeat)
+        fast = measure("columnas + orjson", run_fast, repeat)
+        print(f"  {'mejora':<28} {slow / fast:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()